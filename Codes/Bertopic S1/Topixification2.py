@@ -1,7 +1,7 @@
 import pandas as pd
 from bertopic import BERTopic
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
+from magasin_embeddings import get_embeddings
 from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
 
 file_path = 'Donnees/fichier_traduit.xlsx'
@@ -17,8 +17,8 @@ custom_stop_words = list(ENGLISH_STOP_WORDS.union({'le', 'la', 'de', 'des', 'et'
 vectorizer = TfidfVectorizer(stop_words=custom_stop_words, max_df=0.8)
 tfidf_matrix = vectorizer.fit_transform(texts)
 
-pretrained_model = SentenceTransformer("all-MiniLM-L6-v2")
-embeddings = pretrained_model.encode(texts)
+# Embeddings lus dans le magasin ; seuls les textes jamais vus sont encodés
+embeddings = get_embeddings(texts, "all-MiniLM-L6-v2")
 
 topic_model = BERTopic(top_n_words=50, verbose=True)
 topics, probs = topic_model.fit_transform(texts, embeddings)
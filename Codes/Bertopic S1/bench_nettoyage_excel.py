@@ -0,0 +1,52 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from nettoyage_excel import safe_excel_text, sanitize_for_excel
+
+MOTS = ["artist", "run", "space", "galerie", "atelier", "exposition", "collectif", "Berlin", "São", "Kraków"]
+ILLEGAUX = ['\x01', '\x0b', '\u200b', '\x7f', '\ufeff']
+
+
+def synthetic_dataframe(n_lignes, taux_sales=0.01, seed=0):
+    """DataFrame de n_lignes × 5 colonnes de texte (plus deux colonnes numériques)."""
+    rng = random.Random(seed)
+
+    def cellule():
+        texte = ' '.join(rng.choice(MOTS) for _ in range(rng.randint(5, 60)))
+        if rng.random() < taux_sales:
+            position = rng.randrange(len(texte))
+            texte = texte[:position] + rng.choice(ILLEGAUX) + texte[position:]
+        return texte
+
+    colonnes = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+    donnees = {col: [cellule() for _ in range(n_lignes)] for col in colonnes}
+    donnees['id'] = range(n_lignes)
+    donnees['latitude'] = [rng.uniform(-90, 90) for _ in range(n_lignes)]
+    return pd.DataFrame(donnees)
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison applymap(safe_excel_text) / sanitize_for_excel.")
+    parser.add_argument('--lignes', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    args = parser.parse_args()
+
+    print(f"{'lignes':>8} | {'applymap (s)':>12} | {'vectorisé (s)':>13} | {'gain':>6}")
+    for n_lignes in args.lignes:
+        df = synthetic_dataframe(n_lignes)
+        appliquer = df.map if hasattr(df, 'map') else df.applymap
+
+        debut = time.perf_counter()
+        reference = appliquer(safe_excel_text)
+        duree_ancienne = time.perf_counter() - debut
+
+        debut = time.perf_counter()
+        resultat = sanitize_for_excel(df.copy())
+        duree_nouvelle = time.perf_counter() - debut
+
+        assert (resultat.astype(object).values == reference.astype(object).values).all()
+        print(f"{n_lignes:>8} | {duree_ancienne:>12.3f} | {duree_nouvelle:>13.3f} | x{duree_ancienne / duree_nouvelle:>5.1f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+import spacy
+
+from pretraitement_spacy import CUSTOM_STOP_WORDS, MODEL_SPACY, load_nlp, open_cache, preprocess_texts
+
+MOTS = ["the", "artists", "were", "running", "a", "small", "gallery", "in", "Berlin", "since", "2004",
+        "with", "workshops", "and", "residencies", "for", "young", "painters", "exhibitions", "collective",
+        "neighbourhood", "studios", "is", "organised", "by", "volunteers", "who", "curate", "shows"]
+
+
+def preprocess_text_iteratif(nlp, texts):
+    """Ancienne version : nlp() complet par ligne via apply, puis seconde passe remove_stop_words."""
+    for word in CUSTOM_STOP_WORDS:
+        nlp.vocab[word].is_stop = True
+    stop_words = set(spacy.lang.en.stop_words.STOP_WORDS).union(CUSTOM_STOP_WORDS)
+
+    def preprocess_text(text):
+        if not text:
+            return ''
+        doc = nlp(text.lower())
+        return ' '.join(token.lemma_ for token in doc if token.is_alpha and not token.is_stop)
+
+    def remove_stop_words(text):
+        return ' '.join([word for word in text.split() if word not in stop_words])
+
+    return pd.Series(texts).apply(preprocess_text).apply(remove_stop_words).tolist()
+
+def textes_synthetiques(n_textes, part_doublons=0.1, seed=0):
+    rng = random.Random(seed)
+    textes = [' '.join(rng.choice(MOTS) for _ in range(rng.randint(40, 200))) + '.' for _ in range(n_textes)]
+    for i in rng.sample(range(n_textes), int(n_textes * part_doublons)):
+        textes[i] = textes[rng.randrange(n_textes)]
+    return textes
+
+def main():
+    parser = argparse.ArgumentParser(description="docs/s du prétraitement spaCy : apply par ligne vs nlp.pipe.")
+    parser.add_argument('--modele', default=MODEL_SPACY)
+    parser.add_argument('--textes', type=int, default=2000)
+    parser.add_argument('--fichier', help="Excel traduit à utiliser à la place des textes synthétiques")
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--n-process', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    if args.fichier:
+        df = pd.read_excel(args.fichier)
+        colonnes = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+        textes = df[colonnes].fillna('').apply(lambda row: ' '.join(row).strip(), axis=1).tolist()
+    else:
+        textes = textes_synthetiques(args.textes)
+
+    debut = time.perf_counter()
+    reference = preprocess_text_iteratif(spacy.load(args.modele), textes)
+    duree = time.perf_counter() - debut
+    print(f"{'apply + nlp() complet':<32} : {len(textes) / duree:8.1f} docs/s ({duree:.2f}s)")
+
+    nlp = load_nlp(args.modele)
+    for n_process in args.n_process:
+        resultat, stats = preprocess_texts(textes, nlp, batch_size=args.batch_size, n_process=n_process)
+        assert resultat == reference
+        print(f"{f'nlp.pipe, {n_process} processus':<32} : {len(textes) / stats['duree']:8.1f} docs/s "
+              f"({stats['duree']:.2f}s, {stats['traites']} textes distincts)")
+
+    with tempfile.TemporaryDirectory() as dossier:
+        cache = open_cache(os.path.join(dossier, 'cache.sqlite'))
+        preprocess_texts(textes, nlp, batch_size=args.batch_size, cache=cache)
+        resultat, stats = preprocess_texts(textes, nlp, batch_size=args.batch_size, cache=cache)
+        cache.close()
+    assert resultat == reference
+    print(f"{'cache chaud (textes inchangés)':<32} : {len(textes) / stats['duree']:8.1f} docs/s "
+          f"({stats['duree']:.2f}s, {stats['hits']} en cache)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+import hashlib
+import json
+import sqlite3
+
+CHEMIN_CACHE = 'Donnees/cache_traduction.sqlite'
+TAILLE_REQUETE = 500  # reste sous la limite de variables d'une requête SQLite
+
+
+def open_cache(path=CHEMIN_CACHE):
+    """Ouvre (ou crée) le cache de traductions sur disque."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')  # lectures et écritures concurrentes entre processus
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS traductions (
+        cle TEXT PRIMARY KEY,
+        traduction TEXT NOT NULL
+    );
+    ''')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS langues (
+        cle TEXT PRIMARY KEY,
+        langue TEXT NOT NULL,
+        confiance REAL NOT NULL
+    );
+    ''')
+    conn.commit()
+    return conn
+
+def cache_key(text, model_name, params):
+    """Empreinte SHA-256 du texte source, du modèle et des paramètres de génération."""
+    contenu = json.dumps([text, model_name, params], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+def _select_par_cles(conn, requete, keys):
+    """Exécute une requête SELECT ... WHERE cle IN (...) par paquets de clés."""
+    keys = list(keys)
+    lignes = []
+    for debut in range(0, len(keys), TAILLE_REQUETE):
+        partie = keys[debut:debut + TAILLE_REQUETE]
+        marqueurs = ','.join('?' * len(partie))
+        lignes.extend(conn.execute(requete.format(marqueurs=marqueurs), partie))
+    return lignes
+
+def cache_lookup(conn, keys):
+    """Renvoie un dictionnaire {clé: traduction} pour les clés déjà présentes dans le cache."""
+    return dict(_select_par_cles(conn, 'SELECT cle, traduction FROM traductions WHERE cle IN ({marqueurs})', keys))
+
+def cache_store(conn, items):
+    """Enregistre une liste de couples (clé, traduction)."""
+    conn.executemany('INSERT OR REPLACE INTO traductions (cle, traduction) VALUES (?, ?)', items)
+    conn.commit()
+
+def langue_lookup(conn, keys):
+    """Renvoie {clé: (langue, confiance)} pour les textes dont la langue est déjà connue."""
+    lignes = _select_par_cles(conn, 'SELECT cle, langue, confiance FROM langues WHERE cle IN ({marqueurs})', keys)
+    return {cle: (langue, confiance) for cle, langue, confiance in lignes}
+
+def langue_store(conn, items):
+    """Enregistre une liste de triplets (clé, langue, confiance)."""
+    conn.executemany('INSERT OR REPLACE INTO langues (cle, langue, confiance) VALUES (?, ?, ?)', items)
+    conn.commit()
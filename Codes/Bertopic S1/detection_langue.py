@@ -0,0 +1,84 @@
+import hashlib
+import re
+import unicodedata
+
+from langdetect import DetectorFactory, detect_langs
+
+from cache_traduction import langue_lookup, langue_store
+
+# langdetect est aléatoire : une graine fixe rend la détection reproductible
+DetectorFactory.seed = 0
+
+SEUIL_CONFIANCE = 0.80
+TROP_COURT = ''          # texte trop court pour être détecté : laissé tel quel
+INCONNUE = 'inconnue'    # échec de langdetect
+
+
+# Fonction de nettoyage pour la détection de langue
+def clean_text(text):
+    text = unicodedata.normalize("NFKD", text)
+    text = re.sub(r"[^\x00-\x7F]+", " ", text)  # remplace caractères non-ASCII par un espace
+    return text.strip()
+
+def text_hash(text):
+    """Empreinte SHA-256 d'un texte, clé du mémo de détection."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def detect_one(text):
+    """Renvoie (langue, confiance) pour un texte."""
+    cleaned = clean_text(text)
+    if len(cleaned) < 2:
+        return TROP_COURT, 1.0
+    try:
+        meilleure = detect_langs(cleaned)[0]
+        return meilleure.lang, meilleure.prob
+    except Exception:
+        return INCONNUE, 0.0
+
+def detect_languages(texts, cache=None):
+    """
+    Détecte la langue d'une liste de textes. Chaque texte distinct n'est analysé
+    qu'une fois ; les résultats sont mémorisés par empreinte dans le cache SQLite
+    s'il est fourni. Renvoie une liste de (langue, confiance) et le nombre de
+    textes distincts retrouvés dans le mémo.
+    """
+    uniques = list(dict.fromkeys(texts))
+    cles = {texte: text_hash(texte) for texte in uniques}
+    connues = langue_lookup(cache, cles.values()) if cache is not None else {}
+    n_memo = sum(cles[texte] in connues for texte in uniques)
+
+    nouvelles = []
+    for texte in uniques:
+        if cles[texte] not in connues:
+            connues[cles[texte]] = detect_one(texte)
+            nouvelles.append((cles[texte], *connues[cles[texte]]))
+    if cache is not None and nouvelles:
+        langue_store(cache, nouvelles)
+
+    return [connues[cles[texte]] for texte in texts], n_memo
+
+def route_languages(texts, cache=None, seuil=SEUIL_CONFIANCE, traduire_incertains=True):
+    """
+    Répartit les textes avant la traduction : seuls les textes détectés comme non
+    anglais (et, si demandé, ceux dont la détection est peu sûre) sont renvoyés
+    pour passer par MarianMT. Renvoie cette liste et les compteurs de l'étape.
+    """
+    langues, n_memo = detect_languages(texts, cache)
+    a_traduire, incertains = [], []
+    stats = {'anglais': 0, 'trop_courts': 0, 'non_anglais': 0, 'incertains': 0, 'memo': n_memo,
+             'incertains_traduits': traduire_incertains}
+    for texte, (langue, confiance) in zip(texts, langues):
+        if langue == TROP_COURT:
+            stats['trop_courts'] += 1
+        elif confiance < seuil:
+            stats['incertains'] += 1
+            incertains.append(texte)
+        elif langue == 'en':
+            stats['anglais'] += 1
+        else:
+            stats['non_anglais'] += 1
+            a_traduire.append(texte)
+    if traduire_incertains:
+        a_traduire.extend(incertains)
+    stats['ignores'] = len(texts) - len(a_traduire)
+    return a_traduire, stats
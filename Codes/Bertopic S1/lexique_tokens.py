@@ -0,0 +1,225 @@
+import csv
+import json
+import os
+import string
+from collections import Counter
+
+from spacy.lang.en.stop_words import STOP_WORDS
+
+CHEMIN_LEXIQUE = 'Donnees/lexique_tokens.json'
+CHEMIN_REVUE = 'Donnees/termes_a_revoir.csv'
+PONCTUATION_GARDEE = ["!", "?", "..."]
+COLONNES_REVUE = ['type', 'terme', 'occurrences', 'contexte', 'decision']
+SAUVEGARDE_TOUS_LES = 20  # décisions interactives entre deux sauvegardes du lexique
+
+
+def load_lexicon(path=CHEMIN_LEXIQUE):
+    """
+    Lexique des décisions déjà prises : {'expressions': {texte: bool}, 'lemmes': {lemme: bool}}.
+    Les expressions sont les groupes nominaux de plusieurs mots, les clés sont en minuscules.
+    """
+    lexique = {'expressions': {}, 'lemmes': {}}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            lexique.update(json.load(f))
+    return lexique
+
+def save_lexicon(lexique, path=CHEMIN_LEXIQUE):
+    temporaire = path + '.tmp'
+    with open(temporaire, 'w', encoding='utf-8') as f:
+        json.dump(lexique, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(temporaire, path)
+
+def context(doc, debut, fin, largeur=3):
+    """Le terme entre ** avec quelques mots de contexte de chaque côté."""
+    gauche = doc[max(0, debut - largeur):debut].text
+    droite = doc[fin:fin + largeur].text
+    return f"{gauche} **{doc[debut:fin].text}** {droite}".strip()
+
+def candidates(doc):
+    """Termes soumis à décision : (type, clé, texte affiché, début, fin) pour chaque occurrence."""
+    for chunk in doc.noun_chunks:
+        if len(chunk.text.split()) > 1:  # On ne garde que les groupes de mots
+            yield 'expressions', chunk.text.lower(), chunk.text, chunk.start, chunk.end
+    for token in doc:
+        if not (token.is_punct or token.is_stop or token.is_space):
+            yield 'lemmes', token.lemma_.lower(), token.text, token.i, token.i + 1
+
+def collect_unseen(docs, lexique):
+    """Termes absents du lexique, avec leur nombre d'occurrences et un exemple en contexte."""
+    occurrences = Counter()
+    exemples = {}
+    for doc in docs:
+        for type_, cle, texte, debut, fin in candidates(doc):
+            if cle in lexique[type_]:
+                continue
+            occurrences[type_, cle] += 1
+            exemples.setdefault((type_, cle), (texte, context(doc, debut, fin)))
+    return {terme: {'occurrences': n, 'texte': exemples[terme][0], 'contexte': exemples[terme][1]}
+            for terme, n in occurrences.most_common()}
+
+def ask_terms(inconnus, lexique, path=CHEMIN_LEXIQUE):
+    """
+    Demande une décision pour chaque terme inconnu, une seule fois par terme, du plus
+    fréquent au moins fréquent. 'q' interrompt la revue ; les termes restants restent inconnus.
+    """
+    print(f"\n=== Revue interactive de {len(inconnus)} termes inconnus ('q' pour arrêter) ===")
+    for n, ((type_, cle), info) in enumerate(inconnus.items(), start=1):
+        genre = "l'expression" if type_ == 'expressions' else "le token"
+        reponse = input(f"[{n}/{len(inconnus)}] {info['contexte']}\n"
+                        f"Conserver {genre} '{info['texte']}' ? (o/n/q) : ").strip().lower()
+        if reponse == 'q':
+            break
+        lexique[type_][cle] = reponse == 'o'
+        if n % SAUVEGARDE_TOUS_LES == 0:
+            save_lexicon(lexique, path)
+    save_lexicon(lexique, path)
+    print("=== Fin de la revue interactive ===\n")
+
+def write_review_file(inconnus, path=CHEMIN_REVUE):
+    """
+    Ajoute les termes inconnus au fichier de revue (colonne 'decision' à remplir avec o/n),
+    sans dupliquer ceux qui y figurent déjà.
+    """
+    lignes = read_review_file(path)
+    deja = {(ligne['type'], ligne['terme']) for ligne in lignes}
+    for (type_, cle), info in inconnus.items():
+        if (type_, cle) not in deja:
+            lignes.append({'type': type_, 'terme': cle, 'occurrences': info['occurrences'],
+                           'contexte': info['contexte'], 'decision': ''})
+    write_review_rows(lignes, path)
+    print(f"📝 {len(inconnus)} termes inconnus, fichier de revue : {path} ({len(lignes)} termes en attente)")
+
+def read_review_file(path=CHEMIN_REVUE):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f, delimiter=';'))
+
+def write_review_rows(lignes, path=CHEMIN_REVUE):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLONNES_REVUE, delimiter=';')
+        writer.writeheader()
+        writer.writerows(lignes)
+
+def import_review(lexique, path=CHEMIN_REVUE, path_lexique=CHEMIN_LEXIQUE):
+    """Reporte dans le lexique les décisions o/n du fichier de revue ; les lignes décidées en sont retirées."""
+    lignes = read_review_file(path)
+    # Une ligne raccourcie à la main n'a pas de 'decision' (None avec csv.DictReader)
+    decidees = [ligne for ligne in lignes if (ligne.get('decision') or '').strip().lower() in ('o', 'n')]
+    if not decidees:
+        return 0
+    for ligne in decidees:
+        lexique[ligne['type']][ligne['terme']] = (ligne.get('decision') or '').strip().lower() == 'o'
+    save_lexicon(lexique, path_lexique)
+    restantes = [ligne for ligne in lignes if ligne not in decidees]
+    write_review_rows(restantes, path)
+    print(f"📥 {len(decidees)} décisions importées depuis {path}")
+    return len(decidees)
+
+def tokens_from_doc(doc, lexique, garder_inconnus=False):
+    """Tokenisation automatique d'après le lexique (mêmes sorties que l'ancien semantic_tokenizer)."""
+    tokens = [chunk.text for chunk in doc.noun_chunks
+              if len(chunk.text.split()) > 1
+              and lexique['expressions'].get(chunk.text.lower(), garder_inconnus)]
+    tokens += [token.lemma_ for token in doc
+               if not (token.is_punct or token.is_stop or token.is_space)
+               and lexique['lemmes'].get(token.lemma_.lower(), garder_inconnus)]
+    tokens += [token.text for token in doc if token.is_punct and token.text in PONCTUATION_GARDEE]
+    return tokens
+
+def word_tokens(doc):
+    """Tokens spaCy regroupés par mot (séparé par des espaces) : {mot: [tokens]}."""
+    mots = {}
+    courant = []
+    for token in doc:
+        courant.append(token)
+        if token.whitespace_ or token.i == len(doc) - 1:
+            mot = ''.join(t.text_with_ws for t in courant).strip()
+            if mot:
+                mots.setdefault(mot, courant)
+            courant = []
+    return mots
+
+def normalize_word(mot):
+    return mot.strip(string.punctuation + '«»“”’').lower()
+
+class SemanticTokenizer:
+    """
+    Tokenizer pour CountVectorizer : les textes préparés avec prepare() (nlp.pipe en lots)
+    sont servis depuis un dictionnaire. Les autres textes, en particulier les concaténations
+    de documents d'un même topic construites par le c-TF-IDF de BERTopic, ne sont pas
+    réanalysés par spaCy : chaque mot est cherché dans les lemmes mis en cache par prepare(),
+    à défaut directement dans le lexique, et les expressions retenues par le lexique sont
+    repérées mot à mot.
+    """
+
+    def __init__(self, nlp, lexique, garder_inconnus=False):
+        self.nlp = nlp
+        self.lexique = lexique
+        self.garder_inconnus = garder_inconnus
+        self.tokens = {}
+        self.mots = {}
+        self._index_expressions()
+
+    def _index_expressions(self):
+        self.expressions = {cle for cle, garder in self.lexique['expressions'].items() if garder}
+        self.longueur_max = max((len(cle.split()) for cle in self.expressions), default=0)
+
+    def __getstate__(self):
+        # Ni le pipeline spaCy ni les caches ne sont sérialisés avec le modèle BERTopic
+        etat = self.__dict__.copy()
+        etat.update(nlp=None, tokens={}, mots={})
+        return etat
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self._index_expressions()
+
+    def prepare(self, texts, docs=None):
+        if docs is None:
+            docs = self.nlp.pipe(texts)
+        for text, doc in zip(texts, docs):
+            self.tokens[text] = tokens_from_doc(doc, self.lexique, self.garder_inconnus)
+            for mot, tokens in word_tokens(doc).items():
+                self.mots.setdefault(mot, self._tokens_mot(tokens))
+
+    def _tokens_mot(self, tokens):
+        """Sorties d'un mot analysé par spaCy : lemmes retenus et ponctuation gardée."""
+        sorties = [token.lemma_ for token in tokens
+                   if not (token.is_punct or token.is_stop or token.is_space)
+                   and self.lexique['lemmes'].get(token.lemma_.lower(), self.garder_inconnus)]
+        return sorties + [token.text for token in tokens if token.is_punct and token.text in PONCTUATION_GARDEE]
+
+    def _tokens_inconnu(self, mot):
+        """Mot jamais vu par prepare() : simple recherche dans le lexique, sans spaCy."""
+        cle = normalize_word(mot)
+        garder = cle and cle not in STOP_WORDS and self.lexique['lemmes'].get(cle, self.garder_inconnus)
+        sorties = [cle] if garder else []
+        return sorties + [p for p in PONCTUATION_GARDEE if mot.endswith(p)][:1]
+
+    def _expressions(self, mots):
+        """Expressions retenues du lexique, repérées de la plus longue à la plus courte."""
+        cles = [normalize_word(mot) for mot in mots]
+        trouvees = []
+        i = 0
+        while i < len(mots):
+            for n in range(min(self.longueur_max, len(mots) - i), 1, -1):
+                if ' '.join(cles[i:i + n]) in self.expressions:
+                    trouvees.append(' '.join(mots[i:i + n]).strip(string.punctuation))
+                    i += n
+                    break
+            else:
+                i += 1
+        return trouvees
+
+    def __call__(self, text):
+        if text in self.tokens:
+            return self.tokens[text]
+        mots = text.split()
+        tokens = self._expressions(mots) if self.expressions else []
+        for mot in mots:
+            if mot not in self.mots:
+                self.mots[mot] = self._tokens_inconnu(mot)
+            tokens += self.mots[mot]
+        return tokens
@@ -0,0 +1,198 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import re
+
+import numpy as np
+
+DOSSIER_EMBEDDINGS = 'Donnees/embeddings'
+TAILLE_LOT = 32
+TAILLE_LIGNE_CLE = 65  # empreinte SHA-256 hexadécimale et saut de ligne
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def model_dir(racine, model_id, dtype):
+    """Un sous-dossier par (modèle, type) : nom lisible suivi d'une empreinte de l'identifiant."""
+    lisible = re.sub(r'[^A-Za-z0-9._-]+', '_', model_id)[-40:]
+    return os.path.join(racine, f"{lisible}-{np.dtype(dtype).name}-{text_hash(model_id)[:10]}")
+
+def read_keys(chemin_cles):
+    """Clés du magasin, une par ligne ; une dernière ligne incomplète (écriture interrompue) est ignorée."""
+    if not os.path.exists(chemin_cles):
+        return []
+    with open(chemin_cles, 'rb') as f:
+        contenu = f.read()
+    complet = len(contenu) // TAILLE_LIGNE_CLE * TAILLE_LIGNE_CLE
+    return contenu[:complet].decode('ascii').split()
+
+class EmbeddingStore:
+    """
+    Magasin d'embeddings adressé par contenu pour un modèle donné.
+    Les vecteurs sont ajoutés à la suite dans `vecteurs.bin` (float32 ou float16) et lus
+    par np.memmap ; `cles.txt` donne, ligne à ligne, l'empreinte SHA-256 du texte de chaque
+    vecteur et n'est lui aussi qu'étendu. `index.json` ne contient que le modèle, le type et la dimension.
+    Un seul processus doit écrire à la fois dans un même magasin.
+    """
+
+    def __init__(self, model_id, racine=DOSSIER_EMBEDDINGS, dtype='float32'):
+        self.model_id = model_id
+        self.dtype = np.dtype(dtype)
+        self.dossier = model_dir(racine, model_id, self.dtype)
+        self.chemin_vecteurs = os.path.join(self.dossier, 'vecteurs.bin')
+        self.chemin_index = os.path.join(self.dossier, 'index.json')
+        self.chemin_cles = os.path.join(self.dossier, 'cles.txt')
+        os.makedirs(self.dossier, exist_ok=True)
+        self.cles, self.dim = [], None
+        if os.path.exists(self.chemin_index):
+            with open(self.chemin_index, encoding='utf-8') as f:
+                self.dim = json.load(f)['dim']
+            self.cles = read_keys(self.chemin_cles)
+        self.lignes = {cle: ligne for ligne, cle in enumerate(self.cles)}
+        self._ouvrir()
+
+    def _ouvrir(self):
+        """Projette en mémoire les lignes référencées par l'index (sans lecture du fichier)."""
+        if self.cles:
+            self.vecteurs = np.memmap(self.chemin_vecteurs, dtype=self.dtype, mode='r',
+                                      shape=(len(self.cles), self.dim))
+        else:
+            self.vecteurs = np.empty((0, self.dim or 0), dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.cles)
+
+    def lookup(self, texts):
+        """Ligne de chaque texte dans le magasin, -1 s'il n'a pas encore été encodé."""
+        return np.array([self.lignes.get(text_hash(text), -1) for text in texts], dtype=np.int64)
+
+    def add(self, texts, vecteurs):
+        """Ajoute à la suite les vecteurs des textes absents du magasin, puis leurs clés."""
+        vecteurs = np.asarray(vecteurs, dtype=self.dtype)
+        nouveaux = {}
+        for text, vecteur in zip(texts, vecteurs):
+            cle = text_hash(text)
+            if cle not in self.lignes and cle not in nouveaux:
+                nouveaux[cle] = vecteur
+        if not nouveaux:
+            return
+        if self.dim is None:
+            self.dim = vecteurs.shape[1]
+        elif vecteurs.shape[1] != self.dim:
+            raise ValueError(f"Dimension {vecteurs.shape[1]} incompatible avec le magasin ({self.dim})")
+
+        # Les octets écrits après le dernier index valide (écriture interrompue) sont écrasés
+        taille_valide = len(self.cles) * self.dim * self.dtype.itemsize
+        with open(self.chemin_vecteurs, 'ab') as f:
+            f.truncate(taille_valide)
+            f.write(np.ascontiguousarray(np.stack(list(nouveaux.values()))).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        # Clés écrites après les vecteurs : une clé présente a toujours son vecteur
+        with open(self.chemin_cles, 'ab') as f:
+            f.truncate(len(self.cles) * TAILLE_LIGNE_CLE)
+            f.write(''.join(f"{cle}\n" for cle in nouveaux).encode('ascii'))
+            f.flush()
+            os.fsync(f.fileno())
+        if not os.path.exists(self.chemin_index):
+            temporaire = self.chemin_index + '.tmp'
+            with open(temporaire, 'w', encoding='utf-8') as f:
+                json.dump({'model_id': self.model_id, 'dtype': self.dtype.name, 'dim': self.dim}, f)
+            os.replace(temporaire, self.chemin_index)
+
+        self.lignes.update((cle, ligne) for ligne, cle in enumerate(nouveaux, start=len(self.cles)))
+        self.cles.extend(nouveaux)
+        self._ouvrir()
+
+    def vectors(self, lignes):
+        """
+        Vecteurs des lignes demandées. Si elles se suivent (cas d'un corpus relu dans le même
+        ordre), le résultat est une vue du memmap, sans copie ; sinon une copie rassemblée.
+        """
+        lignes = np.asarray(lignes)
+        if len(lignes) and np.array_equal(np.diff(lignes), np.ones(len(lignes) - 1)):
+            return self.vecteurs[lignes[0]:lignes[-1] + 1]
+        return self.vecteurs[lignes]
+
+def _encoder(model, batch_size):
+    """Fonction textes -> matrice pour un nom de modèle SentenceTransformer, un objet .encode ou une fonction."""
+    if isinstance(model, str):
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model)
+    if hasattr(model, 'encode'):
+        return lambda textes: model.encode(textes, batch_size=batch_size, convert_to_numpy=True)
+    return model
+
+def get_embeddings(texts, model, model_id=None, racine=DOSSIER_EMBEDDINGS, dtype='float32',
+                   batch_size=TAILLE_LOT, store=None):
+    """
+    Embeddings des textes, calculés une seule fois par (modèle, texte).
+    `model` est un nom SentenceTransformer (chargé seulement s'il reste des textes à encoder),
+    un objet doté de .encode(textes) ou une fonction textes -> matrice ; `model_id` est alors obligatoire.
+    Renvoie une matrice (len(texts), dim), vue du memmap quand les lignes sont contiguës.
+    """
+    if model_id is None:
+        if not isinstance(model, str):
+            raise ValueError("model_id est obligatoire quand le modèle n'est pas désigné par son nom")
+        model_id = model
+    if store is None:
+        store = EmbeddingStore(model_id, racine, dtype)
+
+    lignes = store.lookup(texts)
+    manquants = list(dict.fromkeys(text for text, ligne in zip(texts, lignes) if ligne < 0))
+    deja_encodes = len(set(texts)) - len(manquants)
+    if manquants:
+        store.add(manquants, _encoder(model, batch_size)(manquants))
+        lignes = store.lookup(texts)
+    print(f"🧠 Embeddings {model_id} : {deja_encodes} textes déjà encodés, "
+          f"{len(manquants)} encodés ({len(store)} dans le magasin)")
+    return store.vectors(lignes)
+
+def import_pickle(chemin_pkl, texts, model_id, racine=DOSSIER_EMBEDDINGS, dtype='float32'):
+    """
+    Reprend un ancien cache pickle (matrice alignée sur `texts`, comme embeddings_cache.pkl)
+    dans le magasin, pour ne pas réencoder ces textes.
+    """
+    with open(chemin_pkl, 'rb') as f:
+        vecteurs = np.asarray(pickle.load(f))
+    if len(vecteurs) != len(texts):
+        raise ValueError(f"{len(vecteurs)} vecteurs pour {len(texts)} textes dans {chemin_pkl}")
+    store = EmbeddingStore(model_id, racine, dtype)
+    store.add(texts, vecteurs)
+    print(f"📦 {len(vecteurs)} vecteurs importés de {chemin_pkl} dans {store.dossier}")
+    return store
+
+def main():
+    parser = argparse.ArgumentParser(description="Magasin d'embeddings adressé par contenu.")
+    parser.add_argument('--racine', default=DOSSIER_EMBEDDINGS)
+    commandes = parser.add_subparsers(dest='commande', required=True)
+    commandes.add_parser('info', help="Modèles présents et nombre de vecteurs")
+    importer = commandes.add_parser('importer', help="Importer un ancien cache pickle aligné sur des textes")
+    importer.add_argument('pickle')
+    importer.add_argument('textes', help="Fichier texte, un document par ligne, dans l'ordre du pickle")
+    importer.add_argument('--modele', default='all-MiniLM-L6-v2')
+    importer.add_argument('--dtype', default='float32', choices=['float32', 'float16'])
+    args = parser.parse_args()
+
+    if args.commande == 'importer':
+        with open(args.textes, encoding='utf-8') as f:
+            textes = f.read().splitlines()
+        import_pickle(args.pickle, textes, args.modele, args.racine, args.dtype)
+        return
+
+    for nom in sorted(os.listdir(args.racine)) if os.path.isdir(args.racine) else []:
+        chemin_index = os.path.join(args.racine, nom, 'index.json')
+        if os.path.exists(chemin_index):
+            with open(chemin_index, encoding='utf-8') as f:
+                index = json.load(f)
+            n_vecteurs = len(read_keys(os.path.join(args.racine, nom, 'cles.txt')))
+            taille = os.path.getsize(os.path.join(args.racine, nom, 'vecteurs.bin')) / 1e6
+            print(f"{index['model_id']:<40} {index['dtype']:<8} {n_vecteurs:>8} × {index['dim']} "
+                  f"({taille:.1f} Mo)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+import re
+import time
+
+import pandas as pd
+import torch
+from transformers import MarianMTModel, MarianTokenizer
+
+from cache_traduction import cache_key, cache_lookup, cache_store
+from detection_langue import SEUIL_CONFIANCE, route_languages
+
+MODEL_NAME = 'Helsinki-NLP/opus-mt-mul-en'
+TAILLE_LOT = 16
+GENERATION_PARAMS = {}  # transmis à model.generate et inclus dans la clé de cache
+MAX_TOKENS_SEGMENT = 500  # marge sous la limite de 512 positions du modèle Marian
+
+# Fin de phrase : ponctuation forte suivie d'espaces, ou saut de ligne
+FIN_DE_PHRASE = re.compile(r'(?<=[.!?…])\s+|\n+')
+
+
+def load_model(name=MODEL_NAME, quantize=False):
+    """
+    Charge le tokenizer et le modèle MarianMT en mode évaluation.
+    Avec quantize=True, le modèle est quantifié en int8 (voir quantification.py).
+    """
+    tokenizer = MarianTokenizer.from_pretrained(name)
+    model = MarianMTModel.from_pretrained(name)
+    model.eval()
+    if quantize:
+        from quantification import quantize_model
+        model = quantize_model(model)
+    return tokenizer, model
+
+def collect_cells(df, colonnes):
+    """Rassemble les cellules non vides de toutes les colonnes sous forme (ligne, colonne, texte)."""
+    cellules = []
+    for col in colonnes:
+        for idx, valeur in df[col].items():
+            if pd.isnull(valeur) or not str(valeur).strip():
+                continue
+            cellules.append((idx, col, str(valeur)))
+    return cellules
+
+def translate_batch(texts, tokenizer, model, batch_size=TAILLE_LOT):
+    """
+    Traduit une liste de textes par lots triés par longueur en tokens.
+    Chaque lot n'est complété (padding) que jusqu'à son plus long élément ;
+    les traductions sont renvoyées dans l'ordre d'origine (None si le lot a échoué).
+    """
+    resultats = [None] * len(texts)
+    if not texts:
+        return resultats
+
+    longueurs = [len(ids) for ids in tokenizer(list(texts), truncation=True)['input_ids']]
+    ordre = sorted(range(len(texts)), key=longueurs.__getitem__)
+
+    with torch.inference_mode():
+        for debut in range(0, len(ordre), batch_size):
+            lot = ordre[debut:debut + batch_size]
+            try:
+                inputs = tokenizer([texts[i] for i in lot], return_tensors="pt", padding=True, truncation=True)
+                outputs = model.generate(**inputs, **GENERATION_PARAMS)
+                traductions = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+            except Exception as e:
+                print(f"⚠️ Lot de {len(lot)} textes non traduit : {e}")
+                continue
+            for i, traduction in zip(lot, traductions):
+                resultats[i] = traduction
+    return resultats
+
+def split_sentences(text):
+    """Découpe un texte en phrases sur la ponctuation forte et les sauts de ligne."""
+    return [phrase.strip() for phrase in FIN_DE_PHRASE.split(text) if phrase.strip()]
+
+def chunk_text(text, tokenizer, max_tokens=MAX_TOKENS_SEGMENT):
+    """
+    Regroupe les phrases d'un texte en segments de moins de max_tokens tokens,
+    dans l'ordre. Une phrase plus longue que la limite est coupée en fenêtres de tokens.
+    Renvoie la liste des segments et leur nombre total de tokens.
+    """
+    phrases = split_sentences(text)
+    if not phrases:
+        return [], 0
+    longueurs = [len(ids) for ids in tokenizer(phrases, add_special_tokens=False)['input_ids']]
+
+    segments = []
+    courant, taille = [], 0
+    for phrase, n in zip(phrases, longueurs):
+        if courant and taille + n > max_tokens:
+            segments.append(' '.join(courant))
+            courant, taille = [], 0
+        if n > max_tokens:
+            pieces = tokenizer.tokenize(phrase)
+            segments.extend(tokenizer.convert_tokens_to_string(pieces[i:i + max_tokens])
+                            for i in range(0, len(pieces), max_tokens))
+            continue
+        courant.append(phrase)
+        taille += n
+    if courant:
+        segments.append(' '.join(courant))
+    return segments, sum(longueurs)
+
+def translate_chunked(texts, tokenizer, model, batch_size=TAILLE_LOT, max_tokens=MAX_TOKENS_SEGMENT):
+    """
+    Traduit des textes complets sans troncature : les segments de tous les textes
+    passent ensemble dans translate_batch, puis chaque texte est réassemblé dans l'ordre.
+    Renvoie les traductions (None si un segment a échoué), le nombre de segments
+    par texte et le nombre total de tokens source.
+    """
+    decoupages = [chunk_text(texte, tokenizer, max_tokens) for texte in texts]
+    tous_segments = [segment for segments, _ in decoupages for segment in segments]
+    traduits = translate_batch(tous_segments, tokenizer, model, batch_size)
+
+    resultats = []
+    position = 0
+    for segments, _ in decoupages:
+        morceaux = traduits[position:position + len(segments)]
+        position += len(segments)
+        resultats.append(None if any(m is None for m in morceaux) else ' '.join(morceaux))
+    n_segments = [len(segments) for segments, _ in decoupages]
+    return resultats, n_segments, sum(n_tokens for _, n_tokens in decoupages)
+
+def effective_params(model, max_tokens=None):
+    """
+    Paramètres qui déterminent une traduction, pour la clé de cache : GENERATION_PARAMS,
+    la limite de découpage en segments et la quantification int8 du modèle.
+    """
+    params = dict(GENERATION_PARAMS)
+    if max_tokens is not None:
+        params['max_tokens_segment'] = max_tokens
+    if getattr(model, 'quantifie_int8', False):
+        params['int8'] = True
+    return params
+
+def translation_key(text, model, params):
+    """Clé de cache d'une traduction ; params vient de effective_params."""
+    return cache_key(text, getattr(model, 'name_or_path', MODEL_NAME), params)
+
+def translate_texts(texts, tokenizer, model, batch_size=TAILLE_LOT, cache=None, max_tokens=None,
+                    seuil=SEUIL_CONFIANCE, traduire_incertains=True):
+    """
+    Traduit chaque texte distinct une seule fois. Le cache sur disque, s'il est
+    fourni, est consulté avant toute détection de langue ; les textes absents
+    passent ensuite en une fois par route_languages et seuls ceux marqués non
+    anglais sont envoyés au modèle.
+    Avec max_tokens, les textes sont découpés en segments (voir translate_chunked)
+    au lieu d'être tronqués.
+    Renvoie {texte: traduction} pour les textes traduits et les statistiques.
+    """
+    uniques = list(dict.fromkeys(texts))
+    traductions = {}
+    a_detecter = uniques
+    if cache is not None:
+        params = effective_params(model, max_tokens)
+        cles = {texte: translation_key(texte, model, params) for texte in uniques}
+        trouvees = cache_lookup(cache, cles.values())
+        traductions = {texte: trouvees[cles[texte]] for texte in uniques if cles[texte] in trouvees}
+        a_detecter = [texte for texte in uniques if texte not in traductions]
+
+    a_traduire, stats_langues = route_languages(a_detecter, cache, seuil, traduire_incertains)
+    stats = {'uniques': len(uniques), 'detection': stats_langues}
+    if cache is not None:
+        # Les textes anglais ou trop courts ne sont pas des misses : ils apparaissent dans 'detection'
+        stats.update(hits=len(traductions), misses=len(a_traduire))
+
+    if max_tokens is None:
+        resultats = translate_batch(a_traduire, tokenizer, model, batch_size)
+    else:
+        resultats, n_segments, n_tokens = translate_chunked(a_traduire, tokenizer, model, batch_size, max_tokens)
+        stats['segments'] = dict(zip(a_traduire, n_segments))
+        stats['tokens'] = n_tokens
+
+    nouvelles = []
+    for texte, traduction in zip(a_traduire, resultats):
+        if traduction is None:
+            continue
+        traductions[texte] = traduction
+        if cache is not None:
+            nouvelles.append((cles[texte], traduction))
+    if nouvelles:
+        cache_store(cache, nouvelles)
+    return traductions, stats
+
+def translate_dataframe(df, colonnes, tokenizer, model, batch_size=TAILLE_LOT, cache=None, max_tokens=None,
+                        seuil=SEUIL_CONFIANCE, traduire_incertains=True):
+    """
+    Traduit en une passe toutes les cellules non anglaises des colonnes données
+    et réécrit chaque traduction à sa position (ligne, colonne) d'origine.
+    Renvoie le DataFrame et un dictionnaire de statistiques.
+    """
+    debut = time.perf_counter()
+    cellules = collect_cells(df, colonnes)
+    traductions, stats = translate_texts([texte for _, _, texte in cellules], tokenizer, model,
+                                         batch_size, cache, max_tokens, seuil, traduire_incertains)
+    if 'segments' in stats:
+        segments = stats.pop('segments')
+        stats['segments_par_cellule'] = {(idx, col): segments[texte]
+                                         for idx, col, texte in cellules if texte in segments}
+    n_traduites = 0
+    for idx, col, texte in cellules:
+        if texte in traductions:
+            df.at[idx, col] = traductions[texte]
+            n_traduites += 1
+
+    stats.update({'examinees': len(cellules), 'traduites': n_traduites, 'duree': time.perf_counter() - debut})
+    return df, stats
+
+def report_throughput(label, stats):
+    """Affiche le débit (phrases/s) d'un passage de traduction, détection de langue comprise."""
+    duree = stats['duree']
+    debit = stats['traduites'] / duree if duree > 0 else 0.0
+    print(f"⏱️ {label} : {stats['examinees']} cellules examinées, {stats['traduites']} traduites "
+          f"en {duree:.1f}s ({debit:.2f} phrases/s)")
+    if 'hits' in stats:
+        print(f"   Textes distincts : {stats['uniques']} — cache : {stats['hits']} hits, {stats['misses']} misses")
+    if 'ignorees' in stats:
+        print(f"   Cellules laissées telles quelles (anglais ou trop courtes) : {stats['ignorees']}")
+    if 'detection' in stats:
+        detection = stats['detection']
+        sort_incertains = 'traduits' if detection['incertains_traduits'] else 'ignorés'
+        print(f"   Détection de langue : {stats['examinees'] - stats['traduites']} cellules laissées telles quelles, "
+              f"{detection['ignores']} textes distincts ignorés "
+              f"({detection['anglais']} anglais, {detection['trop_courts']} trop courts), "
+              f"{detection['non_anglais']} non anglais, {detection['incertains']} peu sûrs ({sort_incertains}), "
+              f"{detection['memo']} déjà mémorisés")
+    if 'segments_par_cellule' in stats:
+        decoupees = {cle: n for cle, n in stats['segments_par_cellule'].items() if n > 1}
+        print(f"   Découpage : {sum(stats['segments_par_cellule'].values())} segments, "
+              f"{stats['tokens']} tokens traduits, {len(decoupees)} cellules en plusieurs segments")
+        for (idx, col), n in sorted(decoupees.items(), key=lambda item: -item[1]):
+            print(f"     ligne {idx}, '{col}' : {n} segments")
+    return debit
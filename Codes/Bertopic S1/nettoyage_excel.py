@@ -0,0 +1,38 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+
+# Fonction pour encoder les caractères illégaux pour Excel (version caractère par caractère)
+def safe_excel_text(text):
+    if not isinstance(text, str):
+        return text
+    return ''.join(
+        f"<0x{ord(c):02x}>" if unicodedata.category(c)[0] == 'C' and c not in '\n\t' else c
+        for c in text
+    )
+
+@lru_cache(maxsize=None)
+def is_illegal(caractere):
+    """Même règle que safe_excel_text, évaluée une seule fois par caractère distinct."""
+    return unicodedata.category(caractere)[0] == 'C' and caractere not in '\n\t'
+
+def sanitize_for_excel(df):
+    """
+    Équivalent vectorisé de df.applymap(safe_excel_text).
+    Seules les colonnes texte sont parcourues. Pour chacune, l'ensemble des
+    caractères distincts sert de test rapide : une colonne propre n'est pas
+    réécrite. Sinon, une table de traduction limitée aux caractères illégaux
+    présents est appliquée avec .str.translate aux seules cellules concernées.
+    """
+    for col in df.select_dtypes(include=['object', 'string']).columns:
+        serie = df[col]
+        caracteres = set(''.join(valeur for valeur in serie if isinstance(valeur, str)))
+        illegaux = sorted(c for c in caracteres if is_illegal(c))
+        if not illegaux:
+            continue
+        table = {ord(c): f"<0x{ord(c):02x}>" for c in illegaux}
+        motif = re.compile('[' + ''.join(re.escape(c) for c in illegaux) + ']')
+        a_nettoyer = serie.str.contains(motif, na=False)
+        df.loc[a_nettoyer, col] = serie[a_nettoyer].str.translate(table)
+    return df
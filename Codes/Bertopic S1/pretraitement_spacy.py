@@ -0,0 +1,111 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+import spacy
+from spacy.lang.en.stop_words import STOP_WORDS
+
+MODEL_SPACY = 'en_core_web_sm'
+CHEMIN_CACHE = 'Donnees/cache_pretraitement.sqlite'
+TAILLE_LOT = 64
+TAILLE_REQUETE = 500  # reste sous la limite de variables d'une requête SQLite
+
+# Composants inutiles pour la lemmatisation (le lemmatiseur n'a besoin que du tagger)
+COMPOSANTS_INUTILES = ['parser', 'ner']
+CUSTOM_STOP_WORDS = ['artist', 'art', 'space', 'contemporary', 'exhibition', 'place', 'work', 'project']
+
+
+def load_nlp(name=MODEL_SPACY):
+    """Charge le modèle spaCy sans parser ni NER (téléchargé au besoin)."""
+    try:
+        return spacy.load(name, disable=COMPOSANTS_INUTILES)
+    except OSError:
+        from spacy.cli import download
+        download(name)
+        return spacy.load(name, disable=COMPOSANTS_INUTILES)
+
+def all_stop_words(custom=CUSTOM_STOP_WORDS):
+    return frozenset(STOP_WORDS).union(custom)
+
+def clean_doc(doc, stop_words):
+    """
+    Lemmes des tokens alphabétiques, en écartant en une seule passe les mots vides
+    (sur la forme du token comme sur son lemme, comme l'ancien remove_stop_words).
+    """
+    return ' '.join(token.lemma_ for token in doc
+                    if token.is_alpha and token.lower_ not in stop_words and token.lemma_ not in stop_words)
+
+def open_cache(path=CHEMIN_CACHE):
+    """Ouvre (ou crée) le cache des textes nettoyés sur disque."""
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('''
+    CREATE TABLE IF NOT EXISTS pretraitements (
+        cle TEXT PRIMARY KEY,
+        texte TEXT NOT NULL
+    );
+    ''')
+    conn.commit()
+    return conn
+
+def params_key(nlp, stop_words):
+    """Empreinte du modèle spaCy (nom et version) et des mots vides, calculée une fois par exécution."""
+    modele = f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+    contenu = json.dumps([modele, sorted(stop_words)], ensure_ascii=False)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+def cache_key(text, empreinte_params):
+    """Empreinte SHA-256 du texte et des paramètres de prétraitement."""
+    return hashlib.sha256(f"{empreinte_params}\n{text}".encode('utf-8')).hexdigest()
+
+def cache_lookup(conn, keys):
+    """Renvoie {clé: texte nettoyé} pour les clés déjà présentes dans le cache."""
+    keys = list(keys)
+    trouves = {}
+    for debut in range(0, len(keys), TAILLE_REQUETE):
+        partie = keys[debut:debut + TAILLE_REQUETE]
+        trouves.update(conn.execute(f"SELECT cle, texte FROM pretraitements WHERE cle IN "
+                                    f"({','.join('?' * len(partie))})", partie))
+    return trouves
+
+def cache_store(conn, items):
+    """Enregistre une liste de couples (clé, texte nettoyé)."""
+    conn.executemany('INSERT OR REPLACE INTO pretraitements (cle, texte) VALUES (?, ?)', items)
+    conn.commit()
+
+def preprocess_texts(texts, nlp, batch_size=TAILLE_LOT, n_process=1, cache=None, stop_words=None):
+    """
+    Nettoie une liste de textes avec nlp.pipe : minuscules, lemmes alphabétiques, sans mots vides.
+    Les textes identiques ne sont traités qu'une fois ; avec un cache, les textes déjà
+    nettoyés lors d'une exécution précédente ne repassent pas dans spaCy.
+    Renvoie (textes nettoyés dans l'ordre d'entrée, statistiques).
+    """
+    debut = time.perf_counter()
+    stop_words = all_stop_words() if stop_words is None else stop_words
+    uniques = list(dict.fromkeys(text.lower() for text in texts if text))
+
+    cles = {}
+    nettoyes = {}
+    if cache is not None:
+        empreinte_params = params_key(nlp, stop_words)
+        cles = {text: cache_key(text, empreinte_params) for text in uniques}
+        connus = cache_lookup(cache, cles.values())
+        nettoyes = {text: connus[cle] for text, cle in cles.items() if cle in connus}
+
+    a_traiter = [text for text in uniques if text not in nettoyes]
+    for text, doc in zip(a_traiter, nlp.pipe(a_traiter, batch_size=batch_size, n_process=n_process)):
+        nettoyes[text] = clean_doc(doc, stop_words)
+    if cache is not None and a_traiter:
+        cache_store(cache, [(cles[text], nettoyes[text]) for text in a_traiter])
+
+    resultat = [nettoyes[text.lower()] if text else '' for text in texts]
+    stats = {'documents': len(texts), 'uniques': len(uniques), 'hits': len(uniques) - len(a_traiter),
+             'traites': len(a_traiter), 'duree': time.perf_counter() - debut}
+    return resultat, stats
+
+def report_throughput(stats):
+    duree = max(stats['duree'], 1e-9)
+    print(f"🧹 Prétraitement : {stats['documents']} documents en {stats['duree']:.2f}s "
+          f"({stats['documents'] / duree:.1f} docs/s) — {stats['uniques']} textes distincts, "
+          f"{stats['hits']} déjà en cache, {stats['traites']} passés dans spaCy")
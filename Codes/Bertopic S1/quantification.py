@@ -0,0 +1,159 @@
+import argparse
+import io
+import random
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import torch
+
+
+def conv1d_to_linear(model):
+    """
+    Remplace les couches Conv1D de transformers (GPT-2) par des nn.Linear
+    équivalentes, seules couches prises en charge par quantize_dynamic.
+    """
+    from transformers.pytorch_utils import Conv1D
+
+    for nom, module in list(model.named_children()):
+        if isinstance(module, Conv1D):
+            entree, sortie = module.weight.shape
+            lineaire = torch.nn.Linear(entree, sortie)
+            lineaire.weight.data = module.weight.data.t().contiguous()
+            lineaire.bias.data = module.bias.data
+            setattr(model, nom, lineaire)
+        else:
+            conv1d_to_linear(module)
+    return model
+
+def quantize_model(model):
+    """Quantification dynamique int8 des couches linéaires pour l'inférence sur CPU."""
+    model = conv1d_to_linear(model)
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.quantifie_int8 = True  # pris en compte dans la clé du cache de traductions
+    model.eval()
+    return model
+
+def model_size_mb(model):
+    """Taille du state_dict sérialisé, en Mo."""
+    tampon = io.BytesIO()
+    torch.save(model.state_dict(), tampon)
+    return tampon.tell() / 1e6
+
+def chrf(hypotheses, references, ordre_max=6, beta=2):
+    """chrF au niveau du corpus (n-grammes de caractères, espaces ignorés)."""
+    precisions, rappels = [], []
+    for n in range(1, ordre_max + 1):
+        communs = total_hyp = total_ref = 0
+        for hyp, ref in zip(hypotheses, references):
+            hyp, ref = hyp.replace(' ', ''), ref.replace(' ', '')
+            ngrams_hyp = Counter(hyp[i:i + n] for i in range(len(hyp) - n + 1))
+            ngrams_ref = Counter(ref[i:i + n] for i in range(len(ref) - n + 1))
+            communs += sum((ngrams_hyp & ngrams_ref).values())
+            total_hyp += sum(ngrams_hyp.values())
+            total_ref += sum(ngrams_ref.values())
+        precisions.append(communs / total_hyp if total_hyp else 0.0)
+        rappels.append(communs / total_ref if total_ref else 0.0)
+    p, r = np.mean(precisions), np.mean(rappels)
+    if p + r == 0:
+        return 0.0
+    return 100 * (1 + beta ** 2) * p * r / (beta ** 2 * p + r)
+
+def translation_scores(hypotheses, references):
+    """Scores BLEU/chrF (sacrebleu si installé, sinon chrF interne)."""
+    try:
+        import sacrebleu
+        return {'bleu': sacrebleu.corpus_bleu(hypotheses, [references]).score,
+                'chrf': sacrebleu.corpus_chrf(hypotheses, [references]).score}
+    except ImportError:
+        return {'chrf': chrf(hypotheses, references)}
+
+def cosine_similarities(a, b):
+    """Similarité cosinus ligne à ligne entre deux matrices d'embeddings."""
+    a = a / np.maximum(np.linalg.norm(a, axis=1, keepdims=True), 1e-12)
+    b = b / np.maximum(np.linalg.norm(b, axis=1, keepdims=True), 1e-12)
+    return (a * b).sum(axis=1)
+
+def timed(fonction, *args):
+    debut = time.perf_counter()
+    resultat = fonction(*args)
+    return resultat, time.perf_counter() - debut
+
+def print_comparison(nom, duree_fp32, duree_int8, taille_fp32, taille_int8, scores):
+    print(f"\n=== {nom} : fp32 vs int8 ===")
+    print(f"Temps    : {duree_fp32:.2f}s -> {duree_int8:.2f}s (accélération x{duree_fp32 / max(duree_int8, 1e-9):.2f})")
+    print(f"Taille   : {taille_fp32:.0f} Mo -> {taille_int8:.0f} Mo "
+          f"(gain {100 * (1 - taille_int8 / taille_fp32):.0f} %)")
+    for cle, valeur in scores.items():
+        print(f"{cle:<9}: {valeur:.4f}")
+
+def compare_translation(textes, batch_size):
+    """Compare les traductions du modèle Marian fp32 et int8 sur un échantillon."""
+    from moteur_traduction import load_model, translate_batch
+
+    tokenizer, model_fp32 = load_model()
+    taille_fp32 = model_size_mb(model_fp32)
+    references, duree_fp32 = timed(translate_batch, textes, tokenizer, model_fp32, batch_size)
+    model_int8 = quantize_model(model_fp32)
+    hypotheses, duree_int8 = timed(translate_batch, textes, tokenizer, model_int8, batch_size)
+
+    paires = [(h, r) for h, r in zip(hypotheses, references) if h is not None and r is not None]
+    scores = translation_scores([h for h, _ in paires], [r for _, r in paires])
+    scores['identiques'] = np.mean([h == r for h, r in paires]) if paires else 0.0
+    print_comparison("Traduction MarianMT", duree_fp32, duree_int8, taille_fp32, model_size_mb(model_int8), scores)
+    return references
+
+def encode_mean(textes, tokenizer, model, batch_size=16):
+    """Embeddings moyennés sur les tokens réels (masque d'attention)."""
+    vecteurs = []
+    with torch.inference_mode():
+        for debut in range(0, len(textes), batch_size):
+            inputs = tokenizer(textes[debut:debut + batch_size], return_tensors='pt',
+                               padding=True, truncation=True, max_length=512)
+            etats = model(**inputs).last_hidden_state
+            masque = inputs['attention_mask'].unsqueeze(-1).to(etats.dtype)
+            vecteurs.append(((etats * masque).sum(dim=1) / masque.sum(dim=1).clamp(min=1)).numpy())
+    return np.vstack(vecteurs)
+
+def compare_encoder(nom, tokenizer, model_fp32, textes):
+    """Compare les embeddings d'un encodeur fp32 et de sa version int8 (cosinus)."""
+    taille_fp32 = model_size_mb(model_fp32)
+    fp32, duree_fp32 = timed(encode_mean, textes, tokenizer, model_fp32)
+    model_int8 = quantize_model(model_fp32)
+    int8, duree_int8 = timed(encode_mean, textes, tokenizer, model_int8)
+    similarites = cosine_similarities(fp32, int8)
+    print_comparison(nom, duree_fp32, duree_int8, taille_fp32, model_size_mb(model_int8),
+                     {'cos_moy': similarites.mean(), 'cos_min': similarites.min()})
+
+def main():
+    parser = argparse.ArgumentParser(description="Contrôle qualité de la quantification int8 sur CPU.")
+    parser.add_argument('--fichier', default='Donnees/fichier_a_jour.csv')
+    parser.add_argument('--echantillon', type=int, default=50, help="Nombre de cellules comparées")
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--encodeurs', action='store_true',
+                        help="Compare aussi les encodeurs BERT et GPT-2 sur les traductions obtenues")
+    args = parser.parse_args()
+
+    from moteur_traduction import collect_cells
+
+    df = pd.read_csv(args.fichier, sep=';')
+    colonnes = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+    textes = [texte for _, _, texte in collect_cells(df, colonnes)]
+    random.Random(42).shuffle(textes)
+    textes = textes[:args.echantillon]
+
+    traductions = compare_translation(textes, args.batch_size)
+
+    if args.encodeurs:
+        from transformers import BertModel, BertTokenizer, GPT2Model, GPT2Tokenizer
+
+        anglais = [t for t in traductions if t]
+        compare_encoder("BERT (bert-base-uncased)", BertTokenizer.from_pretrained('bert-base-uncased'),
+                        BertModel.from_pretrained('bert-base-uncased').eval(), anglais)
+        tokenizer_gpt2 = GPT2Tokenizer.from_pretrained('gpt2')
+        tokenizer_gpt2.pad_token = tokenizer_gpt2.eos_token
+        compare_encoder("GPT-2", tokenizer_gpt2, GPT2Model.from_pretrained('gpt2').eval(), anglais)
+
+if __name__ == '__main__':
+    main()
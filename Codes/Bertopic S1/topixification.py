@@ -1,49 +1,43 @@
+import argparse
+
 import pandas as pd
 from bertopic import BERTopic
-import spacy
-
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
 
-custom_stop_words = ['artist', 'art', 'space', 'contemporary', 'exhibition', 'place', 'work', 'project']
-for word in custom_stop_words:
-    nlp.vocab[word].is_stop = True
+from pretraitement_spacy import TAILLE_LOT, load_nlp, open_cache, preprocess_texts, report_throughput
 
-def preprocess_text(text):
-    if not text:
-        return ''
-    doc = nlp(text.lower())
-    tokens = [token.lemma_ for token in doc if token.is_alpha and not token.is_stop]
-    return ' '.join(tokens)
 
-df = pd.read_excel('Donnees/fichier_traduit.xlsx')
-colonnes_a_combiner = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+def main():
+    parser = argparse.ArgumentParser(description="Topics BERTopic sur les textes traduits des espaces.")
+    parser.add_argument('--batch-size', type=int, default=TAILLE_LOT, help="Textes par lot pour nlp.pipe")
+    parser.add_argument('--n-process', type=int, default=1, help="Processus spaCy pour nlp.pipe")
+    parser.add_argument('--no-cache', action='store_true', help="Ne pas réutiliser les textes déjà nettoyés")
+    args = parser.parse_args()
 
-df['combined_text'] = df[colonnes_a_combiner].fillna('').apply(lambda row: ' '.join(row).strip(), axis=1)
+    nlp = load_nlp()
 
-df = df[df['combined_text'] != '']
+    df = pd.read_excel('Donnees/fichier_traduit.xlsx')
+    colonnes_a_combiner = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
 
-df['cleaned_text'] = df['combined_text'].apply(preprocess_text)
+    df['combined_text'] = df[colonnes_a_combiner].fillna('').apply(lambda row: ' '.join(row).strip(), axis=1)
 
-all_stop_words = set(spacy.lang.en.stop_words.STOP_WORDS).union(custom_stop_words)
+    df = df[df['combined_text'] != ''].copy()
 
-def remove_stop_words(text):
-    return ' '.join([word for word in text.split() if word not in all_stop_words])
+    cache = None if args.no_cache else open_cache()
+    df['cleaned_text'], stats = preprocess_texts(df['combined_text'].tolist(), nlp, batch_size=args.batch_size,
+                                                 n_process=args.n_process, cache=cache)
+    report_throughput(stats)
 
-df['cleaned_text'] = df['cleaned_text'].apply(remove_stop_words)
+    topic_model = BERTopic()
+    topics, probs = topic_model.fit_transform(df['cleaned_text'].tolist())
 
-topic_model = BERTopic()
-topics, probs = topic_model.fit_transform(df['cleaned_text'].tolist())
+    df['topic'] = topics
+    df['topic_probability'] = probs
 
-df['topic'] = topics
-df['topic_probability'] = probs
+    df.to_excel('Donnees/topics_results.xlsx', index=False)
+    topic_model.save("Donnees/bertopic_model")
 
-df.to_excel('Donnees/topics_results.xlsx', index=False)
-topic_model.save("Donnees/bertopic_model")
+    topic_info = topic_model.get_topic_info()
+    topic_info.to_excel('Donnees/topic_info.xlsx', index=False)
 
-topic_info = topic_model.get_topic_info()
-topic_info.to_excel('Donnees/topic_info.xlsx', index=False)
+if __name__ == '__main__':
+    main()
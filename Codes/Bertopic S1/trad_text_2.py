@@ -1,65 +1,142 @@
+import argparse
+import time
+
 import pandas as pd
-from transformers import MarianMTModel, MarianTokenizer
 from langdetect import detect
-import re
-import unicodedata
-
-# Chargement du modèle de traduction
-model_name = 'Helsinki-NLP/opus-mt-mul-en'
-tokenizer = MarianTokenizer.from_pretrained(model_name)
-model = MarianMTModel.from_pretrained(model_name)
 
-# Fonction de nettoyage pour la détection de langue
-def clean_text(text):
-    text = unicodedata.normalize("NFKD", text)
-    text = re.sub(r"[^\x00-\x7F]+", " ", text)  # remplace caractères non-ASCII par un espace
-    return text.strip()
+from cache_traduction import CHEMIN_CACHE, cache_lookup, cache_store, open_cache
+from detection_langue import SEUIL_CONFIANCE, clean_text
+from nettoyage_excel import sanitize_for_excel
+from moteur_traduction import (GENERATION_PARAMS, MAX_TOKENS_SEGMENT, TAILLE_LOT, effective_params, load_model,
+                               report_throughput, translate_dataframe, translation_key)
+from traduction_parallele import DOSSIER_CHECKPOINTS, TAILLE_SHARD, translate_parallel
 
-# Fonction de traduction conditionnelle
-def translate_to_english(text, tokenizer, model):
+# Fonction de traduction conditionnelle (chemin historique, cellule par cellule)
+def translate_to_english(text, tokenizer, model, cache=None, compteurs=None):
     if not text or not isinstance(text, str):
         return text
+    if cache is not None:
+        # Même clé que le chemin par lots (int8 compris) ; ici pas de découpage en segments
+        cle = translation_key(text, model, effective_params(model))
+        trouvee = cache_lookup(cache, [cle])
+        if trouvee:
+            if compteurs is not None:
+                compteurs['hits'] += 1
+            return trouvee[cle]
     try:
         cleaned = clean_text(text)
-        if len(cleaned) < 2:
-            return text
-        if detect(cleaned) == 'en':
+        if len(cleaned) < 2 or detect(cleaned) == 'en':
+            # Cellule laissée telle quelle : ni traduite ni mise en cache, ce n'est pas un miss
+            if compteurs is not None:
+                compteurs['ignorees'] += 1
             return text
     except:
         pass
+    if cache is not None and compteurs is not None:
+        compteurs['misses'] += 1
     try:
         inputs = tokenizer(text, return_tensors="pt", truncation=True)
-        outputs = model.generate(**inputs)
-        return tokenizer.decode(outputs[0], skip_special_tokens=True)
+        outputs = model.generate(**inputs, **GENERATION_PARAMS)
+        traduction = tokenizer.decode(outputs[0], skip_special_tokens=True)
     except:
         return text
+    if cache is not None:
+        cache_store(cache, [(cle, traduction)])
+    return traduction
 
-# Fonction pour encoder les caractères illégaux pour Excel
-def safe_excel_text(text):
-    if not isinstance(text, str):
-        return text
-    return ''.join(
-        f"<0x{ord(c):02x}>" if unicodedata.category(c)[0] == 'C' and c not in '\n\t' else c
-        for c in text
-    )
+def translate_per_cell(df, colonnes, tokenizer, model, cache=None):
+    """Applique translate_to_english colonne par colonne et mesure le débit."""
+    debut = time.perf_counter()
+    stats = {'examinees': 0, 'traduites': 0}
+    compteurs = {'hits': 0, 'misses': 0, 'ignorees': 0}
+    for col in colonnes:
+        originaux = df[col].copy()
+        df[col] = df[col].apply(lambda x: translate_to_english(str(x), tokenizer, model, cache, compteurs) if pd.notnull(x) and str(x).strip() else x)
+        non_vides = originaux.notna() & originaux.astype(str).str.strip().ne('')
+        stats['examinees'] += int(non_vides.sum())
+        stats['traduites'] += int((df[col][non_vides] != originaux[non_vides].astype(str)).sum())
+    stats['duree'] = time.perf_counter() - debut
+    stats['ignorees'] = compteurs['ignorees']
+    if cache is not None:
+        stats.update(hits=compteurs['hits'], misses=compteurs['misses'], uniques=stats['examinees'])
+    return df, stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Traduction vers l'anglais des colonnes textuelles.")
+    parser.add_argument('--batch-size', type=int, default=TAILLE_LOT,
+                        help="Nombre de cellules par lot envoyé à model.generate")
+    parser.add_argument('--per-cell', action='store_true',
+                        help="Utilise l'ancien chemin cellule par cellule (comparaison de débit)")
+    parser.add_argument('--cache', default=CHEMIN_CACHE,
+                        help="Fichier SQLite du cache de traductions")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Désactive le cache de traductions sur disque")
+    parser.add_argument('--chunked', action='store_true',
+                        help="Découpe les cellules en phrases au lieu de tronquer les textes longs")
+    parser.add_argument('--max-tokens', type=int, default=MAX_TOKENS_SEGMENT,
+                        help="Taille maximale d'un segment en mode --chunked")
+    parser.add_argument('--seuil-confiance', type=float, default=SEUIL_CONFIANCE,
+                        help="Confiance minimale de la détection de langue")
+    parser.add_argument('--ignorer-incertains', action='store_true',
+                        help="Ne traduit pas les cellules dont la langue est détectée avec une confiance trop faible")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Nombre de processus de traduction (0 : traduction dans le processus principal)")
+    parser.add_argument('--torch-threads', type=int, default=None,
+                        help="Threads torch par processus (par défaut : cœurs / processus)")
+    parser.add_argument('--shard-size', type=int, default=TAILLE_SHARD,
+                        help="Nombre de lignes par shard en mode --workers")
+    parser.add_argument('--checkpoint-dir', default=DOSSIER_CHECKPOINTS,
+                        help="Dossier des shards déjà traduits")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reprend une traduction interrompue en sautant les shards déjà sauvegardés")
+    parser.add_argument('--quantize', action='store_true',
+                        help="Quantification dynamique int8 du modèle (CPU) ; voir quantification.py pour la qualité")
+    args = parser.parse_args()
+    if args.per_cell and args.chunked:
+        parser.error("--chunked n'est disponible que pour la traduction par lots")
+    if args.per_cell and args.workers:
+        parser.error("--workers n'est disponible que pour la traduction par lots")
+
+    # Chargement du modèle de traduction (chaque processus charge le sien en mode --workers)
+    if not args.workers:
+        tokenizer, model = load_model(quantize=args.quantize)
+    cache = None if args.no_cache else open_cache(args.cache)
+
+    # Chargement des données
+    file_path = 'Donnees/fichier_a_jour.csv'
+    df = pd.read_csv(file_path, sep=';')
 
-# Chargement des données
-file_path = 'Donnees/fichier_a_jour.csv'
-df = pd.read_csv(file_path, sep=';')
+    # Colonnes à traduire
+    colonnes_a_traduire = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
 
-# Colonnes à traduire
-colonnes_a_traduire = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+    # Application de la traduction
+    max_tokens = args.max_tokens if args.chunked else None
+    if args.per_cell:
+        df, stats = translate_per_cell(df, colonnes_a_traduire, tokenizer, model, cache)
+        report_throughput("Traduction cellule par cellule", stats)
+    elif args.workers:
+        df, stats = translate_parallel(df, colonnes_a_traduire, file_path, args.workers, args.torch_threads,
+                                       args.shard_size, args.checkpoint_dir, args.resume,
+                                       None if args.no_cache else args.cache, args.quantize,
+                                       batch_size=args.batch_size, max_tokens=max_tokens,
+                                       seuil=args.seuil_confiance, traduire_incertains=not args.ignorer_incertains)
+        report_throughput(f"Traduction parallèle ({args.workers} processus)", stats)
+    else:
+        df, stats = translate_dataframe(df, colonnes_a_traduire, tokenizer, model, args.batch_size, cache, max_tokens,
+                                        args.seuil_confiance, not args.ignorer_incertains)
+        report_throughput(f"Traduction par lots (taille {args.batch_size})", stats)
 
-# Application de la traduction
-for col in colonnes_a_traduire:
-    df[col] = df[col].apply(lambda x: translate_to_english(str(x), tokenizer, model) if pd.notnull(x) and x.strip() else x)
+    # Nettoyage des caractères non supportés par Excel
+    df = sanitize_for_excel(df)
 
-# Nettoyage des caractères non supportés par Excel
-df = df.applymap(safe_excel_text)
+    # Export vers Excel
+    output_path = 'Donnees/new_fichier_traduit.xlsx'
+    df.to_excel(output_path, index=False)
 
-# Export vers Excel
-output_path = 'Donnees/new_fichier_traduit.xlsx'
-df.to_excel(output_path, index=False)
+    if cache is not None:
+        cache.close()
 
-print(f"✅ Traduction terminée et sauvegardée dans '{output_path}'.")
+    print(f"✅ Traduction terminée et sauvegardée dans '{output_path}'.")
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+import torch
+
+from cache_traduction import open_cache
+from moteur_traduction import MODEL_NAME, load_model, translate_dataframe
+
+TAILLE_SHARD = 200
+DOSSIER_CHECKPOINTS = 'Donnees/checkpoints_traduction'
+
+# État propre à chaque processus de travail, initialisé une seule fois par init_worker
+_tokenizer = None
+_model = None
+_cache = None
+
+
+def init_worker(model_name, torch_threads, chemin_cache, quantize=False):
+    """Charge le modèle une fois par processus et limite le nombre de threads torch."""
+    global _tokenizer, _model, _cache
+    torch.set_num_threads(torch_threads)
+    _tokenizer, _model = load_model(model_name, quantize)
+    _cache = open_cache(chemin_cache) if chemin_cache else None
+
+def shard_path(dossier, debut, fin):
+    return os.path.join(dossier, f"shard_{debut:07d}_{fin:07d}.pkl")
+
+def translate_shard(df_shard, colonnes, chemin, options):
+    """Traduit un bloc de lignes puis l'écrit sur disque de façon atomique."""
+    df_shard, stats = translate_dataframe(df_shard, colonnes, _tokenizer, _model, cache=_cache, **options)
+    temporaire = chemin + '.tmp'
+    df_shard.to_pickle(temporaire)
+    os.replace(temporaire, chemin)
+    return stats
+
+def source_fingerprint(source):
+    """Taille et empreinte SHA-256 du fichier source : un fichier modifié invalide les checkpoints."""
+    empreinte = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            empreinte.update(bloc)
+    return {'taille': os.path.getsize(source), 'sha256': empreinte.hexdigest()}
+
+def purge_checkpoints(dossier):
+    """Supprime les shards (et fichiers temporaires) et le manifeste d'une exécution précédente."""
+    chemins = glob.glob(os.path.join(dossier, 'shard_*.pkl*')) + glob.glob(os.path.join(dossier, 'manifest.json'))
+    for chemin in chemins:
+        os.remove(chemin)
+    if chemins:
+        print(f"🧹 {len(chemins)} anciens fichiers de checkpoint supprimés de '{dossier}'")
+
+def check_manifest(dossier, manifeste, resume):
+    """
+    Vérifie qu'une reprise porte sur les mêmes données (contenu du fichier compris) et le même
+    découpage. Sans reprise, ou sans manifeste à reprendre, les anciens checkpoints sont supprimés.
+    Renvoie True si les shards déjà présents peuvent être réutilisés.
+    """
+    chemin = os.path.join(dossier, 'manifest.json')
+    reutilisables = resume and os.path.exists(chemin)
+    if reutilisables:
+        with open(chemin, encoding='utf-8') as f:
+            precedent = json.load(f)
+        if precedent != manifeste:
+            raise ValueError(f"Les checkpoints de '{dossier}' ne correspondent pas à ce fichier "
+                             f"ou à cette taille de shard : {precedent}")
+    else:
+        if resume:
+            print(f"⚠️ Pas de manifeste dans '{dossier}' : reprise impossible, traduction complète.")
+        purge_checkpoints(dossier)
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(manifeste, f, ensure_ascii=False, indent=2)
+    return reutilisables
+
+def merge_stats(liste_stats, duree):
+    """Additionne les statistiques renvoyées par les différents shards."""
+    total = {'examinees': 0, 'traduites': 0, 'uniques': 0, 'duree': duree}
+    for stats in liste_stats:
+        for cle in ('examinees', 'traduites', 'uniques'):
+            total[cle] += stats[cle]
+        for cle in ('hits', 'misses'):  # seulement avec un cache
+            if cle in stats:
+                total[cle] = total.get(cle, 0) + stats[cle]
+        if 'detection' in stats:
+            detection = total.setdefault('detection', dict.fromkeys(stats['detection'], 0))
+            for cle, valeur in stats['detection'].items():
+                detection[cle] = valeur if isinstance(valeur, bool) else detection[cle] + valeur
+        if 'segments_par_cellule' in stats:
+            total.setdefault('segments_par_cellule', {}).update(stats['segments_par_cellule'])
+            total['tokens'] = total.get('tokens', 0) + stats['tokens']
+    return total
+
+def translate_parallel(df, colonnes, source, n_workers, torch_threads=None, shard_size=TAILLE_SHARD,
+                       dossier=DOSSIER_CHECKPOINTS, resume=False, chemin_cache=None, quantize=False, **options):
+    """
+    Traduit le DataFrame avec un pool de processus. Les lignes sont découpées en
+    shards de shard_size lignes ; chaque shard terminé est sauvegardé dans `dossier`.
+    Avec resume=True, les shards déjà sauvegardés ne sont pas recalculés ; sinon le dossier
+    de checkpoints est vidé avant de commencer.
+    Un shard en échec est signalé sans interrompre les autres.
+    """
+    debut_total = time.perf_counter()
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // n_workers)
+    os.makedirs(dossier, exist_ok=True)
+    reprise = check_manifest(dossier, {'source': source, 'contenu': source_fingerprint(source), 'lignes': len(df),
+                                       'taille_shard': shard_size, 'colonnes': colonnes, 'options': options,
+                                       'int8': quantize}, resume)
+
+    shards = [(debut, min(debut + shard_size, len(df))) for debut in range(0, len(df), shard_size)]
+    # Seuls les shards couverts par le manifeste vérifié, ou terminés pendant cette exécution, sont fusionnés
+    termines = {(debut, fin) for debut, fin in shards
+                if reprise and os.path.exists(shard_path(dossier, debut, fin))}
+    a_faire = [shard for shard in shards if shard not in termines]
+    print(f"🧩 {len(shards)} shards de {shard_size} lignes, {len(shards) - len(a_faire)} déjà faits, "
+          f"{n_workers} processus × {torch_threads} threads torch")
+
+    liste_stats = []
+    contexte = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=contexte, initializer=init_worker,
+                             initargs=(MODEL_NAME, torch_threads, chemin_cache, quantize)) as executor:
+        futures = {
+            executor.submit(translate_shard, df.iloc[debut:fin][colonnes].copy(), colonnes,
+                            shard_path(dossier, debut, fin), options): (debut, fin)
+            for debut, fin in a_faire
+        }
+        for n, future in enumerate(as_completed(futures), start=1):
+            debut, fin = futures[future]
+            try:
+                liste_stats.append(future.result())
+                termines.add((debut, fin))
+                print(f"   ✔ shard {debut}-{fin} ({n}/{len(a_faire)})")
+            except Exception as e:
+                print(f"   ✘ shard {debut}-{fin} en échec : {e}")
+
+    manquants = 0
+    for debut, fin in shards:
+        if (debut, fin) not in termines:
+            manquants += 1
+            continue
+        traduit = pd.read_pickle(shard_path(dossier, debut, fin))
+        df.loc[traduit.index, colonnes] = traduit[colonnes]
+    if manquants:
+        print(f"⚠️ {manquants} shards non traduits : relancer avec --resume pour les reprendre.")
+
+    return df, merge_stats(liste_stats, time.perf_counter() - debut_total)
@@ -1,31 +1,19 @@
 import pandas as pd
-from transformers import MarianMTModel, MarianTokenizer
-from langdetect import detect
 
-model_name = 'Helsinki-NLP/opus-mt-mul-en'
-tokenizer = MarianTokenizer.from_pretrained(model_name)
-model = MarianMTModel.from_pretrained(model_name)
+from cache_traduction import open_cache
+from moteur_traduction import load_model, report_throughput, translate_dataframe
 
-def translate_to_english(text, tokenizer, model):
-    if not text:
-        return text
-    try:
-        if detect(text) == 'en':
-            return text
-    except:
-        return text
-    
-    inputs = tokenizer(text, return_tensors="pt", truncation=True)
-    outputs = model.generate(**inputs)
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+tokenizer, model = load_model()
+cache = open_cache()
 
 file_path = 'Donnees/fichier_mis_a_jour.xlsx'
 df = pd.read_excel(file_path)
 colonnes_a_traduire = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
 
-for col in colonnes_a_traduire:
-    df[col] = df[col].apply(lambda x: translate_to_english(str(x), tokenizer, model) if pd.notnull(x) and x.strip() else x)
+df, stats = translate_dataframe(df, colonnes_a_traduire, tokenizer, model, cache=cache)
+report_throughput("Traduction par lots", stats)
 
 output_path = 'Donnees/fichier_traduit.xlsx'
 df.to_excel(output_path, index=False)
+cache.close()
 print(f"Traduction terminée et sauvegardée dans '{output_path}'.")
\ No newline at end of file
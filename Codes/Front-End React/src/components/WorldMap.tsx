@@ -1,7 +1,35 @@
 import React, { useEffect, useRef } from 'react';
-import spacesData from '../data/spaces.json';
 import { Skeleton } from "@/components/ui/skeleton";
 
+// Grappes pré-calculées par niveau de zoom (recherche_geo.py export)
+type Grappe = {
+  latitude: number;
+  longitude: number;
+  nombre: number;
+  nom?: string;
+  ville?: string;
+  pays?: string;
+  website?: string;
+  exemples?: string[];
+};
+
+type NiveauGrappes = {
+  zoom: number;
+  taille_cellule: number;
+  grappes: Grappe[];
+};
+
+// Facteur de zoom à partir duquel chaque espace est affiché seul (dernier niveau exporté)
+const ZOOM_ESPACES = 3;
+
+// Niveau de grappes adapté au facteur de zoom (0.5 -> 0, 1 -> 2, 2 -> 4, ZOOM_ESPACES et plus -> un point par espace)
+const niveauPourZoom = (k: number, nombreNiveaux: number) =>
+  k >= ZOOM_ESPACES
+    ? nombreNiveaux - 1
+    : Math.max(0, Math.min(nombreNiveaux - 2, Math.floor(Math.log2(k) * 2) + 2));
+
+const rayonGrappe = (d: Grappe) => 3 + Math.sqrt(d.nombre - 1);
+
 const WorldMap = () => {
   const mapContainerRef = useRef<HTMLDivElement>(null);
   const mapInitializedRef = useRef<boolean>(false);
@@ -77,6 +105,9 @@ const WorldMap = () => {
         .style("z-index", "1000");
     }
 
+    let niveaux: NiveauGrappes[] = [];
+    let niveauAffiche = -1;
+
     // Zoom avec contraintes plus appropriées
     const zoom = window.d3.zoom()
       .scaleExtent([0.5, 5]) // Permettre de dézoomer un peu plus
@@ -86,6 +117,11 @@ const WorldMap = () => {
       ])
       .on("zoom", (event: any) => {
         g.attr("transform", event.transform);
+        // Changer de niveau de grappes seulement quand le zoom franchit un seuil
+        const niveau = niveauPourZoom(event.transform.k, niveaux.length);
+        if (niveaux.length && niveau !== niveauAffiche) {
+          drawPoints(niveau);
+        }
       });
 
     svg.call(zoom);
@@ -117,9 +153,67 @@ const WorldMap = () => {
       .style("font-family", "Arial, sans-serif")
       .text("Reset");
 
-    // Chargement de la carte
-    window.d3.json("https://cdn.jsdelivr.net/npm/world-atlas@2/countries-110m.json")
-      .then((world) => {
+    const drawPoints = (niveau: number) => {
+      niveauAffiche = niveau;
+      g.selectAll("circle.location-point")
+        .data(niveaux[niveau].grappes)
+        .join("circle")
+        .attr("class", "location-point")
+        .attr("cx", (d: Grappe) => projection([d.longitude, d.latitude])[0])
+        .attr("cy", (d: Grappe) => projection([d.longitude, d.latitude])[1])
+        .attr("r", rayonGrappe)
+        .attr("fill", "#3b82f6")
+        .attr("stroke", "#1d4ed8")
+        .attr("stroke-width", 0.5)
+        .attr("opacity", 0.8)
+        .style("cursor", "pointer")
+        .on("mouseover", (event: any, d: Grappe) => {
+          // Agrandir le cercle au survol
+          window.d3.select(event.currentTarget)
+            .transition()
+            .duration(150)
+            .attr("r", rayonGrappe(d) + 2)
+            .attr("opacity", 1);
+
+          const contenu = d.nombre > 1
+            ? `
+              <div style="font-weight: bold; margin-bottom: 4px;">${d.nombre} espaces</div>
+              ${(d.exemples || []).map((nom) => `<div style="margin-bottom: 2px;">• ${nom}</div>`).join('')}
+              ${d.nombre > (d.exemples || []).length ? '<div>…</div>' : ''}
+            `
+            : `
+              <div style="font-weight: bold; margin-bottom: 4px;">${d.nom}</div>
+              <div style="margin-bottom: 2px;">📍 Ville: ${d.ville || 'Non spécifié'}</div>
+              <div style="margin-bottom: 2px;">🌍 Pays: ${d.pays || 'Non spécifié'}</div>
+              ${d.website ? `<div>🔗 <a href="${d.website}" target="_blank" style="color: #60a5fa;">Site web</a></div>` : ''}
+            `;
+          tooltip.style("display", "block")
+            .html(contenu)
+            .style("left", (event.pageX + 10) + "px")
+            .style("top", (event.pageY - 10) + "px");
+        })
+        .on("mousemove", (event: any) => {
+          tooltip.style("left", (event.pageX + 10) + "px")
+            .style("top", (event.pageY - 10) + "px");
+        })
+        .on("mouseout", (event: any, d: Grappe) => {
+          // Remettre la taille normale
+          window.d3.select(event.currentTarget)
+            .transition()
+            .duration(150)
+            .attr("r", rayonGrappe(d))
+            .attr("opacity", 0.8);
+
+          tooltip.style("display", "none");
+        });
+    };
+
+    // Chargement de la carte et des grappes d'espaces
+    Promise.all([
+      window.d3.json("https://cdn.jsdelivr.net/npm/world-atlas@2/countries-110m.json"),
+      window.d3.json("/data/spaces_grappes.json")
+    ])
+      .then(([world, grappes]) => {
         const countries = window.topojson.feature(world, world.objects.countries);
 
         // Stocker les features pour le resize
@@ -136,52 +230,9 @@ const WorldMap = () => {
           .attr("stroke", "#e5e7eb") // Bordures grises plus claires
           .attr("stroke-width", 0.7); // Bordures légèrement plus visibles
 
-        // Ajouter les points avec une taille réduite
-        g.selectAll("circle")
-          .data(spacesData)
-          .enter()
-          .append("circle")
-          .attr("class", "location-point")
-          .attr("cx", (d: any) => projection([d.longitude, d.latitude])[0])
-          .attr("cy", (d: any) => projection([d.longitude, d.latitude])[1])
-          .attr("r", 3) // Taille réduite des cercles
-          .attr("fill", "#3b82f6")
-          .attr("stroke", "#1d4ed8")
-          .attr("stroke-width", 0.5)
-          .attr("opacity", 0.8)
-          .style("cursor", "pointer")
-          .on("mouseover", (event: any, d: any) => {
-            // Agrandir le cercle au survol
-            window.d3.select(event.currentTarget)
-              .transition()
-              .duration(150)
-              .attr("r", 5)
-              .attr("opacity", 1);
-
-            tooltip.style("display", "block")
-              .html(`
-                <div style="font-weight: bold; margin-bottom: 4px;">${d.nom}</div>
-                <div style="margin-bottom: 2px;">📍 Ville: ${d.ville || 'Non spécifié'}</div>
-                <div style="margin-bottom: 2px;">🌍 Pays: ${d.pays || 'Non spécifié'}</div>
-                ${d.website ? `<div>🔗 <a href="${d.website}" target="_blank" style="color: #60a5fa;">Site web</a></div>` : ''}
-              `)
-              .style("left", (event.pageX + 10) + "px")
-              .style("top", (event.pageY - 10) + "px");
-          })
-          .on("mousemove", (event: any) => {
-            tooltip.style("left", (event.pageX + 10) + "px")
-              .style("top", (event.pageY - 10) + "px");
-          })
-          .on("mouseout", (event: any) => {
-            // Remettre la taille normale
-            window.d3.select(event.currentTarget)
-              .transition()
-              .duration(150)
-              .attr("r", 3)
-              .attr("opacity", 0.8);
-
-            tooltip.style("display", "none");
-          });
+        // Ajouter les grappes du niveau correspondant au zoom initial
+        niveaux = grappes.niveaux;
+        drawPoints(niveauPourZoom(1, niveaux.length));
       })
       .catch(error => {
         console.error('Error loading map data:', error);
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+import torch
+
+TAILLE_LOT = 16
+MAX_LENGTH = 200
+
+
+class EncodeurGPT:
+    """
+    Embeddings de documents par un modèle GPT-2 (ou tout modèle causal de transformers) :
+    lots de textes de longueurs proches, remplissage jusqu'au plus long texte du lot seulement,
+    moyenne des états cachés pondérée par l'attention_mask (les tokens de remplissage sont ignorés).
+    """
+
+    def __init__(self, tokenizer, model, max_length=MAX_LENGTH, taille_lot=TAILLE_LOT):
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        self.tokenizer = tokenizer
+        self.model = model.eval()
+        self.max_length = max_length
+        self.taille_lot = taille_lot
+
+    def __call__(self, textes):
+        """Matrice (len(textes), dim) en float32, dans l'ordre des textes."""
+        encodes = self.tokenizer(list(textes), truncation=True, max_length=self.max_length)
+        ordre = np.argsort([len(ids) for ids in encodes['input_ids']], kind='stable')
+        embeddings = np.zeros((len(textes), self.model.config.hidden_size), dtype=np.float32)
+
+        with torch.inference_mode():
+            for debut in range(0, len(ordre), self.taille_lot):
+                lot = ordre[debut:debut + self.taille_lot]
+                entrees = self.tokenizer.pad({cle: [valeurs[i] for i in lot] for cle, valeurs in encodes.items()},
+                                             return_tensors='pt')
+                caches = self.model(**entrees).last_hidden_state
+                poids = entrees['attention_mask'].unsqueeze(-1).to(caches.dtype)
+                embeddings[lot] = ((caches * poids).sum(dim=1) / poids.sum(dim=1).clamp(min=1)).numpy()
+        return embeddings
+
+def identifiant_modele(model_name, max_length=MAX_LENGTH, quantifie=False):
+    """Clé du magasin : les vecteurs dépendent du modèle, de la troncature et de la quantification."""
+    return f"{model_name}-moyenne-{max_length}" + ('-int8' if quantifie else '')
+
+def embeddings_documents(textes, tokenizer, model, max_length=MAX_LENGTH, taille_lot=TAILLE_LOT,
+                         model_id=None, racine=None):
+    """
+    Embeddings des documents. Avec `model_id` (voir identifiant_modele), les vecteurs sont lus
+    et ajoutés dans le magasin d'embeddings de `racine` (Codes/Bertopic S1/magasin_embeddings.py) :
+    seuls les textes jamais encodés passent dans le modèle.
+    """
+    encodeur = EncodeurGPT(tokenizer, model, max_length, taille_lot)
+    debut = time.perf_counter()
+    if model_id is None:
+        embeddings = encodeur(textes)
+    else:
+        from magasin_embeddings import DOSSIER_EMBEDDINGS, get_embeddings
+        embeddings = get_embeddings(textes, encodeur, model_id, racine or DOSSIER_EMBEDDINGS)
+    duree = time.perf_counter() - debut
+    print(f"GPT : {len(textes)} documents en {duree:.2f}s ({len(textes) / max(duree, 1e-9):.1f} docs/s)")
+    return embeddings
@@ -1,4 +1,7 @@
+import hashlib
+import json
 import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import CountVectorizer
@@ -7,6 +10,19 @@ from bertopic import BERTopic
 from wordcloud import WordCloud
 import matplotlib.pyplot as plt
 
+from column_scheduler import run_columns
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Bertopic S1'))
+from magasin_embeddings import get_embeddings
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"  # modèle par défaut de BERTopic (anglais)
+EMBEDDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Donnees', 'embeddings')
+UMAP_CACHE_DIR = os.path.join(EMBEDDINGS_DIR, 'umap')
+# Paramètres UMAP par défaut de BERTopic, avec random_state pour que la réduction soit reproductible
+UMAP_PARAMS = {'n_neighbors': 15, 'n_components': 5, 'min_dist': 0.0, 'metric': 'cosine', 'random_state': 42}
+MEMORY_PER_WORKER_GB = 1.0  # BERTopic + UMAP par processus (embeddings lus dans le magasin)
+MEMORY_PER_WORKER_GB_MODEL = 2.0  # idem, quand chaque processus charge aussi sentence-transformers
+
 # =============================
 # Étape 1 : Préparation des données
 # =============================
@@ -55,17 +71,87 @@ def lda_pipeline(texts: list[str], n_topics: int = 5) -> tuple[dict, np.ndarray]
 # =============================
 # Étape 3 : Pipeline BERTopic
 # =============================
-def bert_pipeline(texts: list[str]) -> tuple[BERTopic, dict]:
+def embed_columns(column_texts: dict[str, list[str]], model_name: str = EMBEDDING_MODEL,
+                  store_root: str = EMBEDDINGS_DIR):
+    """
+    Encode une seule fois toutes les cellules de toutes les colonnes, avec un seul modèle chargé
+    (les textes communs à plusieurs colonnes, ou déjà encodés lors d'une exécution précédente,
+    ne sont pas réencodés). Les vecteurs sont rangés dans le magasin d'embeddings.
+    Args:
+        column_texts (dict[str, list[str]]): Textes de chaque colonne.
+        model_name (str): Modèle sentence-transformers (celui de BERTopic par défaut).
+        store_root (str): Dossier du magasin d'embeddings.
+    """
+    all_texts = list(dict.fromkeys(text for texts in column_texts.values() for text in texts))
+    get_embeddings(all_texts, model_name, racine=store_root)
+
+def reduce_embeddings(embeddings: np.ndarray, cache_dir: str = UMAP_CACHE_DIR) -> np.ndarray:
+    """
+    Réduction UMAP des embeddings d'une colonne, mise en cache sur disque : la clé est
+    l'empreinte des vecteurs et des paramètres, une colonne inchangée n'est pas réduite à nouveau.
+    Args:
+        embeddings (np.ndarray): Embeddings des textes de la colonne.
+        cache_dir (str): Dossier du cache des réductions.
+    Returns:
+        np.ndarray: Vecteurs réduits (UMAP_PARAMS['n_components'] dimensions).
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    digest = hashlib.sha256(embeddings.tobytes())
+    digest.update(json.dumps(UMAP_PARAMS, sort_keys=True).encode('utf-8'))
+    cache_file = os.path.join(cache_dir, f"{digest.hexdigest()[:20]}.npy")
+    if os.path.exists(cache_file):
+        return np.load(cache_file)
+
+    from umap import UMAP
+    reduced = UMAP(**UMAP_PARAMS).fit_transform(embeddings)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temporary, 'wb') as f:
+        np.save(f, reduced)
+    os.replace(temporary, cache_file)
+    return reduced
+
+class PrecomputedReduction:
+    """
+    Modèle de réduction pour BERTopic (umap_model) qui renvoie une réduction déjà calculée
+    (voir reduce_embeddings) au lieu d'ajuster UMAP. BERTopic reçoit ainsi les embeddings
+    complets, qu'il garde pour la représentation des topics, et la réduction en cache
+    pour le clustering.
+    """
+
+    def __init__(self, embeddings: np.ndarray, reduced_embeddings: np.ndarray):
+        self.embeddings = embeddings
+        self.reduced_embeddings = reduced_embeddings
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X) -> np.ndarray:
+        if X is not self.embeddings and not np.array_equal(X, self.embeddings):
+            raise ValueError("PrecomputedReduction ne réduit que les embeddings fournis à sa création")
+        return self.reduced_embeddings
+
+def bert_pipeline(texts: list[str], embeddings: np.ndarray | None = None,
+                  reduced_embeddings: np.ndarray | None = None) -> tuple[BERTopic, dict]:
     """
     Applique BERTopic sur une liste de textes et retourne les topics générés.
     Args:
         texts (list[str]): Liste de textes à analyser.
+        embeddings (np.ndarray | None): Embeddings déjà encodés des textes ; BERTopic ne charge
+            alors pas de modèle d'embeddings. Sans eux, BERTopic encode et réduit lui-même les textes.
+        reduced_embeddings (np.ndarray | None): Réduction UMAP de ces embeddings (voir
+            reduce_embeddings), injectée par PrecomputedReduction à la place d'un nouvel ajustement.
     Returns:
         BERTopic: Modèle BERTopic entraîné.
         dict: Topics générés avec leurs mots-clés.
     """
-    bert_model = BERTopic()
-    topics, _ = bert_model.fit_transform(texts)
+    if embeddings is None:
+        bert_model = BERTopic()
+        topics, _ = bert_model.fit_transform(texts)
+    else:
+        umap_model = PrecomputedReduction(embeddings, reduced_embeddings) if reduced_embeddings is not None else None
+        bert_model = BERTopic(umap_model=umap_model)
+        topics, _ = bert_model.fit_transform(texts, embeddings)
 
     topic_words = {
         topic: bert_model.get_topic(topic)
@@ -132,18 +218,65 @@ def display_results_summary(results: dict):
             print(f"Topic {topic}: {', '.join([word[0] for word in words])}")
 
 # =============================
-# Étape 6 : Fonction principale
+# Étape 6 : Analyse d'une colonne
+# =============================
+def analyze_column(column: str, texts: list[str], n_topics: int = 5, multi_view: bool = True) -> dict:
+    """
+    Analyses LDA et BERTopic d'une colonne (exécutée dans un processus de l'ordonnanceur).
+    Args:
+        column (str): Nom de la colonne.
+        texts (list[str]): Textes non vides de la colonne.
+        n_topics (int): Nombre de topics pour LDA.
+        multi_view (bool): Embeddings lus dans le magasin (voir embed_columns) et réduction UMAP
+            en cache, au lieu d'un encodage et d'une réduction complets par BERTopic.
+    Returns:
+        dict: Résultats compilés de la colonne.
+    """
+    # Créer un dossier de sortie
+    output_dir = os.path.join("results", column)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Analyse LDA
+    lda_topics, lda_output = lda_pipeline(texts, n_topics)
+    lda_files = []
+    for topic, words in lda_topics.items():
+        output_file = os.path.join(output_dir, f"lda_topic_{topic}.png")
+        generate_wordcloud(words, output_file, f"LDA Topic {topic}")
+        lda_files.append(output_file)
+
+    # Analyse BERTopic
+    embeddings = reduced_embeddings = None
+    if multi_view:
+        embeddings = get_embeddings(texts, EMBEDDING_MODEL, racine=EMBEDDINGS_DIR)
+        reduced_embeddings = reduce_embeddings(embeddings)
+    bert_model, bert_topics = bert_pipeline(texts, embeddings, reduced_embeddings)
+    bert_files = []
+    for topic, words in bert_topics.items():
+        output_file = os.path.join(output_dir, f"bert_topic_{topic}.png")
+        generate_wordcloud([word[0] for word in words], output_file, f"BERTopic Topic {topic}")
+        bert_files.append(output_file)
+
+    # Compiler les résultats
+    return compile_results(lda_topics, bert_topics, lda_files, bert_files)
+
+# =============================
+# Étape 7 : Fonction principale
 # =============================
-def main(excel_file: str, columns_to_analyze: list[str], n_topics: int = 5):
+def main(excel_file: str, columns_to_analyze: list[str], n_topics: int = 5, max_workers: int | None = None,
+         multi_view: bool = True):
     """
     Fonction principale pour exécuter les analyses LDA et BERTopic sur des colonnes spécifiques.
     Args:
         excel_file (str): Chemin du fichier Excel à analyser.
         columns_to_analyze (list[str]): Liste des colonnes à analyser.
         n_topics (int): Nombre de topics pour LDA.
+        max_workers (int | None): Colonnes analysées en parallèle (défaut : selon les cœurs
+            et la mémoire disponible ; 1 = l'une après l'autre).
+        multi_view (bool): Un seul passage d'encodage pour toutes les colonnes avant l'analyse ;
+            False : chaque colonne est encodée et réduite par BERTopic, comme auparavant.
     """
     df = prepare_data(excel_file)
-    results = {}
+    jobs = {}
 
     for column in columns_to_analyze:
         if column not in df:
@@ -154,29 +287,16 @@ def main(excel_file: str, columns_to_analyze: list[str], n_topics: int = 5):
         if not texts:
             print(f"Colonne {column} vide ou invalide.")
             continue
+        jobs[column] = (column, texts, n_topics, multi_view)
 
-        # Créer un dossier de sortie
-        output_dir = os.path.join("results", column)
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Analyse LDA
-        lda_topics, lda_output = lda_pipeline(texts, n_topics)
-        lda_files = []
-        for topic, words in lda_topics.items():
-            output_file = os.path.join(output_dir, f"lda_topic_{topic}.png")
-            generate_wordcloud(words, output_file, f"LDA Topic {topic}")
-            lda_files.append(output_file)
-
-        # Analyse BERTopic
-        bert_model, bert_topics = bert_pipeline(texts)
-        bert_files = []
-        for topic, words in bert_topics.items():
-            output_file = os.path.join(output_dir, f"bert_topic_{topic}.png")
-            generate_wordcloud([word[0] for word in words], output_file, f"BERTopic Topic {topic}")
-            bert_files.append(output_file)
-
-        # Compiler les résultats
-        results[column] = compile_results(lda_topics, bert_topics, lda_files, bert_files)
+    if multi_view:
+        # Encodage de toutes les cellules dans ce processus : les processus de l'ordonnanceur
+        # ne font que relire le magasin et ne chargent pas le modèle
+        embed_columns({column: args[1] for column, args in jobs.items()})
+        results = run_columns(analyze_column, jobs, max_workers, MEMORY_PER_WORKER_GB)
+    else:
+        # Chaque processus charge son propre modèle d'embeddings BERTopic
+        results = run_columns(analyze_column, jobs, max_workers, MEMORY_PER_WORKER_GB_MODEL)
 
     display_results_summary(results)
 
@@ -0,0 +1,59 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+
+from figure_jobs import MAX_HEATMAP_ROWS, downsample_rows, render_heatmap
+
+
+def synthetic_distributions(n_docs: int, n_topics: int = 10, seed: int = 0) -> np.ndarray:
+    """Distributions documents × topics de type LDA (Dirichlet peu concentrée)."""
+    return np.random.default_rng(seed).dirichlet(np.full(n_topics, 0.3), size=n_docs)
+
+def measure(function) -> tuple[float, float]:
+    """Durée (s) et pic de mémoire Python/numpy (Mo) d'un appel."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    duration = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return duration, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Heatmap documents × topics : une ligne par document vs lignes réduites.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--topics', type=int, default=10)
+    parser.add_argument('--max-rows', type=int, default=MAX_HEATMAP_ROWS)
+    parser.add_argument('--full-max', type=int, default=100_000,
+                        help="Taille maximale pour le rendu complet (une ligne par document), lent et gourmand en mémoire au-delà")
+    args = parser.parse_args()
+
+    print(f"{'documents':>10}  {'mode':<8} {'durée':>9} {'pic mémoire':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        output_file = os.path.join(directory, 'heatmap.png')
+        # Premier rendu hors mesure : imports de seaborn et cache des polices
+        render_heatmap(output_file, synthetic_distributions(10, args.topics), "warm-up")
+        for n_docs in args.sizes:
+            lda_output = synthetic_distributions(n_docs, args.topics)
+            modes = ['full'] if n_docs <= args.full_max else []
+            for mode in modes + ['bins', 'sample']:
+                def run():
+                    if mode == 'full':
+                        matrix, ylabel = lda_output, "Documents"
+                    else:
+                        matrix, ylabel = downsample_rows(lda_output, args.max_rows, mode)
+                    render_heatmap(output_file, matrix, "Matrix of Topic Contributions by Document",
+                                   xlabel="Topics", ylabel=ylabel, cbar_label='Topic Contribution')
+                duration, peak = measure(run)
+                print(f"{n_docs:>10}  {mode:<8} {duration:>8.2f}s {peak:>9.1f} Mo")
+            if not modes:
+                print(f"{n_docs:>10}  {'full':<8} {'ignoré (--full-max)':>22}")
+
+if __name__ == "__main__":
+    main()
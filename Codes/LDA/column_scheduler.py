@@ -0,0 +1,75 @@
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def available_memory_gb() -> float | None:
+    """Mémoire disponible (Go) : psutil s'il est installé, sinon /proc/meminfo ; None si inconnue."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / 1e9
+    except ImportError:
+        pass
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024 / 1e9
+    except OSError:
+        pass
+    return None
+
+def plan_workers(n_jobs: int, max_workers: int | None = None, memory_per_worker_gb: float | None = None) -> int:
+    """
+    Nombre de processus à lancer : borné par le nombre de colonnes, max_workers (défaut : nombre
+    de cœurs) et, si memory_per_worker_gb est donné, par la mémoire disponible
+    (chaque processus charge ses propres modèles, BERT compris).
+    """
+    workers = min(n_jobs, max_workers or os.cpu_count() or 1)
+    memory = available_memory_gb() if memory_per_worker_gb else None
+    if memory is not None:
+        workers = min(workers, int(memory // memory_per_worker_gb))
+    return max(1, workers)
+
+def _report(done: int, total: int, column: str, start: float, error: BaseException | None = None):
+    status = "terminée" if error is None else f"ÉCHEC ({type(error).__name__}: {error})"
+    print(f"[{done}/{total}] Colonne {column} : {status} en {time.perf_counter() - start:.1f}s")
+    if error is not None:
+        print(''.join(traceback.format_exception(error)))
+
+def run_columns(task, jobs: dict, max_workers: int | None = None, memory_per_worker_gb: float | None = None) -> dict:
+    """
+    Exécute task(*jobs[colonne]) pour chaque colonne, dans des processus séparés.
+    Une colonne en échec est signalée puis omise du résultat, sans interrompre les autres.
+    Renvoie {colonne: résultat} dans l'ordre de `jobs` ; avec un seul processus,
+    les colonnes sont traitées dans le processus courant, comme avant.
+    task doit être une fonction de niveau module (sérialisable) et le script appelant
+    protégé par if __name__ == "__main__" (les processus sont lancés en mode spawn).
+    """
+    workers = plan_workers(len(jobs), max_workers, memory_per_worker_gb)
+    print(f"{len(jobs)} colonnes à analyser sur {workers} processus.")
+    start = time.perf_counter()
+    outputs = {}
+
+    if workers == 1:
+        for done, (column, args) in enumerate(jobs.items(), start=1):
+            try:
+                outputs[column] = task(*args)
+                _report(done, len(jobs), column, start)
+            except Exception as e:
+                _report(done, len(jobs), column, start, e)
+    else:
+        # spawn : pas de fork d'un processus qui a déjà initialisé torch / OpenMP
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {executor.submit(task, *args): column for column, args in jobs.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                column = futures[future]
+                error = future.exception()
+                if error is None:
+                    outputs[column] = future.result()
+                _report(done, len(jobs), column, start, error)
+
+    return {column: outputs[column] for column in jobs if column in outputs}
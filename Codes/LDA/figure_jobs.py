@@ -0,0 +1,232 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+MANIFEST_NAME = '.figure_keys.json'
+RENDER_VERSION = 1  # à incrémenter quand un rendu change, pour régénérer toutes les figures
+MAX_HEATMAP_ROWS = 500  # au-delà, une ligne de la heatmap ne correspond plus à un pixel
+
+
+# =============================
+# Rendus (exécutés dans les processus du pool, backend Agg)
+# =============================
+def render_wordcloud(output_file: str, title: str, frequencies: dict | None = None, text: str | None = None):
+    """Nuage de mots à partir de poids {mot: poids} ou d'un texte brut."""
+    import matplotlib.pyplot as plt
+    from wordcloud import WordCloud
+    wordcloud = WordCloud(width=800, height=400, background_color='white')
+    wordcloud = wordcloud.generate_from_frequencies(frequencies) if frequencies is not None else wordcloud.generate(text)
+    plt.figure(figsize=(10, 5))
+    plt.imshow(wordcloud, interpolation='bilinear')
+    plt.axis('off')
+    plt.title(title)
+    plt.savefig(output_file)
+    plt.close()
+
+def render_topic_distribution(output_file: str, lda_output: np.ndarray):
+    import matplotlib.pyplot as plt
+    topic_proportions = lda_output.mean(axis=0)
+    plt.figure(figsize=(10, 5))
+    plt.bar(range(len(topic_proportions)), topic_proportions)
+    plt.xlabel("Topics")
+    plt.ylabel("Average Proportion")
+    plt.title("Average Topic Distribution")
+    plt.savefig(output_file)
+    plt.close()
+
+def render_heatmap(output_file: str, matrix: np.ndarray, title: str, cmap: str = "YlGnBu",
+                   xlabel: str | None = None, ylabel: str | None = None, xticklabels='auto',
+                   cbar_label: str | None = None, tight_layout: bool = False):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(matrix, cmap=cmap, xticklabels=xticklabels,
+                cbar_kws={'label': cbar_label} if cbar_label else None)
+    plt.title(title)
+    if xlabel:
+        plt.xlabel(xlabel)
+    if ylabel:
+        plt.ylabel(ylabel)
+    if tight_layout:
+        plt.tight_layout()
+    plt.savefig(output_file)
+    plt.close()
+
+def render_topic_boxplot_html(output_file: str, lda_output: np.ndarray):
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    for i in range(lda_output.shape[1]):
+        fig.add_trace(go.Box(y=lda_output[:, i], name=f'Topic {i+1}'))
+    fig.update_layout(title='Topic Distribution Box Plot',
+                      yaxis_title='Topic Weight',
+                      showlegend=True)
+    fig.write_html(output_file)
+
+RENDERERS = {
+    'wordcloud': render_wordcloud,
+    'topic_distribution': render_topic_distribution,
+    'heatmap': render_heatmap,
+    'topic_boxplot_html': render_topic_boxplot_html,
+}
+
+# =============================
+# Description des figures et clés
+# =============================
+def figure_job(kind: str, output_file: str, **inputs) -> dict:
+    """Une figure décrite comme des données : type de rendu, entrées et fichier de sortie."""
+    if kind not in RENDERERS:
+        raise ValueError(f"Type de figure inconnu : {kind}")
+    return {'kind': kind, 'output_file': output_file, 'inputs': inputs}
+
+def _update_digest(digest, value):
+    if isinstance(value, np.ndarray):
+        digest.update(f"ndarray{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b'{')
+        for key in sorted(value, key=str):
+            _update_digest(digest, key)
+            _update_digest(digest, value[key])
+        digest.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        digest.update(b'[')
+        for item in value:
+            _update_digest(digest, item)
+        digest.update(b']')
+    else:
+        digest.update(repr(value.item() if isinstance(value, np.generic) else value).encode('utf-8'))
+
+def job_key(job: dict) -> str:
+    """Empreinte du type de rendu et de ses entrées : une figure inchangée garde la même clé."""
+    digest = hashlib.sha256(f"{job['kind']}:{RENDER_VERSION}".encode())
+    _update_digest(digest, job['inputs'])
+    return digest.hexdigest()
+
+def _load_manifest(directory: str) -> dict:
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def _save_manifest(directory: str, manifest: dict):
+    path = os.path.join(directory, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+# =============================
+# Heatmaps documents × topics de grande taille
+# =============================
+def dominant_order(matrix: np.ndarray) -> np.ndarray:
+    """Ordre des documents par topic dominant, puis par poids de ce topic décroissant."""
+    dominant = matrix.argmax(axis=1)
+    return np.lexsort((-matrix[np.arange(len(matrix)), dominant], dominant))
+
+def downsample_rows(matrix: np.ndarray, max_rows: int = MAX_HEATMAP_ROWS, strategy: str = 'bins',
+                    seed: int = 42) -> tuple[np.ndarray, str]:
+    """
+    Au plus max_rows lignes à dessiner, quelle que soit la taille du corpus ; renvoie aussi
+    le libellé de l'axe des documents. Au-delà de max_rows documents :
+    - 'bins' : documents triés par topic dominant, regroupés en max_rows tranches consécutives
+      de même taille (moyenne par tranche), sans copie triée de la matrice ;
+    - 'sample' : échantillon stratifié par topic dominant (effectifs proportionnels), trié de même.
+    """
+    n_docs = len(matrix)
+    if n_docs <= max_rows:
+        return matrix, "Documents"
+    order = dominant_order(matrix)
+
+    if strategy == 'sample':
+        rng = np.random.default_rng(seed)
+        dominant = matrix.argmax(axis=1)[order]
+        bounds = np.flatnonzero(np.diff(dominant)) + 1
+        picked = []
+        for group in np.split(order, bounds):
+            size = min(len(group), max(1, round(max_rows * len(group) / n_docs)))
+            picked.append(group[np.sort(rng.choice(len(group), size=size, replace=False))])
+        return matrix[np.concatenate(picked)], f"Documents (stratified sample of {n_docs}, by dominant topic)"
+
+    # Tranche de chaque document d'après son rang dans l'ordre trié, puis moyenne par tranche
+    bins = np.empty(n_docs, dtype=np.int64)
+    bins[order] = np.arange(n_docs, dtype=np.int64) * max_rows // n_docs
+    counts = np.bincount(bins, minlength=max_rows)
+    reduced = np.column_stack([np.bincount(bins, weights=matrix[:, j], minlength=max_rows)
+                               for j in range(matrix.shape[1])]) / counts[:, np.newaxis]
+    return reduced, f"Documents ({n_docs} sorted by dominant topic, mean of ~{n_docs // max_rows} per row)"
+
+def doc_topic_heatmap_job(output_file: str, lda_output: np.ndarray, max_rows: int = MAX_HEATMAP_ROWS,
+                          strategy: str = 'bins', **style) -> dict:
+    """Heatmap documents × topics réduite avant d'être décrite : la clé et le rendu restent légers."""
+    matrix, ylabel = downsample_rows(lda_output, max_rows, strategy)
+    return figure_job('heatmap', output_file, matrix=matrix, ylabel=ylabel, **style)
+
+# =============================
+# Exécution
+# =============================
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _render(job: dict) -> str:
+    RENDERERS[job['kind']](job['output_file'], **job['inputs'])
+    return job['output_file']
+
+def render_figures(jobs: list[dict], max_workers: int | None = None) -> dict:
+    """
+    Génère les figures dont les entrées ont changé (ou dont le fichier manque) et saute les autres.
+    Les clés sont conservées dans un fichier .figure_keys.json par dossier de sortie.
+    Les rendus restants sont répartis sur max_workers processus (défaut : nombre de cœurs).
+    Renvoie {'rendered', 'skipped', 'failed', 'duration'}.
+    """
+    start = time.perf_counter()
+    manifests = {}
+    todo = []
+    skipped = 0
+    for job in jobs:
+        directory, name = os.path.split(job['output_file'])
+        manifest = manifests.setdefault(directory, _load_manifest(directory))
+        key = job_key(job)
+        if manifest.get(name) == key and os.path.exists(job['output_file']):
+            skipped += 1
+        else:
+            todo.append((job, directory, name, key))
+
+    failed = 0
+    workers = min(max_workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        outcomes = []
+        for job, *_ in todo:
+            try:
+                outcomes.append((_render(job), None))
+            except Exception as e:
+                outcomes.append((None, e))
+    else:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+            futures = [executor.submit(_render, job) for job, *_ in todo]
+            outcomes = [(None, future.exception()) if future.exception() else (future.result(), None)
+                        for future in futures]
+
+    for (job, directory, name, key), (_, error) in zip(todo, outcomes):
+        if error is None:
+            manifests[directory][name] = key
+        else:
+            failed += 1
+            manifests[directory].pop(name, None)
+            print(f"Échec du rendu de {job['output_file']} : {type(error).__name__}: {error}")
+    for directory, manifest in manifests.items():
+        if directory and not os.path.isdir(directory):
+            continue
+        _save_manifest(directory, manifest)
+
+    stats = {'rendered': len(todo) - failed, 'skipped': skipped, 'failed': failed,
+             'duration': time.perf_counter() - start}
+    print(f"Figures : {stats['rendered']} générées, {stats['skipped']} inchangées"
+          + (f", {failed} en échec" if failed else "") + f" en {stats['duration']:.1f}s.")
+    return stats
@@ -1,11 +1,15 @@
+import argparse
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.decomposition import LatentDirichletAllocation
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from column_scheduler import plan_workers, run_columns
+from figure_jobs import MAX_HEATMAP_ROWS, doc_topic_heatmap_job, figure_job, render_figures
 
 def prepare_data(excel_file: str) -> pd.DataFrame:
     try:
@@ -21,113 +25,229 @@ def prepare_data(excel_file: str) -> pd.DataFrame:
         print(f"Erreur lors du chargement du fichier Excel : {e}")
         raise
 
-def lda_pipeline(texts: list[str], n_topics: int = 5) -> tuple[dict, np.ndarray]:
+def vectorize_texts(texts: list[str]):
+    """Matrice documents-termes d'une colonne, calculée une seule fois pour tout le balayage."""
     vectorizer = CountVectorizer(stop_words='english', max_features=1000)
     doc_term_matrix = vectorizer.fit_transform(texts)
+    return doc_term_matrix, vectorizer.get_feature_names_out()
 
+def fit_lda(doc_term_matrix, n_topics: int) -> tuple[LatentDirichletAllocation, np.ndarray]:
     lda_model = LatentDirichletAllocation(n_components=n_topics, random_state=42)
     lda_output = lda_model.fit_transform(doc_term_matrix)
+    return lda_model, lda_output
 
-    feature_names = vectorizer.get_feature_names_out()
+def extract_topics(lda_model: LatentDirichletAllocation, feature_names) -> dict:
     topics = {}
     for topic_idx, topic in enumerate(lda_model.components_):
         top_indices = topic.argsort()[-10:][::-1]
         topics[topic_idx] = [(feature_names[i], round(topic[i], 4)) for i in top_indices]
+    return topics
 
-    return topics, lda_output
-
-def generate_wordcloud(words_with_weights: list[tuple[str, float]], output_file: str, title: str):
-    word_freq = {word: weight for word, weight in words_with_weights}
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(word_freq)
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    plt.title(title)
-    plt.savefig(output_file)
-    plt.close()
-
-def display_topic_distribution(lda_output: np.ndarray, output_file: str):
-    topic_proportions = lda_output.mean(axis=0)
-    plt.figure(figsize=(10, 5))
-    plt.bar(range(len(topic_proportions)), topic_proportions)
-    plt.xlabel("Topics")
-    plt.ylabel("Average Proportion")
-    plt.title("Average Topic Distribution")
-    plt.savefig(output_file)
-    plt.close()
+def lda_pipeline(texts: list[str], n_topics: int = 5) -> tuple[dict, np.ndarray]:
+    doc_term_matrix, feature_names = vectorize_texts(texts)
+    lda_model, lda_output = fit_lda(doc_term_matrix, n_topics)
+    return extract_topics(lda_model, feature_names), lda_output
+
+def umass_coherence(components: np.ndarray, doc_term_matrix, top_n: int = 10) -> float:
+    """
+    Cohérence UMass moyenne des topics : pour chaque paire de mots du top, log((D(wi, wj) + 1) / D(wj))
+    où D compte les documents contenant les mots. Calculée sur la matrice déjà vectorisée,
+    sans corpus de référence ; plus proche de 0 = topics plus cohérents.
+    """
+    presence = (doc_term_matrix > 0).astype(np.float64).tocsc()
+    scores = []
+    for topic in components:
+        top = topic.argsort()[-top_n:][::-1]
+        sub = presence[:, top]
+        co_occurrences = (sub.T @ sub).toarray()
+        doc_freq = np.diag(co_occurrences)
+        pairs = np.tril_indices(len(top), -1)  # i > j : wj est le mot le mieux classé
+        scores.append(np.log((co_occurrences[pairs] + 1) / doc_freq[pairs[1]]).mean())
+    return float(np.mean(scores))
+
+def _sweep_job(doc_term_matrix, n_topics: int) -> dict:
+    """Un point du balayage (exécuté dans un processus du pool)."""
+    lda_model, lda_output = fit_lda(doc_term_matrix, n_topics)
+    return {
+        'n_topics': n_topics,
+        'model': lda_model,
+        'lda_output': lda_output,
+        'perplexity': lda_model.perplexity(doc_term_matrix),
+        'coherence': umass_coherence(lda_model.components_, doc_term_matrix),
+    }
+
+def sweep_topic_counts(doc_term_matrix, topic_counts: list[int], n_workers: int | None = None) -> dict[int, dict]:
+    """
+    Ajuste un LDA par nombre de topics sur la même matrice documents-termes,
+    en parallèle sur n_workers processus (1 = séquentiel, None = tous les cœurs).
+    """
+    n_workers = min(n_workers or os.cpu_count() or 1, len(topic_counts))
+    # Les plus grands k d'abord : ce sont les plus longs à ajuster
+    ordered = sorted(topic_counts, reverse=True)
+    if n_workers <= 1:
+        return {n_topics: _sweep_job(doc_term_matrix, n_topics) for n_topics in ordered}
+    # spawn, comme run_columns : pas de fork d'un processus qui a déjà initialisé OpenMP
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=context) as executor:
+        futures = {n_topics: executor.submit(_sweep_job, doc_term_matrix, n_topics) for n_topics in ordered}
+        return {n_topics: future.result() for n_topics, future in futures.items()}
+
+def summarize_sweep(rows: list[dict]) -> pd.DataFrame:
+    """
+    Tableau colonne × nombre de topics avec perplexité et cohérence. Le k recommandé par colonne
+    est celui de meilleure cohérence UMass (la perplexité sur le corpus d'apprentissage
+    baisse presque toujours avec k et ne sert qu'à départager les ex aequo).
+    """
+    summary = pd.DataFrame(rows, columns=['column', 'n_topics', 'perplexity', 'coherence'])
+    if summary.empty:
+        summary['recommended'] = pd.Series(dtype=bool)
+        return summary
+    best = summary.sort_values(['coherence', 'perplexity'], ascending=[False, True]).groupby('column').head(1)
+    summary['recommended'] = summary.index.isin(best.index)
+    return summary.sort_values(['column', 'n_topics']).reset_index(drop=True)
+
+def wordcloud_job(words_with_weights: list[tuple[str, float]], output_file: str, title: str) -> dict:
+    word_freq = {word: float(weight) for word, weight in words_with_weights}
+    return figure_job('wordcloud', output_file, title=title, frequencies=word_freq)
+
+def topic_distribution_job(lda_output: np.ndarray, output_file: str) -> dict:
+    return figure_job('topic_distribution', output_file, lda_output=lda_output)
 
 def save_topic_distributions(lda_output: np.ndarray, output_file: str):
     df_topics = pd.DataFrame(lda_output, columns=[f"Topic_{i}" for i in range(lda_output.shape[1])])
     df_topics.to_excel(output_file, index=False)
     print(f"Distributions des topics sauvegardées dans {output_file}.")
 
-def visualize_lda_matrix(lda_output: np.ndarray, output_file: str):
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(lda_output, cmap="YlGnBu", cbar_kws={'label': 'Topic Contribution'})
-    plt.title("Matrix of Topic Contributions by Document")
-    plt.xlabel("Topics")
-    plt.ylabel("Documents")
-    plt.savefig(output_file)
-    plt.close()
+def lda_matrix_job(lda_output: np.ndarray, output_file: str, max_rows: int = MAX_HEATMAP_ROWS) -> dict:
+    # Au-delà de max_rows documents, lignes moyennées par tranches de documents triés par topic dominant
+    return doc_topic_heatmap_job(output_file, lda_output, max_rows, title="Matrix of Topic Contributions by Document",
+                                 xlabel="Topics", cbar_label='Topic Contribution')
+
+def save_figures(column: str, n_topics: int, topics: dict, lda_output: np.ndarray,
+                 output_dir: str) -> tuple[dict, list[dict]]:
+    """Écrit l'Excel des distributions et décrit les figures à générer (voir figure_jobs.render_figures)."""
+    jobs = []
+    files = []
+    for topic_num, words_with_weights in topics.items():
+        output_file = os.path.join(output_dir, f"topic_{topic_num}_n{n_topics}.png")
+        jobs.append(wordcloud_job(words_with_weights, output_file, f"Topic {topic_num} - {column} (n={n_topics})"))
+        files.append(output_file)
+
+    dist_output_file = os.path.join(output_dir, f"distribution_n{n_topics}.png")
+    jobs.append(topic_distribution_job(lda_output, dist_output_file))
+
+    excel_output_file = os.path.join(output_dir, f"topic_distributions_n{n_topics}.xlsx")
+    save_topic_distributions(lda_output, excel_output_file)
+
+    heatmap_output_file = os.path.join(output_dir, f"lda_matrix_n{n_topics}.png")
+    jobs.append(lda_matrix_job(lda_output, heatmap_output_file))
+
+    return {
+        'files': files,
+        'distribution_plot': dist_output_file,
+        'distribution_excel': excel_output_file,
+        'heatmap': heatmap_output_file
+    }, jobs
+
+def analyze_column(column: str, texts: list[str], topic_counts: list[int], output_dir: str,
+                   n_workers: int | None = None, figures: str = 'all') -> tuple[dict, list[dict]]:
+    """Balayage d'une colonne : entrées du dict de résultats et lignes du tableau de résumé."""
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Vectorisation unique, puis un LDA par nombre de topics en parallèle
+    doc_term_matrix, feature_names = vectorize_texts(texts)
+    print(f"Analyse LDA sur '{column}' avec {', '.join(map(str, topic_counts))} topics.")
+    sweep = sweep_topic_counts(doc_term_matrix, topic_counts, n_workers)
+    column_rows = [{'column': column, 'n_topics': n_topics, 'perplexity': fit['perplexity'],
+                    'coherence': fit['coherence']} for n_topics, fit in sweep.items()]
+    column_summary = summarize_sweep(column_rows)
+    best_k = int(column_summary.loc[column_summary['recommended'], 'n_topics'].iloc[0])
 
-def main(excel_file: str, columns_to_analyze: list[str], topic_counts: list[int]):
+    results = {}
+    jobs = []
+    for n_topics in topic_counts:
+        fit = sweep[n_topics]
+        topics = extract_topics(fit['model'], feature_names)
+        result = {'topics': topics, 'perplexity': fit['perplexity'], 'coherence': fit['coherence']}
+        if figures == 'all' or n_topics == best_k:
+            files, figure_jobs = save_figures(column, n_topics, topics, fit['lda_output'], output_dir)
+            result.update(files)
+            jobs += figure_jobs
+        results[f"{column}_n{n_topics}"] = result
+
+    # Toutes les figures de la colonne en une fois : celles dont les entrées n'ont pas changé sont sautées
+    render_figures(jobs, n_workers)
+    return results, column_rows
+
+def main(excel_file: str, columns_to_analyze: list[str], topic_counts: list[int],
+         n_workers: int | None = None, figures: str = 'all', column_workers: int | None = None):
+    """
+    figures : 'all' pour les figures de chaque nombre de topics, 'recommended' pour
+    celles du k recommandé seulement (balayages larges, ex. 5..50).
+    column_workers : colonnes analysées en parallèle (défaut : autant que de cœurs) ;
+    n_workers : processus du balayage dans chaque colonne (défaut et maximum : cœurs restants,
+    pour ne pas lancer colonnes × k processus).
+    """
     df = prepare_data(excel_file)
     # Ajout de la colonne 'combined' dans la liste des colonnes à analyser
     if 'combined' not in columns_to_analyze:
         columns_to_analyze.append('combined')
 
-    results = {}
     main_output_dir = "results_lda"
     os.makedirs(main_output_dir, exist_ok=True)
 
+    column_texts = {}
     for column in columns_to_analyze:
         if column not in df.columns:
             print(f"Colonne ignorée : {column} non trouvée dans le fichier.")
             continue
 
-        try:
-            texts = df[column].dropna().astype(str).tolist()
-            if not texts:
-                print(f"Colonne {column} vide ou invalide.")
-                continue
-
-            output_dir = os.path.join(main_output_dir, column)
-            os.makedirs(output_dir, exist_ok=True)
-
-            for n_topics in topic_counts:
-                print(f"Analyse LDA sur '{column}' avec {n_topics} topics.")
-                topics, lda_output = lda_pipeline(texts, n_topics)
-                files = []
-
-                for topic_num, words_with_weights in topics.items():
-                    output_file = os.path.join(output_dir, f"topic_{topic_num}_n{n_topics}.png")
-                    generate_wordcloud(words_with_weights, output_file, f"Topic {topic_num} - {column} (n={n_topics})")
-                    files.append(output_file)
-
-                dist_output_file = os.path.join(output_dir, f"distribution_n{n_topics}.png")
-                display_topic_distribution(lda_output, dist_output_file)
-
-                excel_output_file = os.path.join(output_dir, f"topic_distributions_n{n_topics}.xlsx")
-                save_topic_distributions(lda_output, excel_output_file)
+        texts = df[column].dropna().astype(str).tolist()
+        if not texts:
+            print(f"Colonne {column} vide ou invalide.")
+            continue
+        column_texts[column] = texts
 
-                heatmap_output_file = os.path.join(output_dir, f"lda_matrix_n{n_topics}.png")
-                visualize_lda_matrix(lda_output, heatmap_output_file)
+    # Les cœurs sont partagés entre colonnes et balayages, sans les surcharger
+    column_workers = plan_workers(len(column_texts), column_workers) if column_texts else 1
+    budget = max(1, (os.cpu_count() or 1) // column_workers)
+    n_workers = budget if n_workers is None else min(n_workers, budget)
+    jobs = {column: (column, texts, topic_counts, os.path.join(main_output_dir, column), n_workers, figures)
+            for column, texts in column_texts.items()}
+    outputs = run_columns(analyze_column, jobs, column_workers)
 
-                results[f"{column}_n{n_topics}"] = {
-                    'topics': topics,
-                    'files': files,
-                    'distribution_plot': dist_output_file,
-                    'distribution_excel': excel_output_file,
-                    'heatmap': heatmap_output_file
-                }
-        except Exception as e:
-            print(f"Erreur lors de l'analyse de la colonne {column} : {e}")
+    results = {}
+    summary_rows = []
+    for column_results, column_rows in outputs.values():
+        results.update(column_results)
+        summary_rows += column_rows
+
+    summary = summarize_sweep(summary_rows)
+    if not summary.empty:
+        summary_file = os.path.join(main_output_dir, "sweep_summary.xlsx")
+        summary.to_excel(summary_file, index=False)
+        print(summary.to_string(index=False))
+        print(f"Résumé du balayage sauvegardé dans {summary_file}.")
 
     return results
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LDA par colonne avec balayage du nombre de topics.")
+    parser.add_argument('--topics', type=int, nargs='+', default=[5, 10, 15],
+                        help="Nombres de topics à tester, ou début fin pas avec --range (ex. --range 5 50 5)")
+    parser.add_argument('--range', action='store_true', help="Interpréter --topics comme début fin [pas]")
+    parser.add_argument('--workers', type=int, default=None, help="Processus pour les ajustements (défaut : tous les cœurs)")
+    parser.add_argument('--figures', choices=['all', 'recommended'], default='all')
+    parser.add_argument('--column-workers', type=int, default=None,
+                        help="Colonnes analysées en parallèle (1 = l'une après l'autre)")
+    args = parser.parse_args()
+    if args.range and len(args.topics) not in (2, 3):
+        parser.error("--range attend --topics début fin [pas]")
+    if args.range and len(args.topics) == 3 and args.topics[2] < 1:
+        parser.error("--range : le pas doit être positif")
+
     excel_file_path = "fichier_traduit.xlsx"
     colonnes_a_analyser = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']  # Liste des colonnes à analyser
-    topic_counts = [5, 10, 15]  # Tester plusieurs nombres de topics
-    main(excel_file_path, colonnes_a_analyser, topic_counts)
+    topic_counts = list(range(args.topics[0], args.topics[1] + 1, *args.topics[2:3])) if args.range else args.topics
+    main(excel_file_path, colonnes_a_analyser, topic_counts, args.workers, args.figures, args.column_workers)
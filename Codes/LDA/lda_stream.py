@@ -0,0 +1,296 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+from sklearn.decomposition import LatentDirichletAllocation
+from sklearn.feature_extraction.text import CountVectorizer, HashingVectorizer
+
+from lda import extract_topics
+
+TEXT_COLUMNS = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+CHUNK_SIZE = 5000
+HASHING_FEATURES = 2 ** 18
+MAX_TRACKED_TERMS = 200_000  # termes suivis au plus pendant la construction du vocabulaire
+
+
+# =============================
+# Lecture du corpus par blocs
+# =============================
+def iter_chunks(source: str, columns: list[str], chunk_size: int = CHUNK_SIZE,
+                table: str = 'Espace', query: str | None = None, with_rows: bool = False):
+    """
+    Lit le corpus par blocs de chunk_size lignes, sans jamais le charger en entier.
+    Les colonnes textuelles sont concaténées (comme 'combined' dans lda.py), les documents vides ignorés.
+    source : fichier .csv, .parquet ou base SQLite (.db, .sqlite, .sqlite3 ; table ou requête SQL).
+    with_rows : produit (numéros de ligne dans la source, à partir de 0, textes) au lieu des seuls textes,
+    pour relier chaque document à sa ligne malgré les documents vides ignorés.
+    """
+    extension = os.path.splitext(source)[1].lower()
+    if extension == '.csv':
+        frames = pd.read_csv(source, usecols=columns, chunksize=chunk_size, dtype=str)
+    elif extension in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+        frames = (batch.to_pandas() for batch in pq.ParquetFile(source).iter_batches(chunk_size, columns=columns))
+    elif extension in ('.db', '.sqlite', '.sqlite3'):
+        frames = _iter_sqlite(source, columns, chunk_size, table, query)
+    else:
+        raise ValueError(f"Format non pris en charge : {source} (csv, parquet ou SQLite)")
+
+    offset = 0
+    for frame in frames:
+        texts = frame[columns].fillna('').astype(str).agg(' '.join, axis=1).str.strip()
+        kept = (texts != '').to_numpy()
+        rows = offset + np.flatnonzero(kept)
+        offset += len(frame)
+        texts = texts[kept].tolist()
+        if texts:
+            yield (rows, texts) if with_rows else texts
+
+def _iter_sqlite(source: str, columns: list[str], chunk_size: int, table: str, query: str | None):
+    conn = sqlite3.connect(source)
+    try:
+        cursor = conn.execute(query or f"SELECT {', '.join(f'[{c}]' for c in columns)} FROM [{table}]")
+        names = [description[0] for description in cursor.description]
+        while rows := cursor.fetchmany(chunk_size):
+            yield pd.DataFrame(rows, columns=names)
+    finally:
+        conn.close()
+
+# =============================
+# Vectorisation sans état
+# =============================
+class HashedFeatureNames:
+    """
+    Noms lisibles des colonnes d'un HashingVectorizer : premier terme vu pour chaque case
+    de hachage (au plus n_features entrées, quelle que soit la taille du corpus).
+    """
+
+    def __init__(self, vectorizer: HashingVectorizer):
+        self.vectorizer = vectorizer
+        self.names = {}
+
+    def update(self, texts: list[str]):
+        analyzer = self.vectorizer.build_analyzer()
+        terms = list({term for text in texts for term in analyzer(text)})
+        if not terms:
+            return
+        # Une ligne par terme : l'indice de sa seule colonne non nulle est sa case de hachage
+        indices = self.vectorizer.transform(terms).tocsr().indices
+        for term, index in zip(terms, indices):
+            self.names.setdefault(int(index), term)
+
+    def feature_names(self) -> np.ndarray:
+        names = np.array([f"#{i}" for i in range(self.vectorizer.n_features)], dtype=object)
+        for index, term in self.names.items():
+            names[index] = term
+        return names
+
+def hashing_vectorizer(n_features: int = HASHING_FEATURES) -> HashingVectorizer:
+    # Comptes bruts positifs, comme CountVectorizer : c'est ce qu'attend LDA
+    return HashingVectorizer(stop_words='english', n_features=n_features, alternate_sign=False, norm=None)
+
+def build_vocabulary(chunks, max_features: int = 1000, max_tracked: int = MAX_TRACKED_TERMS) -> list[str]:
+    """
+    Premier passage : les max_features termes les plus fréquents, comme CountVectorizer(max_features).
+    Le compteur est élagué aux termes les plus fréquents dès qu'il dépasse max_tracked entrées,
+    pour borner la mémoire (les comptes des termes rares deviennent approximatifs).
+    """
+    analyzer = CountVectorizer(stop_words='english').build_analyzer()
+    counts = Counter()
+    for texts in chunks:
+        for text in texts:
+            counts.update(analyzer(text))
+        if len(counts) > max_tracked:
+            counts = Counter(dict(counts.most_common(max_tracked // 2)))
+    return sorted(term for term, _ in counts.most_common(max_features))
+
+# =============================
+# Apprentissage en ligne et sauvegardes
+# =============================
+def save_snapshot(snapshot_dir: str, state: dict):
+    """Sauvegarde atomique de l'état (modèle, vectoriseur, noms, blocs vus) ; garde aussi un latest.pkl."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    snapshot_file = os.path.join(snapshot_dir, f"lda_snapshot_{state['chunks_done']:06d}.pkl")
+    temporary = snapshot_file + '.tmp'
+    with open(temporary, 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(temporary, snapshot_file)
+    latest = os.path.join(snapshot_dir, 'latest.pkl')
+    with open(latest + '.tmp', 'wb') as f:
+        pickle.dump(state, f)
+    os.replace(latest + '.tmp', latest)
+    print(f"Sauvegarde après {state['chunks_done']} blocs : {snapshot_file}")
+
+def load_snapshot(snapshot_dir: str) -> dict | None:
+    latest = os.path.join(snapshot_dir, 'latest.pkl')
+    if not os.path.exists(latest):
+        return None
+    with open(latest, 'rb') as f:
+        return pickle.load(f)
+
+def source_fingerprint(source: str) -> dict:
+    """Taille et empreinte SHA-256 du corpus : un fichier modifié invalide les sauvegardes."""
+    digest = hashlib.sha256()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return {'size': os.path.getsize(source), 'sha256': digest.hexdigest()}
+
+def purge_snapshots(snapshot_dir: str):
+    """Supprime les sauvegardes (et fichiers temporaires) et le manifeste d'un apprentissage précédent."""
+    for pattern in ('lda_snapshot_*.pkl*', 'latest.pkl*', 'manifest.json'):
+        for path in glob.glob(os.path.join(snapshot_dir, pattern)):
+            os.remove(path)
+
+def check_manifest(snapshot_dir: str, manifest: dict, resume: bool) -> bool:
+    """
+    Vérifie qu'une reprise porte sur le même corpus (contenu compris), le même découpage et
+    les mêmes réglages du modèle et du vectoriseur. Sans reprise, ou sans manifeste à reprendre,
+    les anciennes sauvegardes sont supprimées. Renvoie True si la dernière sauvegarde peut être reprise.
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, 'manifest.json')
+    resumable = resume and os.path.exists(path)
+    if resumable:
+        with open(path, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(f"Les sauvegardes de '{snapshot_dir}' ne correspondent pas à ce corpus "
+                             f"ou à ces réglages : {previous}")
+    else:
+        if resume:
+            print(f"Pas de manifeste dans '{snapshot_dir}' : reprise impossible, apprentissage complet.")
+        purge_snapshots(snapshot_dir)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return resumable
+
+def prune_snapshots(snapshot_dir: str, keep: int):
+    snapshots = sorted(glob.glob(os.path.join(snapshot_dir, 'lda_snapshot_*.pkl')))
+    for old in snapshots[:-keep] if keep else []:
+        os.remove(old)
+
+def fit_streaming_lda(chunk_factory, n_topics: int = 10, vectorizer_mode: str = 'hashing',
+                      max_features: int = 1000, n_features: int = HASHING_FEATURES,
+                      total_docs: int = 1_000_000, passes: int = 1, snapshot_dir: str | None = None,
+                      snapshot_every: int = 10, keep_snapshots: int = 3, resume: bool = False,
+                      corpus: dict | None = None) -> dict:
+    """
+    LDA en ligne (partial_fit bloc par bloc) sur un corpus relu via chunk_factory(),
+    une fonction qui renvoie un nouvel itérateur de blocs de textes à chaque appel.
+    vectorizer_mode : 'hashing' (un seul passage, sans état) ou 'vocabulary'
+    (un passage de plus pour construire un vocabulaire de max_features termes).
+    total_docs : estimation du nombre de documents, utilisée par l'apprentissage en ligne.
+    corpus : description du corpus lu par chunk_factory (source, empreinte, colonnes, taille des blocs),
+    enregistrée avec les réglages dans le manifeste des sauvegardes ; --resume refuse une sauvegarde
+    faite sur un autre corpus ou avec d'autres réglages.
+    Renvoie l'état final : {'model', 'vectorizer', 'feature_names', 'chunks_done', 'docs_done'}.
+    """
+    state = None
+    if snapshot_dir:
+        manifest = {'corpus': corpus, 'n_topics': n_topics, 'vectorizer_mode': vectorizer_mode,
+                    'max_features': max_features, 'n_features': n_features, 'total_docs': total_docs}
+        if check_manifest(snapshot_dir, manifest, resume):
+            state = load_snapshot(snapshot_dir)
+    if state is not None:
+        print(f"Reprise après {state['chunks_done']} blocs ({state['docs_done']} documents).")
+    else:
+        if vectorizer_mode == 'hashing':
+            vectorizer = hashing_vectorizer(n_features)
+        else:
+            vectorizer = CountVectorizer(stop_words='english', vocabulary=build_vocabulary(chunk_factory(), max_features))
+        state = {
+            'model': LatentDirichletAllocation(n_components=n_topics, learning_method='online',
+                                               total_samples=total_docs, random_state=42),
+            'vectorizer': vectorizer,
+            'names': HashedFeatureNames(vectorizer) if vectorizer_mode == 'hashing' else None,
+            'chunks_done': 0,
+            'docs_done': 0,
+        }
+
+    chunk_index = 0
+    for _ in range(passes):
+        for texts in chunk_factory():
+            chunk_index += 1
+            if chunk_index <= state['chunks_done']:
+                continue  # déjà appris avant la reprise
+            state['model'].partial_fit(state['vectorizer'].transform(texts))
+            if state['names'] is not None:
+                state['names'].update(texts)
+            state['chunks_done'] = chunk_index
+            state['docs_done'] += len(texts)
+            if chunk_index % 10 == 0:
+                print(f"{chunk_index} blocs, {state['docs_done']} documents appris.")
+            if snapshot_dir and chunk_index % snapshot_every == 0:
+                save_snapshot(snapshot_dir, state)
+                prune_snapshots(snapshot_dir, keep_snapshots)
+
+    if snapshot_dir:
+        save_snapshot(snapshot_dir, state)
+        prune_snapshots(snapshot_dir, keep_snapshots)
+    if state['names'] is not None:
+        state['feature_names'] = state['names'].feature_names()
+    else:
+        state['feature_names'] = state['vectorizer'].get_feature_names_out()
+    return state
+
+def write_topic_distributions(chunks, state: dict, output_file: str):
+    """
+    Distributions des topics par document, écrites bloc par bloc dans un CSV.
+    chunks : blocs (numéros de ligne, textes) de iter_chunks(..., with_rows=True) ; la colonne 'row'
+    donne la ligne de la source de chaque document (les documents vides n'ont pas de distribution).
+    """
+    model, vectorizer = state['model'], state['vectorizer']
+    columns = [f"Topic_{i}" for i in range(model.n_components)]
+    header = True
+    for rows, texts in chunks:
+        distributions = pd.DataFrame(model.transform(vectorizer.transform(texts)), columns=columns)
+        distributions.insert(0, 'row', rows)
+        distributions.to_csv(output_file, mode='w' if header else 'a', header=header, index=False)
+        header = False
+    print(f"Distributions des topics sauvegardées dans {output_file}.")
+
+def main():
+    parser = argparse.ArgumentParser(description="LDA en ligne sur un corpus lu par blocs (CSV, Parquet, SQLite).")
+    parser.add_argument('source', help="Fichier .csv, .parquet ou base SQLite")
+    parser.add_argument('--columns', nargs='+', default=TEXT_COLUMNS, help="Colonnes textuelles à concaténer")
+    parser.add_argument('--table', default='Espace', help="Table SQLite à lire")
+    parser.add_argument('--query', help="Requête SQLite à la place de --table")
+    parser.add_argument('--topics', type=int, default=10)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--vectorizer', choices=['hashing', 'vocabulary'], default='hashing',
+                        help="hashing : un seul passage ; vocabulary : passage supplémentaire, max_features termes")
+    parser.add_argument('--max-features', type=int, default=1000)
+    parser.add_argument('--n-features', type=int, default=HASHING_FEATURES)
+    parser.add_argument('--total-docs', type=int, default=1_000_000, help="Estimation du nombre de documents")
+    parser.add_argument('--passes', type=int, default=1)
+    parser.add_argument('--snapshots', default='results_lda/stream_snapshots', help="Dossier des sauvegardes")
+    parser.add_argument('--snapshot-every', type=int, default=10, help="Blocs entre deux sauvegardes")
+    parser.add_argument('--keep-snapshots', type=int, default=3)
+    parser.add_argument('--resume', action='store_true', help="Reprendre depuis la dernière sauvegarde")
+    parser.add_argument('--distributions', help="CSV des distributions des topics par document (passage supplémentaire)")
+    args = parser.parse_args()
+
+    def chunk_factory(with_rows=False):
+        return iter_chunks(args.source, args.columns, args.chunk_size, args.table, args.query, with_rows)
+
+    corpus = {'source': os.path.abspath(args.source), 'content': source_fingerprint(args.source),
+              'columns': args.columns, 'table': args.table, 'query': args.query, 'chunk_size': args.chunk_size}
+    state = fit_streaming_lda(chunk_factory, args.topics, args.vectorizer, args.max_features, args.n_features,
+                              args.total_docs, args.passes, args.snapshots, args.snapshot_every,
+                              args.keep_snapshots, args.resume, corpus)
+
+    for topic_num, words_with_weights in extract_topics(state['model'], state['feature_names']).items():
+        print(f"Topic {topic_num}: {', '.join(word for word, _ in words_with_weights)}")
+    if args.distributions:
+        write_topic_distributions(chunk_factory(with_rows=True), state, args.distributions)
+
+if __name__ == "__main__":
+    main()
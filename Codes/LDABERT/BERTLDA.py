@@ -2,8 +2,6 @@ import pandas as pd
 import numpy as np
 from sklearn.decomposition import LatentDirichletAllocation
 from sklearn.feature_extraction.text import CountVectorizer
-from transformers import BertTokenizer, BertModel
-import torch
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.manifold import TSNE
@@ -11,6 +9,9 @@ import plotly.express as px
 import plotly.graph_objects as go
 import os
 
+from bert_encoder import get_encoder, timed_encode
+from similarity import export_similarity, heatmap_matrix, top_k_similarity
+
 def create_output_directory(column_name):
     dir_name = f"analysis_results_{column_name}"
     os.makedirs(dir_name, exist_ok=True)
@@ -86,27 +87,15 @@ def visualize_lda_results(topics, lda_output, texts, output_dir):
 
     return generated_files
 
-def perform_bert_analysis(texts):
+def perform_bert_analysis(texts, quantize=False, pooling='cls', torch_threads=None):
     if not texts or all(pd.isna(text) or text == '' for text in texts):
         return None
-        
-    tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-    model = BertModel.from_pretrained('bert-base-uncased')
-    
-    model.eval()
-    embeddings = []
-    
-    with torch.no_grad():
-        for text in texts:
-            if pd.isna(text) or text == '':
-                embeddings.append(np.zeros(768))
-                continue
-            inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-            outputs = model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].numpy()
-            embeddings.append(embedding[0])
-    
-    return np.array(embeddings)
+
+    # Shared encoder: the model is loaded once per process, not once per column;
+    # empty cells are masked out and keep a zero vector
+    encoder = get_encoder(quantize=quantize, torch_threads=torch_threads)
+    embeddings, _ = timed_encode(encoder, texts, pooling)
+    return embeddings
 
 def visualize_bert_embeddings(embeddings, texts, output_dir):
     if embeddings is None:
@@ -128,14 +117,17 @@ def visualize_bert_embeddings(embeddings, texts, output_dir):
     fig.write_html(scatter_file)
     generated_files.append(scatter_file)
 
-    similarity_matrix = np.corrcoef(embeddings)
+    # Sparse top-k cosine similarity (O(n*k)) instead of a dense n x n correlation matrix;
+    # the heatmap shows at most MAX_HEATMAP_SIZE rows (means over groups of documents)
+    similarity = top_k_similarity(embeddings)
     plt.figure(figsize=(12, 8))
-    sns.heatmap(similarity_matrix, cmap='coolwarm')
+    sns.heatmap(heatmap_matrix(similarity), cmap='coolwarm')
     plt.title('Document Similarity Matrix (BERT)')
     matrix_file = f'{output_dir}/bert_similarity_matrix.png'
     plt.savefig(matrix_file)
     plt.close()
     generated_files.append(matrix_file)
+    generated_files += export_similarity(similarity, output_dir)
 
     try:
         from wordcloud import WordCloud
@@ -176,7 +168,7 @@ def display_results_summary(results):
                 for file in files:
                     print(f"- {file}")
 
-def main(excel_file, columns_to_analyze, n_topics=5):
+def main(excel_file, columns_to_analyze, n_topics=5, quantize=False, pooling='cls', torch_threads=None):
     df = prepare_data(excel_file)
     results = {}
 
@@ -187,7 +179,7 @@ def main(excel_file, columns_to_analyze, n_topics=5):
         topics, lda_output, lda_model, vectorizer = perform_lda_analysis(texts, n_topics)
         lda_files = visualize_lda_results(topics, lda_output, texts, output_dir)
 
-        bert_embeddings = perform_bert_analysis(texts)
+        bert_embeddings = perform_bert_analysis(texts, quantize, pooling, torch_threads)
         bert_files = visualize_bert_embeddings(bert_embeddings, texts, output_dir)
 
         results[column] = {
@@ -207,7 +199,9 @@ columns_to_analyze = ['presentation', 'historique', 'activites', 'réponse1', 'r
 results = main(
     excel_file="fichier_trad.xlsx",
     columns_to_analyze=columns_to_analyze,
-    n_topics=5  # Vous pouvez ajuster le nombre de topics si nécessaire
+    n_topics=5,  # Vous pouvez ajuster le nombre de topics si nécessaire
+    quantize=False,  # True : encodeur BERT quantifié en int8 (CPU)
+    pooling='cls'  # 'mean' : moyenne des vecteurs des tokens au lieu du vecteur [CLS]
 )
 
 # Afficher le résumé des résultats
@@ -2,14 +2,22 @@ import pandas as pd
 import numpy as np
 from sklearn.decomposition import LatentDirichletAllocation
 from sklearn.feature_extraction.text import CountVectorizer
-from transformers import BertTokenizer, BertModel
-import torch
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.manifold import TSNE
 import plotly.express as px
 import plotly.graph_objects as go
 import os
+import sys
+
+from bert_encoder import get_encoder, timed_encode
+from similarity import export_similarity, heatmap_matrix, top_k_similarity
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'LDA'))
+from column_scheduler import plan_workers, run_columns
+from figure_jobs import doc_topic_heatmap_job, dominant_order, figure_job, render_figures
+
+MEMORY_PER_WORKER_GB = 2.5  # bert-base-uncased, its activations and the LDA/TSNE work per worker
 
 def create_output_directory(column_name):
     dir_name = f"analysis_results_{column_name}"
@@ -45,76 +53,45 @@ def perform_lda_analysis(texts, n_topics=5):
         
     return topics, lda_output, lda_model, vectorizer
 
-def visualize_lda_results(topics, lda_output, texts, output_dir):
+def visualize_lda_results(topics, lda_output, texts, output_dir, max_workers=None):
     if topics is None or lda_output is None:
         return []
 
-    generated_files = []
+    # Figures described as jobs: unchanged ones are skipped, the others render in parallel (Agg)
+    jobs = []
     
-    # 1. Topic Distribution Heatmap
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(lda_output, cmap='YlOrRd', xticklabels=[f'Topic {i+1}' for i in range(lda_output.shape[1])])
-    plt.title('Topic Distribution Across Documents')
-    plt.xlabel('Topics')
-    plt.ylabel('Documents')
-    plt.tight_layout()
-    heatmap_file = f'{output_dir}/lda_heatmap.png'
-    plt.savefig(heatmap_file)
-    plt.close()
-    generated_files.append(heatmap_file)
+    # 1. Topic Distribution Heatmap (large corpora: rows binned by dominant topic)
+    jobs.append(doc_topic_heatmap_job(f'{output_dir}/lda_heatmap.png', lda_output, cmap='YlOrRd',
+                                      xticklabels=[f'Topic {i+1}' for i in range(lda_output.shape[1])],
+                                      title='Topic Distribution Across Documents', xlabel='Topics',
+                                      tight_layout=True))
 
     # 2. Interactive Topic Distribution
-    fig = go.Figure()
-    for i in range(lda_output.shape[1]):
-        fig.add_trace(go.Box(y=lda_output[:, i], name=f'Topic {i+1}'))
-    fig.update_layout(title='Topic Distribution Box Plot',
-                     yaxis_title='Topic Weight',
-                     showlegend=True)
-    dist_file = f'{output_dir}/topic_distribution.html'
-    fig.write_html(dist_file)
-    generated_files.append(dist_file)
+    jobs.append(figure_job('topic_boxplot_html', f'{output_dir}/topic_distribution.html', lda_output=lda_output))
 
     # 3. Word Cloud for each topic
     try:
-        from wordcloud import WordCloud
+        import wordcloud
         for topic_num, words in topics.items():
-            wordcloud = WordCloud(width=800, height=400, background_color='white').generate(' '.join(words))
-            plt.figure(figsize=(10, 5))
-            plt.imshow(wordcloud, interpolation='bilinear')
-            plt.axis('off')
-            plt.title(f'Word Cloud - {topic_num}')
-            cloud_file = f'{output_dir}/wordcloud_topic_{topic_num.split()[-1]}.png'
-            plt.savefig(cloud_file)
-            plt.close()
-            generated_files.append(cloud_file)
+            jobs.append(figure_job('wordcloud', f'{output_dir}/wordcloud_topic_{topic_num.split()[-1]}.png',
+                                   title=f'Word Cloud - {topic_num}', text=' '.join(words)))
     except ImportError:
         print("WordCloud package not installed. Skipping word cloud visualization.")
 
-    return generated_files
+    render_figures(jobs, max_workers)
+    return [job['output_file'] for job in jobs]
 
-def perform_bert_analysis(texts):
+def perform_bert_analysis(texts, quantize=False, pooling='cls', torch_threads=None):
     if not texts or all(pd.isna(text) or text == '' for text in texts):
         return None
-        
-    tokenizer = BertTokenizer.from_pretrained('bert-base-uncased')
-    model = BertModel.from_pretrained('bert-base-uncased')
-    
-    model.eval()
-    embeddings = []
-    
-    with torch.no_grad():
-        for text in texts:
-            if pd.isna(text) or text == '':
-                embeddings.append(np.zeros(768))  # BERT base hidden size
-                continue
-            inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-            outputs = model(**inputs)
-            embedding = outputs.last_hidden_state[:, 0, :].numpy()
-            embeddings.append(embedding[0])
-    
-    return np.array(embeddings)
 
-def visualize_bert_embeddings(embeddings, texts, output_dir):
+    # Shared encoder: the model is loaded once per process, not once per column;
+    # empty cells are masked out and keep a zero vector
+    encoder = get_encoder(quantize=quantize, torch_threads=torch_threads)
+    embeddings, _ = timed_encode(encoder, texts, pooling)
+    return embeddings
+
+def visualize_bert_embeddings(embeddings, texts, output_dir, order=None, max_workers=None):
     if embeddings is None:
         return []
 
@@ -135,29 +112,30 @@ def visualize_bert_embeddings(embeddings, texts, output_dir):
     fig.write_html(scatter_file)
     generated_files.append(scatter_file)
 
-    # Calculate and visualize similarity matrix
-    similarity_matrix = np.corrcoef(embeddings)
-    plt.figure(figsize=(12, 8))
-    sns.heatmap(similarity_matrix, cmap='coolwarm')
-    plt.title('Document Similarity Matrix (BERT)')
+    # Sparse top-k cosine similarity (O(n*k)) instead of a dense n x n correlation matrix;
+    # the heatmap shows at most MAX_HEATMAP_SIZE rows, grouped by dominant topic when known
+    similarity = top_k_similarity(embeddings)
     matrix_file = f'{output_dir}/bert_similarity_matrix.png'
-    plt.savefig(matrix_file)
-    plt.close()
+    render_figures([figure_job('heatmap', matrix_file, matrix=heatmap_matrix(similarity, order), cmap='coolwarm',
+                               title='Document Similarity Matrix (BERT)')], max_workers)
     generated_files.append(matrix_file)
+    generated_files += export_similarity(similarity, output_dir)
 
     return generated_files
 
-def analyze_column(df, column_name, n_topics=5):
+def analyze_column(df, column_name, n_topics=5, quantize=False, pooling='cls', torch_threads=None):
     output_dir = create_output_directory(column_name)
     texts = df[column_name].fillna('').tolist()
     
     # LDA Analysis
     topics, lda_output, lda_model, vectorizer = perform_lda_analysis(texts, n_topics)
-    lda_files = visualize_lda_results(topics, lda_output, texts, output_dir)
+    # Same per-worker core budget for the figure processes as for torch
+    lda_files = visualize_lda_results(topics, lda_output, texts, output_dir, torch_threads)
     
     # BERT Analysis
-    bert_embeddings = perform_bert_analysis(texts)
-    bert_files = visualize_bert_embeddings(bert_embeddings, texts, output_dir)
+    bert_embeddings = perform_bert_analysis(texts, quantize, pooling, torch_threads)
+    order = dominant_order(lda_output) if lda_output is not None else None
+    bert_files = visualize_bert_embeddings(bert_embeddings, texts, output_dir, order, torch_threads)
     
     # Save topic information to file
     topic_file = f'{output_dir}/topic_words.txt'
@@ -180,9 +158,15 @@ def analyze_column(df, column_name, n_topics=5):
         }
     }
 
-def main(excel_file, columns_to_analyze, n_topics=5):
+def main(excel_file, columns_to_analyze, n_topics=5, quantize=False, pooling='cls', torch_threads=None,
+         max_workers=None):
     """
     Main function to run the complete analysis
+    quantize: use an int8 dynamically quantized BERT encoder (CPU)
+    pooling: 'cls' (first token) or 'mean' (average of the real tokens) document vectors
+    torch_threads: number of CPU threads used by torch in each worker (default: cores / workers)
+    max_workers: columns analysed in parallel (default: bounded by cores and available memory,
+    each worker loads its own BERT model; 1 = one column after the other)
     """
     # Load data
     df = prepare_data(excel_file)
@@ -192,13 +176,12 @@ def main(excel_file, columns_to_analyze, n_topics=5):
     if missing_columns:
         raise ValueError(f"Columns not found in file: {', '.join(missing_columns)}")
     
-    # Analyze each column
-    results = {}
-    for column in columns_to_analyze:
-        print(f"\nAnalyzing column: {column}")
-        results[column] = analyze_column(df, column, n_topics)
-    
-    return results
+    # Analyze the columns in parallel; a failing column is reported and left out
+    workers = plan_workers(len(columns_to_analyze), max_workers, MEMORY_PER_WORKER_GB)
+    torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // workers)
+    jobs = {column: (df[[column]], column, n_topics, quantize, pooling, torch_threads)
+            for column in columns_to_analyze}
+    return run_columns(analyze_column, jobs, workers)
 
 def display_results_summary(results):
     print("\n=== Analysis Results Summary ===")
@@ -221,15 +204,18 @@ def display_results_summary(results):
                 for file in files:
                     print(f"- {file}")
 
-# Liste des colonnes à analyser
-columns_to_analyze = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
-
-# Lancer l'analyse
-results = main(
-    excel_file="fichier_trad.xlsx",
-    columns_to_analyze=columns_to_analyze,
-    n_topics=5  
-)
+if __name__ == "__main__":
+    # Liste des colonnes à analyser
+    columns_to_analyze = ['presentation', 'historique', 'activites', 'réponse1', 'réponse2']
+
+    # Lancer l'analyse
+    results = main(
+        excel_file="fichier_trad.xlsx",
+        columns_to_analyze=columns_to_analyze,
+        n_topics=5,
+        quantize=False,  # True: int8 BERT encoder, see Codes/Bertopic S1/quantification.py for the quality check
+        pooling='cls'  # 'mean': average of the token vectors instead of the [CLS] vector
+    )
 
-# Afficher le résumé des résultats
-display_results_summary(results)
+    # Afficher le résumé des résultats
+    display_results_summary(results)
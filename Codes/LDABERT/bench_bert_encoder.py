@@ -0,0 +1,74 @@
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import BertModel, BertTokenizer
+
+from bert_encoder import MODEL_NAME, BertEncoder
+
+WORDS = ["the", "artists", "were", "running", "a", "small", "gallery", "in", "Berlin", "since", "2004",
+         "with", "workshops", "and", "residencies", "for", "young", "painters", "exhibitions", "collective",
+         "neighbourhood", "studios", "is", "organised", "by", "volunteers", "who", "curate", "shows"]
+
+
+def encode_one_by_one(texts, model_name=MODEL_NAME):
+    """Previous version: model loaded for the column, one forward pass per text."""
+    tokenizer = BertTokenizer.from_pretrained(model_name)
+    model = BertModel.from_pretrained(model_name)
+    model.eval()
+    embeddings = []
+    with torch.no_grad():
+        for text in texts:
+            if pd.isna(text) or text == '':
+                embeddings.append(np.zeros(768))
+                continue
+            inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
+            outputs = model(**inputs)
+            embeddings.append(outputs.last_hidden_state[:, 0, :].numpy()[0])
+    return np.array(embeddings)
+
+def synthetic_texts(n_texts, empty_share=0.1, seed=0):
+    """Texts of very different lengths (5 to 400 words), some of them empty."""
+    rng = random.Random(seed)
+    texts = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 400))) + '.' for _ in range(n_texts)]
+    for i in rng.sample(range(n_texts), int(n_texts * empty_share)):
+        texts[i] = ''
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser(description="texts/s of the BERT encoding: one text at a time vs batched.")
+    parser.add_argument('--model', default=MODEL_NAME)
+    parser.add_argument('--texts', type=int, default=500)
+    parser.add_argument('--file', help="Translated Excel file to use instead of synthetic texts")
+    parser.add_argument('--column', default='presentation')
+    parser.add_argument('--batch-size', type=int, nargs='+', default=[8, 16, 32])
+    parser.add_argument('--quantize', action='store_true')
+    args = parser.parse_args()
+
+    if args.file:
+        texts = pd.read_excel(args.file)[args.column].tolist()
+    else:
+        texts = synthetic_texts(args.texts)
+    n_texts = sum(not (pd.isna(text) or text == '') for text in texts)
+
+    start = time.perf_counter()
+    reference = encode_one_by_one(texts, args.model)
+    duration = time.perf_counter() - start
+    print(f"{'one text at a time':<28}: {n_texts / duration:8.1f} texts/s ({duration:.2f}s)")
+
+    for batch_size in args.batch_size:
+        encoder = BertEncoder(args.model, args.quantize, batch_size=batch_size)
+        start = time.perf_counter()
+        embeddings, _ = encoder.encode(texts)
+        duration = time.perf_counter() - start
+        # Padding is masked out, so the CLS vectors only differ by float rounding
+        # (unless --quantize, which changes the model itself)
+        max_diff = float(np.abs(embeddings - reference).max())
+        print(f"{f'batched, batch size {batch_size}':<28}: {n_texts / duration:8.1f} texts/s "
+              f"({duration:.2f}s, max |diff| {max_diff:.2e})")
+
+if __name__ == '__main__':
+    main()
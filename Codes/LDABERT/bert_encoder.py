@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+from transformers import BertModel, BertTokenizerFast
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Bertopic S1'))
+from quantification import quantize_model
+
+MODEL_NAME = 'bert-base-uncased'
+BATCH_SIZE = 16
+MAX_LENGTH = 512
+
+# One encoder per (model, quantize) and per process, shared by every column
+_encoders = {}
+
+
+class BertEncoder:
+    """
+    BERT encoder loaded once, encoding texts in length-sorted mini-batches
+    padded only to the longest text of each batch.
+    """
+
+    def __init__(self, model_name=MODEL_NAME, quantize=False, batch_size=BATCH_SIZE, max_length=MAX_LENGTH):
+        self.tokenizer = BertTokenizerFast.from_pretrained(model_name)
+        self.model = BertModel.from_pretrained(model_name)
+        self.model.eval()
+        if quantize:
+            # Same dynamic int8 quantization as the translation model (CPU inference)
+            self.model = quantize_model(self.model)
+        self.hidden_size = self.model.config.hidden_size
+        self.batch_size = batch_size
+        self.max_length = max_length
+
+    def encode(self, texts, pooling='cls'):
+        """
+        Embeddings of the non-empty texts and the boolean mask of those texts.
+        Empty or missing cells are never sent to the model; their rows stay at zero.
+        pooling: 'cls' (first token, as before) or 'mean' (average over real tokens).
+        """
+        mask = np.array([not (pd.isna(text) or text == '') for text in texts], dtype=bool)
+        embeddings = np.zeros((len(texts), self.hidden_size), dtype=np.float32)
+        positions = np.flatnonzero(mask)
+        if not len(positions):
+            return embeddings, mask
+
+        # Tokenize once, then pad each batch of similar lengths
+        encoded = self.tokenizer([texts[i] for i in positions], truncation=True, max_length=self.max_length)
+        order = np.argsort([len(ids) for ids in encoded['input_ids']], kind='stable')
+
+        with torch.inference_mode():
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                inputs = self.tokenizer.pad({key: [values[i] for i in batch] for key, values in encoded.items()},
+                                            return_tensors='pt')
+                hidden = self.model(**inputs).last_hidden_state
+                if pooling == 'mean':
+                    weights = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                    vectors = (hidden * weights).sum(dim=1) / weights.sum(dim=1).clamp(min=1)
+                else:
+                    vectors = hidden[:, 0, :]
+                embeddings[positions[batch]] = vectors.numpy()
+        return embeddings, mask
+
+def get_encoder(model_name=MODEL_NAME, quantize=False, torch_threads=None, **options):
+    """Encoder shared within the process (the model is loaded on first use only)."""
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    key = (model_name, quantize)
+    if key not in _encoders:
+        _encoders[key] = BertEncoder(model_name, quantize, **options)
+    return _encoders[key]
+
+def report_throughput(n_texts, duration):
+    print(f"BERT: {n_texts} texts encoded in {duration:.2f}s ({n_texts / max(duration, 1e-9):.1f} texts/s)")
+
+def timed_encode(encoder, texts, pooling='cls'):
+    start = time.perf_counter()
+    embeddings, mask = encoder.encode(texts, pooling)
+    report_throughput(int(mask.sum()), time.perf_counter() - start)
+    return embeddings, mask
@@ -0,0 +1,110 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy import sparse
+
+TOP_K = 10
+BLOCK_SIZE = 1024
+MAX_HEATMAP_SIZE = 500
+
+
+def normalize_rows(embeddings):
+    """float32 unit-norm rows; all-zero rows (empty cells) stay at zero."""
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+def _top_k_block(vectors, valid, start, stop, k, threshold):
+    """Top-k cosine neighbours of rows start:stop as (rows, cols, values)."""
+    similarities = vectors[start:stop] @ vectors.T
+    similarities[:, ~valid] = -np.inf
+    similarities[np.arange(stop - start), np.arange(start, stop)] = -np.inf  # no self-loops
+    k = min(k, similarities.shape[1])
+    cols = np.argpartition(similarities, -k, axis=1)[:, -k:]
+    values = np.take_along_axis(similarities, cols, axis=1)
+    keep = np.isfinite(values) & valid[start:stop, np.newaxis]
+    if threshold is not None:
+        keep &= values >= threshold
+    rows = np.broadcast_to(np.arange(start, stop)[:, np.newaxis], cols.shape)
+    return rows[keep], cols[keep], values[keep]
+
+def top_k_similarity(embeddings, k=TOP_K, threshold=None, block_size=BLOCK_SIZE, n_jobs=None):
+    """
+    Sparse cosine similarity: for each item, its k most similar other items
+    (optionally only those with similarity >= threshold), as an n x n CSR matrix.
+    Rows are processed in blocks of block_size, so memory is O(block_size * n + n * k)
+    instead of the O(n^2) of a dense matrix; blocks run on n_jobs threads (numpy releases the GIL).
+    Empty (all-zero) embeddings get no neighbours and are nobody's neighbour.
+    """
+    vectors = normalize_rows(embeddings)
+    n = len(vectors)
+    valid = vectors.any(axis=1)
+    starts = range(0, n, block_size)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        blocks = list(executor.map(
+            lambda start: _top_k_block(vectors, valid, start, min(start + block_size, n), k, threshold), starts))
+    if not blocks:
+        return sparse.csr_matrix((0, 0), dtype=np.float32)
+    rows, cols, values = (np.concatenate(parts) for parts in zip(*blocks))
+    return sparse.csr_matrix((values, (rows, cols)), shape=(n, n), dtype=np.float32)
+
+def symmetrize(similarity):
+    """
+    i and j are linked if either is among the other's top-k neighbours, with the stored
+    similarity (the larger one if both sides kept the pair). Unlike maximum(A, A.T), a
+    negative similarity kept by one side only is not replaced by the implicit zero.
+    """
+    entries = similarity.tocoo()
+    if not entries.nnz:
+        return sparse.csr_matrix(similarity.shape, dtype=similarity.dtype)
+    # Both directions of every stored pair, grouped by (row, col); one value per group
+    rows = np.concatenate([entries.row, entries.col])
+    cols = np.concatenate([entries.col, entries.row])
+    values = np.concatenate([entries.data, entries.data])
+    order = np.lexsort((cols, rows))
+    rows, cols, values = rows[order], cols[order], values[order]
+    starts = np.flatnonzero(np.r_[True, (np.diff(rows) != 0) | (np.diff(cols) != 0)])
+    return sparse.csr_matrix((np.maximum.reduceat(values, starts), (rows[starts], cols[starts])),
+                             shape=similarity.shape, dtype=similarity.dtype)
+
+def heatmap_matrix(similarity, order=None, max_size=MAX_HEATMAP_SIZE):
+    """
+    Dense matrix to draw, at most max_size x max_size: the (reordered) similarity matrix itself
+    for small inputs, otherwise the mean similarity between groups of consecutive items.
+    order: optional item order, e.g. by dominant topic, so that groups are meaningful.
+    """
+    similarity = symmetrize(similarity)
+    if order is not None:
+        similarity = similarity[order][:, order]
+    n = similarity.shape[0]
+    if n <= max_size:
+        return similarity.toarray()
+    # Averaging operator: one row per group of about n / max_size items
+    groups = np.arange(n) * max_size // n
+    counts = np.bincount(groups, minlength=max_size)
+    averaging = sparse.csr_matrix((1.0 / counts[groups], (groups, np.arange(n))), shape=(max_size, n))
+    return (averaging @ similarity @ averaging.T).toarray()
+
+def to_network(similarity, nodes=None):
+    """
+    {'nodes': [...], 'edges': [{'source', 'target', 'weight'}]}, the format of the
+    semantic_network_*.json files; each undirected edge appears once.
+    nodes: optional list of dicts (one per item) merged into the node entries.
+    """
+    edges = sparse.triu(symmetrize(similarity), k=1).tocoo()
+    return {
+        'nodes': [{'id': i, **(nodes[i] if nodes is not None else {})} for i in range(similarity.shape[0])],
+        'edges': [{'source': int(i), 'target': int(j), 'weight': float(w)}
+                  for i, j, w in zip(edges.row, edges.col, edges.data)],
+    }
+
+def export_similarity(similarity, output_dir, prefix='bert', nodes=None):
+    """Saves the sparse matrix (.npz) and the semantic network (.json); returns both paths."""
+    matrix_file = os.path.join(output_dir, f'{prefix}_similarity_topk.npz')
+    sparse.save_npz(matrix_file, similarity)
+    network_file = os.path.join(output_dir, f'{prefix}_semantic_network.json')
+    with open(network_file, 'w', encoding='utf-8') as f:
+        json.dump(to_network(similarity, nodes), f, ensure_ascii=False)
+    return [matrix_file, network_file]
@@ -1,4 +1,12 @@
+import argparse
+import glob
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import docx
+import numpy as np
 import pandas as pd
 import os
 
@@ -32,6 +40,116 @@ def extraire_donnees_depuis_docx(chemin_docx):
     
     return donnees
 
+def lister_fichiers_docx(source):
+    """Liste les fichiers .docx d'un dossier, d'un motif glob ou un fichier seul."""
+    if os.path.isdir(source):
+        source = os.path.join(source, '*.docx')
+    return sorted(glob.glob(source))
+
+def empreinte_fichier(chemin):
+    """Empreinte SHA-256 du contenu d'un fichier."""
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(1 << 20), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+def sauvegarder_etat(chemin_etat, etat):
+    """Enregistre les empreintes des fichiers DOCX intégrés (les fichiers en échec en sont absents)."""
+    with open(chemin_etat, 'w', encoding='utf-8') as f:
+        json.dump(etat, f, ensure_ascii=False, indent=2)
+
+def enregistrements_docx(chemin_docx):
+    """Extrait un fichier DOCX sous forme de liste de (nom, question, réponse)."""
+    return [(entree['nom'], question, reponse)
+            for entree in extraire_donnees_depuis_docx(chemin_docx)
+            for question, reponse in entree['questions_reponses'].items()]
+
+def chemin_extrait(dossier_extraits, empreinte):
+    return os.path.join(dossier_extraits, f"{empreinte}.json")
+
+def charger_extrait(dossier_extraits, empreinte):
+    """Enregistrements déjà extraits d'un fichier de même empreinte, None s'il n'y en a pas."""
+    chemin = chemin_extrait(dossier_extraits, empreinte)
+    if not os.path.exists(chemin):
+        return None
+    with open(chemin, encoding='utf-8') as f:
+        return [tuple(enregistrement) for enregistrement in json.load(f)]
+
+def sauvegarder_extrait(dossier_extraits, empreinte, enregistrements):
+    """Écrit les enregistrements d'un fichier dès leur extraction (écriture atomique)."""
+    chemin = chemin_extrait(dossier_extraits, empreinte)
+    with open(chemin + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(enregistrements, f, ensure_ascii=False)
+    os.replace(chemin + '.tmp', chemin)
+
+def ingerer_docx(source, etat, n_processus=None, dossier_extraits='extraits_docx', relire=False):
+    """
+    Générateur de (nom, question, réponse) sur tous les fichiers DOCX de `source`.
+    Les fichiers dont un extrait de même empreinte existe dans `dossier_extraits` (fichiers
+    inchangés, ou déjà extraits avant une interruption) sont rejoués sans être relus ; les
+    autres, ou tous si `relire`, sont analysés en parallèle et leur extrait écrit dès qu'il arrive.
+    Un fichier illisible est signalé puis ignoré, sans interrompre les autres ; il reste
+    absent de `etat` et sera réessayé à la prochaine exécution.
+    Les enregistrements sont produits dans l'ordre des fichiers, `etat` est complété
+    au fur et à mesure (voir sauvegarder_etat).
+    """
+    debut = time.perf_counter()
+    os.makedirs(dossier_extraits, exist_ok=True)
+    fichiers = lister_fichiers_docx(source)
+    empreintes = {chemin: empreinte_fichier(chemin) for chemin in fichiers}
+    resultats = {chemin: None if relire else charger_extrait(dossier_extraits, empreintes[chemin])
+                 for chemin in fichiers}
+    a_analyser = [chemin for chemin in fichiers if resultats[chemin] is None]
+    n_enregistrements = n_echecs = suivant = 0
+
+    def produire_prets():
+        # Fichiers terminés (ou en échec, None) au début de la liste, dans l'ordre des fichiers
+        nonlocal n_enregistrements, suivant
+        while suivant < len(fichiers) and fichiers[suivant] in resultats:
+            chemin = fichiers[suivant]
+            enregistrements = resultats.pop(chemin)
+            suivant += 1
+            if enregistrements is None:
+                continue
+            yield from enregistrements
+            n_enregistrements += len(enregistrements)
+            etat[chemin] = empreintes[chemin]
+
+    for chemin in a_analyser:
+        del resultats[chemin]
+    yield from produire_prets()
+    with ProcessPoolExecutor(max_workers=n_processus) as executor:
+        futures = {executor.submit(enregistrements_docx, chemin): chemin for chemin in a_analyser}
+        for future in as_completed(futures):
+            chemin = futures[future]
+            try:
+                resultats[chemin] = future.result()
+                sauvegarder_extrait(dossier_extraits, empreintes[chemin], resultats[chemin])
+            except Exception as e:
+                n_echecs += 1
+                resultats[chemin] = None
+                print(f"Échec de la lecture de {chemin} : {type(e).__name__}: {e}")
+            yield from produire_prets()
+
+    duree = max(time.perf_counter() - debut, 1e-9)
+    print(f"{len(fichiers)} fichiers DOCX ({len(a_analyser)} analysés, "
+          f"{len(fichiers) - len(a_analyser)} rejoués depuis leur extrait, {n_echecs} en échec), "
+          f"{n_enregistrements} enregistrements en {duree:.2f}s "
+          f"({len(fichiers) / duree:.1f} fichiers/s, {n_enregistrements / duree:.1f} enregistrements/s)")
+
+def regrouper_enregistrements(enregistrements):
+    """Regroupe les (nom, question, réponse) consécutifs d'un même nom au format de extraire_donnees_depuis_docx."""
+    entree = None
+    for nom, question, reponse in enregistrements:
+        if entree is None or entree['nom'] != nom:
+            if entree is not None:
+                yield entree
+            entree = {'nom': nom, 'questions_reponses': {}}
+        entree['questions_reponses'][question] = reponse
+    if entree is not None:
+        yield entree
+
 def charger_excel_avec_colonnes_vide(chemin_fichier):
     """Charge un fichier Excel ou CSV et initialise les colonnes pour les questions et réponses."""
     extension = os.path.splitext(chemin_fichier)[1].lower()
@@ -48,33 +166,56 @@ def charger_excel_avec_colonnes_vide(chemin_fichier):
             df[col] = ''
     return df
 
-def mettre_a_jour_dataframe(df, donnees_extraites):
-    """Met à jour le DataFrame avec les données extraites du fichier DOCX."""
-    dernier_id = df['id'].max() if 'id' in df.columns else 0
-    
+COLONNES_QR = ['question1', 'réponse1', 'question2', 'réponse2']
+
+def normaliser_nom(noms):
+    """Clé de jointure des noms : sans accents, en minuscules, espaces normalisés."""
+    cles = (noms.astype(str)
+            .str.normalize('NFKD').str.encode('ascii', 'ignore').str.decode('ascii')
+            .str.lower().str.split().str.join(' '))
+    return cles.where(noms.notna())
+
+def construire_dataframe_extrait(donnees_extraites):
+    """Construit en une fois le DataFrame (nom, question1, réponse1, question2, réponse2) des données extraites."""
+    lignes = []
     for entree in donnees_extraites:
-        nom = entree['nom']
         questions = list(entree['questions_reponses'].keys())
         reponses = list(entree['questions_reponses'].values())
-        
-        if nom in df['nom'].values:
-            # Mise à jour des colonnes pour un nom existant
-            df.loc[df['nom'] == nom, 'question1'] = questions[0] if len(questions) > 0 else ''
-            df.loc[df['nom'] == nom, 'réponse1'] = reponses[0] if len(reponses) > 0 else ''
-            df.loc[df['nom'] == nom, 'question2'] = questions[1] if len(questions) > 1 else ''
-            df.loc[df['nom'] == nom, 'réponse2'] = reponses[1] if len(reponses) > 1 else ''
-        else:
-            # Ajout d'une nouvelle ligne si le nom n'existe pas
-            dernier_id += 1
-            nouvelle_ligne = pd.DataFrame({
-                'id': [dernier_id],
-                'nom': [nom],
-                'question1': [questions[0] if len(questions) > 0 else ''],
-                'réponse1': [reponses[0] if len(reponses) > 0 else ''],
-                'question2': [questions[1] if len(questions) > 1 else ''],
-                'réponse2': [reponses[1] if len(reponses) > 1 else '']
-            })
-            df = pd.concat([df, nouvelle_ligne], ignore_index=True)
+        lignes.append({
+            'nom': entree['nom'],
+            'question1': questions[0] if len(questions) > 0 else '',
+            'réponse1': reponses[0] if len(reponses) > 0 else '',
+            'question2': questions[1] if len(questions) > 1 else '',
+            'réponse2': reponses[1] if len(reponses) > 1 else ''
+        })
+    return pd.DataFrame(lignes, columns=['nom'] + COLONNES_QR)
+
+def mettre_a_jour_dataframe(df, donnees_extraites):
+    """Met à jour le DataFrame avec les données extraites du fichier DOCX."""
+    dernier_id = df['id'].max() if 'id' in df.columns else 0
+    extrait = construire_dataframe_extrait(donnees_extraites)
+    if extrait.empty:
+        return df
+
+    # Un même espace extrait plusieurs fois : le nom de la première occurrence,
+    # les questions/réponses de la dernière
+    extrait['cle'] = normaliser_nom(extrait['nom'])
+    premieres = extrait.drop_duplicates('cle', keep='first').set_index('cle')
+    dernieres = extrait.drop_duplicates('cle', keep='last').set_index('cle')
+    fusion = dernieres.loc[premieres.index, COLONNES_QR]
+    fusion.insert(0, 'nom', premieres['nom'])
+
+    # Mise à jour des colonnes pour les noms existants, en une seule affectation
+    cles_df = normaliser_nom(df['nom'])
+    existants = cles_df.isin(fusion.index)
+    df[COLONNES_QR] = df[COLONNES_QR].astype(object)
+    df.loc[existants, COLONNES_QR] = fusion.loc[cles_df[existants], COLONNES_QR].to_numpy()
+
+    # Ajout des nouveaux noms en un seul bloc, avec des id consécutifs
+    nouvelles_lignes = fusion[~fusion.index.isin(cles_df)].reset_index(drop=True)
+    if not nouvelles_lignes.empty:
+        nouvelles_lignes.insert(0, 'id', dernier_id + 1 + np.arange(len(nouvelles_lignes)))
+        df = pd.concat([df, nouvelles_lignes], ignore_index=True)
     return df
 
 def sauvegarder_dataframe(df, chemin_sortie, chemin_entree):
@@ -91,16 +232,29 @@ def sauvegarder_dataframe(df, chemin_sortie, chemin_entree):
     print(f"Mise à jour du fichier terminée et sauvegardée dans '{chemin_sortie}'")
 
 def main():
+    parser = argparse.ArgumentParser(description="Intègre les réponses des fichiers DOCX au fichier des espaces.")
+    parser.add_argument('--docx', default='reponses_ARS.docx',
+                        help="Fichier DOCX, dossier ou motif glob (ex. 'reponses/*.docx')")
+    parser.add_argument('--processus', type=int, default=None, help="Nombre de processus d'analyse")
+    parser.add_argument('--etat', default='ingestion_docx.json',
+                        help="Empreintes des fichiers intégrés lors de cette exécution")
+    parser.add_argument('--extraits', default='extraits_docx',
+                        help="Dossier des extractions par fichier, écrites au fur et à mesure")
+    parser.add_argument('--tout', action='store_true', help="Relit tous les fichiers, même déjà extraits")
+    args = parser.parse_args()
+
     # Chemins des fichiers
-    chemin_docx = 'reponses_ARS.docx'
     chemin_entree = 'spacesnew.csv'  # Peut être .xlsx, .xls ou .csv
     chemin_sortie = 'fichier_a_jour' + os.path.splitext(chemin_entree)[1]  # Garde la même extension
-    
-    # Étapes du traitement
-    donnees_extraites = extraire_donnees_depuis_docx(chemin_docx)
+    etat = {}
+
+    # On repart toujours du fichier d'entrée, pour prendre en compte ses modifications ;
+    # les fichiers DOCX inchangés sont rejoués depuis leur extrait, sans être relus
     df = charger_excel_avec_colonnes_vide(chemin_entree)
-    df = mettre_a_jour_dataframe(df, donnees_extraites)
+    enregistrements = ingerer_docx(args.docx, etat, args.processus, args.extraits, relire=args.tout)
+    df = mettre_a_jour_dataframe(df, regrouper_enregistrements(enregistrements))
     sauvegarder_dataframe(df, chemin_sortie, chemin_entree)
+    sauvegarder_etat(args.etat, etat)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from Code_extraction import mettre_a_jour_dataframe
+
+
+def mettre_a_jour_dataframe_iteratif(df, donnees_extraites):
+    """Ancienne version (recherche linéaire du nom et pd.concat dans la boucle), pour comparaison."""
+    dernier_id = df['id'].max() if 'id' in df.columns else 0
+
+    for entree in donnees_extraites:
+        nom = entree['nom']
+        questions = list(entree['questions_reponses'].keys())
+        reponses = list(entree['questions_reponses'].values())
+
+        if nom in df['nom'].values:
+            df.loc[df['nom'] == nom, 'question1'] = questions[0] if len(questions) > 0 else ''
+            df.loc[df['nom'] == nom, 'réponse1'] = reponses[0] if len(reponses) > 0 else ''
+            df.loc[df['nom'] == nom, 'question2'] = questions[1] if len(questions) > 1 else ''
+            df.loc[df['nom'] == nom, 'réponse2'] = reponses[1] if len(reponses) > 1 else ''
+        else:
+            dernier_id += 1
+            nouvelle_ligne = pd.DataFrame({
+                'id': [dernier_id],
+                'nom': [nom],
+                'question1': [questions[0] if len(questions) > 0 else ''],
+                'réponse1': [reponses[0] if len(reponses) > 0 else ''],
+                'question2': [questions[1] if len(questions) > 1 else ''],
+                'réponse2': [reponses[1] if len(reponses) > 1 else '']
+            })
+            df = pd.concat([df, nouvelle_ligne], ignore_index=True)
+    return df
+
+def donnees_synthetiques(n_espaces, part_nouveaux=0.2, seed=0):
+    """Base de n_espaces espaces et autant d'entrées extraites, dont part_nouveaux d'espaces inconnus."""
+    rng = random.Random(seed)
+    noms = [f"Espace {i}" for i in range(n_espaces)]
+    df = pd.DataFrame({
+        'id': range(1, n_espaces + 1),
+        'nom': noms,
+        'ville': [rng.choice(['Paris', 'Montpellier', 'Berlin', 'Dakar']) for _ in range(n_espaces)],
+        'question1': '', 'réponse1': '', 'question2': '', 'réponse2': ''
+    })
+    n_nouveaux = int(n_espaces * part_nouveaux)
+    extraits = rng.sample(noms, n_espaces - n_nouveaux) + [f"Nouvel espace {i}" for i in range(n_nouveaux)]
+    rng.shuffle(extraits)
+    donnees = [{'nom': nom, 'questions_reponses': {f"Q1 {nom}": f"R1 {i}", f"Q2 {nom}": f"R2 {i}"}}
+               for i, nom in enumerate(extraits)]
+    return df, donnees
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison de mettre_a_jour_dataframe avec l'ancienne boucle.")
+    parser.add_argument('--espaces', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--max-iteratif', type=int, default=10_000,
+                        help="Au-delà, l'ancienne version (quadratique) n'est pas mesurée")
+    args = parser.parse_args()
+
+    print(f"{'espaces':>8} | {'boucle (s)':>10} | {'groupé (s)':>10} | {'gain':>7}")
+    for n_espaces in args.espaces:
+        df, donnees = donnees_synthetiques(n_espaces)
+
+        debut = time.perf_counter()
+        resultat = mettre_a_jour_dataframe(df.copy(), donnees)
+        duree_groupee = time.perf_counter() - debut
+
+        if n_espaces > args.max_iteratif:
+            print(f"{n_espaces:>8} | {'-':>10} | {duree_groupee:>10.3f} | {'-':>7}")
+            continue
+
+        debut = time.perf_counter()
+        reference = mettre_a_jour_dataframe_iteratif(df.copy(), donnees)
+        duree_iterative = time.perf_counter() - debut
+
+        pd.testing.assert_frame_equal(resultat, reference, check_dtype=False)
+        print(f"{n_espaces:>8} | {duree_iterative:>10.3f} | {duree_groupee:>10.3f} | x{duree_iterative / duree_groupee:>6.1f}")
+
+if __name__ == '__main__':
+    main()
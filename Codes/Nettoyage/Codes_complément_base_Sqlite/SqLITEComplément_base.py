@@ -1,5 +1,10 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
 import sqlite3
+from datetime import datetime
+
+import pandas as pd
 
 def charger_fichier_excel(chemin_fichier):
     
@@ -28,6 +33,24 @@ def verifier_valeurs_dupliquees(df, colonne):
     else:
         print(f"Tous les identifiants dans '{colonne}' sont uniques.")
 
+# Table des espaces ; les coordonnées sont des REAL validés au chargement
+DEFINITION_ESPACE = '''
+    CREATE TABLE {nom} (
+        id_E INTEGER PRIMARY KEY,
+        nom TEXT,
+        historique TEXT,
+        activites TEXT,
+        presentation TEXT,
+        date_ouverture DATE,
+        date_fermeture DATE,
+        website TEXT,
+        pays TEXT,
+        ville TEXT,
+        latitude REAL,
+        longitude REAL
+    );
+    '''
+
 def creer_tables_sqlite(conn):
     """Créer les tables nécessaires dans la base de données SQLite"""
     cursor = conn.cursor()
@@ -50,22 +73,7 @@ def creer_tables_sqlite(conn):
     );
     ''')
 
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS Espace (
-        id_E INTEGER PRIMARY KEY,
-        nom TEXT,
-        historique TEXT,
-        activites TEXT,
-        presentation TEXT,
-        date_ouverture DATE,
-        date_fermeture DATE,
-        website TEXT,
-        pays TEXT,
-        ville TEXT,
-        latitude TEXT,
-        longitude TEXT
-    );
-    ''')
+    cursor.execute(DEFINITION_ESPACE.format(nom='IF NOT EXISTS Espace'))
 
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS tenir (
@@ -77,6 +85,36 @@ def creer_tables_sqlite(conn):
     );
     ''')
 
+    # Index spatial R*Tree sur les coordonnées des espaces (id = id_E)
+    cursor.execute('''
+    CREATE VIRTUAL TABLE IF NOT EXISTS espace_geo USING rtree(
+        id,
+        min_lat, max_lat,
+        min_lon, max_lon
+    );
+    ''')
+
+    # Empreinte du contenu de chaque ligne, utilisée par la synchronisation incrémentale
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS empreintes (
+        nom_table TEXT,
+        id INTEGER,
+        empreinte TEXT,
+        PRIMARY KEY (nom_table, id)
+    );
+    ''')
+
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS historique_synchronisation (
+        date TEXT,
+        nom_table TEXT,
+        inserees INTEGER,
+        mises_a_jour INTEGER,
+        supprimees INTEGER,
+        inchangees INTEGER
+    );
+    ''')
+
 def vider_tables(conn):
     """Supprimer toutes les données existantes dans les tables"""
     cursor = conn.cursor()
@@ -84,62 +122,276 @@ def vider_tables(conn):
     cursor.execute('DELETE FROM Responsable')
     cursor.execute('DELETE FROM Question_Reponse')
     cursor.execute('DELETE FROM Espace')
+    cursor.execute('DELETE FROM empreintes')
     conn.commit()
     
     
-def inserer_donnees_table(df, table, conn):
-    """Insérer les données dans la table SQLite correspondante"""
-    cursor = conn.cursor()
-    if table == 'Espace':
-        for i, row in df.iterrows():
-            cursor.execute('''
-            INSERT INTO Espace (id_E, nom, historique, activites, presentation, 
-                                date_ouverture, date_fermeture, website, pays, 
-                                ville, latitude, longitude) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (row['id'], row['nom'], row['historique'], row['activites'], row['presentation'], 
-                  row['date_ouverture'], row['date_fermeture'], row['website'], row['pays'], 
-                  row['ville'], row['latitude'], row['longitude']))
-    elif table == 'Question_Reponse':
-        for i, row in df.iterrows():
-            cursor.execute('''
-            INSERT INTO Question_Reponse (id_QR, question1, reponse1, question2, reponse2)
-            VALUES (?, ?, ?, ?, ?)
-            ''', (row['id'], row['question1'], row['réponse1'], row['question2'], row['réponse2']))
-    elif table == 'Responsable':
-        for i, row in df.iterrows():
-            cursor.execute('''
-            INSERT INTO Responsable (id_R, responsables, id_QReponse)
-            VALUES (?, ?, ?)
-            ''', (row['id'], row['responsables'], row['id']))
-
-    # Effectuer un commit tous les 100 enregistrements
-    if i % 100 == 0:
-        conn.commit()
+# Colonnes SQL de chaque table et colonnes correspondantes du DataFrame
+COLONNES_TABLES = {
+    'Espace': (['id_E', 'nom', 'historique', 'activites', 'presentation', 'date_ouverture',
+                'date_fermeture', 'website', 'pays', 'ville', 'latitude', 'longitude'],
+               ['id', 'nom', 'historique', 'activites', 'presentation', 'date_ouverture',
+                'date_fermeture', 'website', 'pays', 'ville', 'latitude', 'longitude']),
+    'Question_Reponse': (['id_QR', 'question1', 'reponse1', 'question2', 'reponse2'],
+                         ['id', 'question1', 'réponse1', 'question2', 'réponse2']),
+    'Responsable': (['id_R', 'responsables', 'id_QReponse'],
+                    ['id', 'responsables', 'id']),
+}
+
+# La liaison 'tenir' reprend l'id de l'espace comme clé (chargement complet et synchronisation) :
+# elle reste stable quand des espaces disparaissent du fichier
+COLONNES_TENIR = (['id_tenir', 'id_espace', 'id_responsable'], ['id', 'id', 'id'])
+
+# Index secondaires, créés seulement une fois les données insérées
+INDEX = {
+    'idx_tenir_espace': 'tenir (id_espace)',
+    'idx_tenir_responsable': 'tenir (id_responsable)',
+    'idx_responsable_qr': 'Responsable (id_QReponse)',
+}
+
+def configurer_chargement(conn, wal=True):
+    """
+    Journal WAL et synchronisation allégée pendant le chargement.
+    Renvoie les réglages précédents, à rétablir avec terminer_chargement
+    (journal_mode=WAL est persistant dans le fichier de la base).
+    """
+    precedent = {'journal_mode': conn.execute('PRAGMA journal_mode').fetchone()[0],
+                 'synchronous': conn.execute('PRAGMA synchronous').fetchone()[0]}
+    if wal:
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    return precedent
+
+def terminer_chargement(conn, precedent=None):
+    """
+    Rétablir le journal et la synchronisation d'avant le chargement (voir configurer_chargement) ;
+    sans réglages précédents, seulement la synchronisation complète
+    """
+    if precedent is None:
+        conn.execute('PRAGMA synchronous=FULL')
+        return
     conn.commit()
+    conn.execute(f"PRAGMA journal_mode={precedent['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous={int(precedent['synchronous'])}")
+
+def supprimer_index(conn):
+    """Supprimer les index secondaires avant un chargement en masse"""
+    with conn:
+        for nom in INDEX:
+            conn.execute(f'DROP INDEX IF EXISTS {nom}')
+
+def creer_index(conn):
+    """Créer les index secondaires après les insertions (une seule construction par index)"""
+    with conn:
+        for nom, cible in INDEX.items():
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {nom} ON {cible}')
+
+def lignes_sql(df, colonnes):
+    """Tuples de valeurs Python (None pour les valeurs manquantes), prêts pour executemany"""
+    valeurs = df[colonnes].astype(object)
+    return valeurs.where(valeurs.notna(), None).itertuples(index=False, name=None)
+
+def inserer_donnees_table(df, table, conn, colonnes=None):
+    """
+    Insérer les données dans la table SQLite correspondante, en une seule transaction,
+    avec l'empreinte de chaque ligne : la synchronisation suivante ne réécrit que ce qui a changé.
+    """
+    colonnes_sql, colonnes_df = colonnes or COLONNES_TABLES[table]
+    requete = (f"INSERT INTO {table} ({', '.join(colonnes_sql)}) "
+               f"VALUES ({', '.join('?' * len(colonnes_sql))})")
+    lignes = list(lignes_sql(df, colonnes_df))
+    with conn:
+        conn.executemany(requete, lignes)
+        conn.executemany('INSERT INTO empreintes (nom_table, id, empreinte) VALUES (?, ?, ?)',
+                         ((table, ligne[0], empreinte_ligne(ligne)) for ligne in lignes))
 
 def inserer_liaison_tenir(df, conn):
-    """Insérer les relations entre les espaces et les responsables dans la table 'tenir'"""
-    cursor = conn.cursor()
-    id_tenir = 1
-    for i, row in df.iterrows():
-        cursor.execute('''
-        INSERT INTO tenir (id_tenir, id_espace, id_responsable)
-        VALUES (?, ?, ?)
-        ''', (id_tenir, row['id'], row['id']))  # Utiliser l'id_tenir incrémenté
-        id_tenir += 1
-        if i % 100 == 0:  # Effectuer un commit tous les 100 enregistrements
-            conn.commit()
-    conn.commit()
+    """Insérer les relations entre les espaces et les responsables dans la table 'tenir' (id_tenir = id de l'espace)"""
+    inserer_donnees_table(df, 'tenir', conn, COLONNES_TENIR)
+
+# Index plein texte sur les textes des espaces et les réponses au questionnaire (rowid = id_E)
+COLONNES_RECHERCHE = ['nom', 'historique', 'activites', 'presentation', 'reponse1', 'reponse2']
+SELECTION_RECHERCHE = '''
+    SELECT e.id_E, e.nom, e.historique, e.activites, e.presentation, q.reponse1, q.reponse2
+    FROM Espace e LEFT JOIN Question_Reponse q ON q.id_QR = e.id_E
+'''
+
+def creer_index_texte(conn, sans_accents=False):
+    """
+    Créer la table FTS5 'recherche_espace'. Avec sans_accents, le tokenizer unicode61
+    ignore les diacritiques (« evenement » trouve « événement »).
+    Renvoie True si la table vient d'être (re)créée et doit être remplie entièrement.
+    """
+    tokenizer = f"unicode61 remove_diacritics {2 if sans_accents else 0}"
+    existante = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'recherche_espace'").fetchone()
+    if existante and tokenizer in existante[0]:
+        return False
+    with conn:
+        conn.execute('DROP TABLE IF EXISTS recherche_espace')
+        conn.execute(f'''
+        CREATE VIRTUAL TABLE recherche_espace USING fts5(
+            {', '.join(COLONNES_RECHERCHE)},
+            tokenize = '{tokenizer}'
+        )
+        ''')
+    return True
+
+def reconstruire_index_texte(conn):
+    """Remplir entièrement l'index plein texte à partir des tables Espace et Question_Reponse"""
+    with conn:
+        conn.execute('DELETE FROM recherche_espace')
+        conn.execute(f'''
+        INSERT INTO recherche_espace (rowid, {', '.join(COLONNES_RECHERCHE)})
+        {SELECTION_RECHERCHE}
+        ''')
+
+def mettre_a_jour_index_texte(conn, ids):
+    """Réindexer seulement les espaces modifiés ou supprimés. La transaction n'est pas validée ici."""
+    conn.executemany('DELETE FROM recherche_espace WHERE rowid = ?', ((id_,) for id_ in ids))
+    conn.executemany(f'''
+        INSERT INTO recherche_espace (rowid, {', '.join(COLONNES_RECHERCHE)})
+        {SELECTION_RECHERCHE} WHERE e.id_E = ?
+        ''', ((id_,) for id_ in ids))
+
+SELECTION_GEO = '''
+    SELECT id_E, latitude, latitude, longitude, longitude FROM Espace
+    WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+'''
+
+def valider_coordonnees(df):
+    """
+    Convertir latitude et longitude en nombres (virgule décimale acceptée) et
+    écarter les coordonnées incomplètes ou hors bornes, qui deviennent NaN
+    """
+    df = df.copy()
+    for col in ('latitude', 'longitude'):
+        df[col] = pd.to_numeric(df[col].astype(str).str.strip().str.replace(',', '.'), errors='coerce')
+    valides = df['latitude'].between(-90, 90) & df['longitude'].between(-180, 180)
+    rejetees = ~valides & df[['latitude', 'longitude']].notna().any(axis=1)
+    if rejetees.any():
+        print(f"{rejetees.sum()} coordonnées invalides ignorées (ids : {df.loc[rejetees, 'id'].tolist()[:10]})")
+    df.loc[~valides, ['latitude', 'longitude']] = float('nan')
+    return df
+
+def migrer_coordonnees(conn):
+    """Reconstruire la table Espace d'une base existante dont les coordonnées sont encore en TEXT"""
+    types = {nom: type_ for _, nom, type_, *_ in conn.execute('PRAGMA table_info(Espace)')}
+    if types.get('latitude') != 'TEXT':
+        return
+    # Mêmes règles qu'au chargement (virgule décimale, valeurs non numériques ou hors bornes -> NULL) :
+    # un CAST SQLite changerait 'abc' en 0.0 et tronquerait '48,85' en 48.0
+    anciennes = pd.read_sql_query('SELECT id_E AS id, latitude, longitude FROM Espace', conn)
+    coordonnees = lignes_sql(valider_coordonnees(anciennes), ['latitude', 'longitude', 'id'])
+    colonnes = ', '.join(nom for nom in types if nom not in ('latitude', 'longitude'))
+    with conn:
+        conn.execute(DEFINITION_ESPACE.format(nom='Espace_reel'))
+        conn.execute(f'INSERT INTO Espace_reel ({colonnes}) SELECT {colonnes} FROM Espace')
+        conn.executemany('UPDATE Espace_reel SET latitude = ?, longitude = ? WHERE id_E = ?', coordonnees)
+        conn.execute('DROP TABLE Espace')
+        conn.execute('ALTER TABLE Espace_reel RENAME TO Espace')
+    print("Coordonnées de la table Espace converties en REAL")
+
+def reconstruire_index_geo(conn):
+    """Remplir entièrement l'index R*Tree 'espace_geo' à partir des coordonnées d'Espace"""
+    with conn:
+        conn.execute('DELETE FROM espace_geo')
+        conn.execute(f'INSERT INTO espace_geo {SELECTION_GEO}')
+
+def mettre_a_jour_index_geo(conn, ids):
+    """Réindexer les coordonnées des seuls espaces modifiés ou supprimés. La transaction n'est pas validée ici."""
+    conn.executemany('DELETE FROM espace_geo WHERE id = ?', ((id_,) for id_ in ids))
+    conn.executemany(f'INSERT INTO espace_geo {SELECTION_GEO} AND id_E = ?', ((id_,) for id_ in ids))
+
+def empreinte_ligne(ligne):
+    """Empreinte SHA-1 du contenu d'une ligne (tuple de valeurs)"""
+    return hashlib.sha1(json.dumps(ligne, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+def synchroniser_table(df, table, colonnes, conn):
+    """
+    Synchroniser une table avec le DataFrame sans la vider : seules les lignes
+    nouvelles ou dont l'empreinte a changé sont écrites (INSERT ... ON CONFLICT
+    DO UPDATE), et seuls les ids absents du DataFrame sont supprimés.
+    La première colonne SQL est la clé primaire. La transaction n'est pas validée ici.
+    Renvoie les statistiques et l'ensemble des ids écrits ou supprimés.
+    """
+    colonnes_sql, colonnes_df = colonnes
+    cle = colonnes_sql[0]
+    lignes = list(lignes_sql(df, colonnes_df))
+    empreintes = [empreinte_ligne(ligne) for ligne in lignes]
+
+    # Ids déjà présents dans la table, avec leur empreinte connue (None après un chargement complet)
+    existantes = dict(conn.execute(f'''
+        SELECT t.{cle}, e.empreinte FROM {table} t
+        LEFT JOIN empreintes e ON e.nom_table = ? AND e.id = t.{cle}
+        ''', (table,)))
+
+    a_ecrire = [(ligne, empreinte) for ligne, empreinte in zip(lignes, empreintes)
+                if existantes.get(ligne[0], '') != empreinte]
+    nouvelles = sum(ligne[0] not in existantes for ligne, _ in a_ecrire)
+    disparues = existantes.keys() - {ligne[0] for ligne in lignes}
+
+    mises_a_jour = ', '.join(f'{col} = excluded.{col}' for col in colonnes_sql[1:])
+    conn.executemany(f'''
+        INSERT INTO {table} ({', '.join(colonnes_sql)}) VALUES ({', '.join('?' * len(colonnes_sql))})
+        ON CONFLICT({cle}) DO UPDATE SET {mises_a_jour}
+        ''', (ligne for ligne, _ in a_ecrire))
+    conn.executemany('''
+        INSERT INTO empreintes (nom_table, id, empreinte) VALUES (?, ?, ?)
+        ON CONFLICT(nom_table, id) DO UPDATE SET empreinte = excluded.empreinte
+        ''', ((table, ligne[0], empreinte) for ligne, empreinte in a_ecrire))
+    conn.executemany(f'DELETE FROM {table} WHERE {cle} = ?', ((id_,) for id_ in disparues))
+    conn.executemany('DELETE FROM empreintes WHERE nom_table = ? AND id = ?',
+                     ((table, id_) for id_ in disparues))
+
+    stats = {'inserees': nouvelles, 'mises_a_jour': len(a_ecrire) - nouvelles,
+             'supprimees': len(disparues), 'inchangees': len(lignes) - len(a_ecrire)}
+    return stats, {ligne[0] for ligne, _ in a_ecrire} | disparues
+
+def synchroniser_base(df_selection1, df_selection2, df_selection3, conn):
+    """
+    Synchronisation incrémentale de toutes les tables dans une seule transaction :
+    les lecteurs voient l'ancienne version de la base jusqu'au commit, jamais des tables vides.
+    Les statistiques sont affichées et enregistrées dans 'historique_synchronisation'.
+    Les index plein texte et spatial sont mis à jour pour les seuls espaces touchés.
+    """
+    tables = [(df_selection1, 'Espace', COLONNES_TABLES['Espace']),
+              (df_selection3, 'Question_Reponse', COLONNES_TABLES['Question_Reponse']),
+              (df_selection2, 'Responsable', COLONNES_TABLES['Responsable']),
+              (df_selection1, 'tenir', COLONNES_TENIR)]
+    date = datetime.now().isoformat(timespec='seconds')
+    statistiques, ids_touches = {}, {}
+    with conn:
+        for df, table, colonnes in tables:
+            statistiques[table], ids_touches[table] = synchroniser_table(df, table, colonnes, conn)
+            stats = statistiques[table]
+            conn.execute('INSERT INTO historique_synchronisation VALUES (?, ?, ?, ?, ?, ?)',
+                         (date, table, stats['inserees'], stats['mises_a_jour'],
+                          stats['supprimees'], stats['inchangees']))
+        mettre_a_jour_index_texte(conn, ids_touches['Espace'] | ids_touches['Question_Reponse'])
+        mettre_a_jour_index_geo(conn, ids_touches['Espace'])
+    for table, stats in statistiques.items():
+        print(f"{table:<17}: {stats['inserees']} insérées, {stats['mises_a_jour']} mises à jour, "
+              f"{stats['supprimees']} supprimées, {stats['inchangees']} inchangées")
+    return statistiques
 
 def main():
     """Fonction principale pour exécuter le processus"""
+    parser = argparse.ArgumentParser(description="Chargement des espaces dans la base SQLite.")
+    parser.add_argument('--complet', action='store_true',
+                        help="Vide les tables et recharge tout, au lieu de la synchronisation incrémentale")
+    parser.add_argument('--sans-accents', action='store_true',
+                        help="Index plein texte insensible aux diacritiques (unicode61 remove_diacritics 2)")
+    parser.add_argument('--sans-wal', action='store_true',
+                        help="Garde le journal par défaut au lieu de WAL + synchronous=NORMAL")
+    args = parser.parse_args()
+
     # Charger le fichier Excel
     chemin_fichier = '../Code_extract_text/fichier_mis_a_jour.xlsx'
     df = charger_fichier_excel(chemin_fichier)
 
     # Sélectionner les colonnes nécessaires
     df_selection1, df_selection2, df_selection3 = selectionner_colonnes(df)
+    df_selection1 = valider_coordonnees(df_selection1)
 
     # Vérifier les valeurs manquantes et les doublons
     verifier_valeurs_manquantes(df_selection1, 'id')
@@ -147,13 +399,28 @@ def main():
 
     # Connexion à la base de données SQLite
     with sqlite3.connect('spacestri.db', timeout=10) as conn:
-        # Vider les tables existantes avant d'insérer les nouvelles données
-        vider_tables(conn)
-        
-        # Créer les tables
+        reglages = configurer_chargement(conn, wal=not args.sans_wal)
+
         creer_tables_sqlite(conn)
+        migrer_coordonnees(conn)
+        index_texte_neuf = creer_index_texte(conn, sans_accents=args.sans_accents)
 
-        # Insérer les données dans les tables
+        if not args.complet:
+            # Écrire seulement les lignes nouvelles ou modifiées, supprimer les disparues
+            synchroniser_base(df_selection1, df_selection2, df_selection3, conn)
+            if index_texte_neuf:
+                reconstruire_index_texte(conn)
+            if not conn.execute('SELECT 1 FROM espace_geo LIMIT 1').fetchone():
+                reconstruire_index_geo(conn)
+            creer_index(conn)
+            terminer_chargement(conn, reglages)
+            return
+
+        # Rechargement complet : vider les données existantes
+        vider_tables(conn)
+        supprimer_index(conn)
+
+        # Insérer les données dans les tables (une transaction par table)
         inserer_donnees_table(df_selection1, 'Espace', conn)
         inserer_donnees_table(df_selection3, 'Question_Reponse', conn)
         inserer_donnees_table(df_selection2, 'Responsable', conn)
@@ -161,5 +428,10 @@ def main():
         # Insérer les liaisons dans la table 'tenir'
         inserer_liaison_tenir(df_selection1, conn)
 
+        reconstruire_index_texte(conn)
+        reconstruire_index_geo(conn)
+        creer_index(conn)
+        terminer_chargement(conn, reglages)
+
 if __name__ == '__main__':
     main()
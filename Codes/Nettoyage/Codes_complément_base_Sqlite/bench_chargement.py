@@ -0,0 +1,117 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+from SqLITEComplément_base import (configurer_chargement, creer_index, creer_tables_sqlite, inserer_donnees_table,
+                                   inserer_liaison_tenir, selectionner_colonnes, supprimer_index,
+                                   terminer_chargement)
+
+
+def inserer_iteratif(df_selection1, df_selection2, df_selection3, conn):
+    """Ancienne version (iterrows et un execute par ligne), pour comparaison."""
+    cursor = conn.cursor()
+    for i, row in df_selection1.iterrows():
+        cursor.execute('''
+        INSERT INTO Espace (id_E, nom, historique, activites, presentation,
+                            date_ouverture, date_fermeture, website, pays,
+                            ville, latitude, longitude)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (row['id'], row['nom'], row['historique'], row['activites'], row['presentation'],
+              row['date_ouverture'], row['date_fermeture'], row['website'], row['pays'],
+              row['ville'], row['latitude'], row['longitude']))
+    conn.commit()
+    for i, row in df_selection3.iterrows():
+        cursor.execute('''
+        INSERT INTO Question_Reponse (id_QR, question1, reponse1, question2, reponse2)
+        VALUES (?, ?, ?, ?, ?)
+        ''', (row['id'], row['question1'], row['réponse1'], row['question2'], row['réponse2']))
+    conn.commit()
+    for i, row in df_selection2.iterrows():
+        cursor.execute('''
+        INSERT INTO Responsable (id_R, responsables, id_QReponse)
+        VALUES (?, ?, ?)
+        ''', (row['id'], row['responsables'], row['id']))
+    conn.commit()
+    for id_tenir, (i, row) in enumerate(df_selection1.iterrows(), start=1):
+        cursor.execute('INSERT INTO tenir (id_tenir, id_espace, id_responsable) VALUES (?, ?, ?)',
+                       (id_tenir, row['id'], row['id']))
+        if i % 100 == 0:
+            conn.commit()
+    conn.commit()
+
+def inserer_groupe(df_selection1, df_selection2, df_selection3, conn, wal):
+    reglages = configurer_chargement(conn, wal)
+    supprimer_index(conn)
+    inserer_donnees_table(df_selection1, 'Espace', conn)
+    inserer_donnees_table(df_selection3, 'Question_Reponse', conn)
+    inserer_donnees_table(df_selection2, 'Responsable', conn)
+    inserer_liaison_tenir(df_selection1, conn)
+    creer_index(conn)
+    terminer_chargement(conn, reglages)
+
+def donnees_synthetiques(n_lignes, seed=0):
+    """Fichier d'espaces synthétique avec les colonnes attendues par selectionner_colonnes."""
+    rng = random.Random(seed)
+    mots = ["artist", "run", "space", "galerie", "atelier", "exposition", "collectif"]
+
+    def texte(n_mots):
+        return ' '.join(rng.choice(mots) for _ in range(n_mots))
+
+    return pd.DataFrame({
+        'id': range(1, n_lignes + 1),
+        'nom': [f"Espace {i}" for i in range(n_lignes)],
+        'historique': [texte(30) for _ in range(n_lignes)],
+        'activites': [texte(10) for _ in range(n_lignes)],
+        'presentation': [texte(30) for _ in range(n_lignes)],
+        'date_ouverture': [str(rng.randint(1970, 2023)) for _ in range(n_lignes)],
+        'date_fermeture': [None if rng.random() < 0.7 else str(rng.randint(1990, 2024)) for _ in range(n_lignes)],
+        'website': [f"https://espace{i}.org" for i in range(n_lignes)],
+        'pays': [rng.choice(['France', 'Allemagne', 'Sénégal', 'Brésil']) for _ in range(n_lignes)],
+        'ville': [rng.choice(['Paris', 'Berlin', 'Dakar', 'São Paulo']) for _ in range(n_lignes)],
+        'latitude': [rng.uniform(-90, 90) for _ in range(n_lignes)],
+        'longitude': [rng.uniform(-180, 180) for _ in range(n_lignes)],
+        'responsables': [texte(2) for _ in range(n_lignes)],
+        'question1': 'Q1', 'réponse1': [texte(20) for _ in range(n_lignes)],
+        'question2': 'Q2', 'réponse2': [texte(20) for _ in range(n_lignes)],
+    })
+
+def chronometrer(fonction, selections, chemin, *args):
+    """Charge les sélections dans une base neuve et renvoie la durée et le contenu de 'Espace'."""
+    with sqlite3.connect(chemin) as conn:
+        creer_tables_sqlite(conn)
+        debut = time.perf_counter()
+        fonction(*selections, conn, *args)
+        duree = time.perf_counter() - debut
+        contenu = conn.execute('SELECT * FROM Espace ORDER BY id_E').fetchall()
+    conn.close()
+    for suffixe in ('', '-wal', '-shm'):
+        if os.path.exists(chemin + suffixe):
+            os.remove(chemin + suffixe)
+    return duree, contenu
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparaison du chargement SQLite ligne à ligne et groupé.")
+    parser.add_argument('--lignes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--sans-wal', action='store_true')
+    args = parser.parse_args()
+
+    dossier = tempfile.mkdtemp()
+    print(f"{'lignes':>9} | {'iterrows (s)':>12} | {'groupé (s)':>10} | {'gain':>6}")
+    for n_lignes in args.lignes:
+        selections = selectionner_colonnes(donnees_synthetiques(n_lignes))
+        chemin = os.path.join(dossier, 'bench.db')
+
+        duree_ancienne, reference = chronometrer(inserer_iteratif, selections, chemin)
+        duree_nouvelle, resultat = chronometrer(inserer_groupe, selections, chemin, not args.sans_wal)
+
+        assert resultat == reference
+        print(f"{n_lignes:>9} | {duree_ancienne:>12.3f} | {duree_nouvelle:>10.3f} | x{duree_ancienne / duree_nouvelle:>5.1f}")
+    os.rmdir(dossier)
+
+if __name__ == '__main__':
+    main()
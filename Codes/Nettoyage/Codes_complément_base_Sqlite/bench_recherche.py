@@ -0,0 +1,82 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from SqLITEComplément_base import (configurer_chargement, creer_index_texte, creer_tables_sqlite,
+                                   inserer_donnees_table, reconstruire_index_texte)
+from recherche_texte import compter, rechercher
+
+COLONNES_TEXTE = ['historique', 'activites', 'presentation']
+MOTS_COURANTS = ["artist", "run", "space", "galerie", "atelier", "exposition", "collectif", "résidence"]
+
+
+def donnees_synthetiques(n_lignes, n_mots=20, n_termes=200_000, seed=0):
+    """
+    Espaces synthétiques : chaque texte mêle des mots courants et des termes rares
+    de largeur fixe ('terme000123'), pour qu'une sous-chaîne corresponde à un mot entier.
+    """
+    rng = np.random.default_rng(seed)
+    vocabulaire = np.array(MOTS_COURANTS + [f"terme{i:06d}" for i in range(n_termes)], dtype=object)
+    poids = np.r_[np.full(len(MOTS_COURANTS), 0.5 / len(MOTS_COURANTS)), np.full(n_termes, 0.5 / n_termes)]
+    donnees = {'id': np.arange(1, n_lignes + 1), 'nom': [f"Espace {i}" for i in range(n_lignes)]}
+    for col in COLONNES_TEXTE:
+        tirages = vocabulaire[rng.choice(len(vocabulaire), size=(n_lignes, n_mots), p=poids)]
+        donnees[col] = [' '.join(mots) for mots in tirages]
+    df = pd.DataFrame(donnees)
+    for col in ['date_ouverture', 'date_fermeture', 'website', 'pays', 'ville', 'latitude', 'longitude']:
+        df[col] = None
+    return df
+
+def chronometrer(fonction, *args, repetitions=3):
+    debut = time.perf_counter()
+    for _ in range(repetitions):
+        resultat = fonction(*args)
+    return resultat, (time.perf_counter() - debut) / repetitions
+
+def recherche_pandas(df, termes):
+    """Recherche actuelle : str.contains sur chaque colonne, tous les termes requis."""
+    masque = np.ones(len(df), dtype=bool)
+    for terme in termes.split():
+        masque &= np.logical_or.reduce([df[col].str.contains(terme, case=False, regex=False, na=False).values
+                                        for col in COLONNES_TEXTE])
+    return int(masque.sum())
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche FTS5 comparée à pandas str.contains.")
+    parser.add_argument('--lignes', type=int, default=1_000_000)
+    parser.add_argument('--requetes', nargs='+', default=['terme004242', 'galerie terme004242', 'atelier'])
+    args = parser.parse_args()
+
+    df = donnees_synthetiques(args.lignes)
+    dossier = tempfile.mkdtemp()
+    chemin = os.path.join(dossier, 'bench.db')
+    with sqlite3.connect(chemin) as conn:
+        configurer_chargement(conn)
+        creer_tables_sqlite(conn)
+        creer_index_texte(conn)
+        debut = time.perf_counter()
+        inserer_donnees_table(df, 'Espace', conn)
+        reconstruire_index_texte(conn)
+        print(f"Chargement + indexation de {args.lignes} espaces : {time.perf_counter() - debut:.1f}s")
+
+        print(f"{'requête':<26} | {'trouvés':>8} | {'pandas (s)':>10} | {'FTS top 20 (s)':>14} | "
+              f"{'FTS total (s)':>13} | {'gain':>7}")
+        for requete in args.requetes:
+            attendu, duree_pandas = chronometrer(recherche_pandas, df, requete, repetitions=1)
+            _, duree_top = chronometrer(rechercher, conn, requete)
+            trouves, duree_total = chronometrer(compter, conn, requete)
+            assert trouves == attendu, (trouves, attendu)
+            print(f"{requete:<26} | {trouves:>8} | {duree_pandas:>10.3f} | {duree_top:>14.4f} | "
+                  f"{duree_total:>13.4f} | x{duree_pandas / duree_top:>6.0f}")
+    conn.close()
+    for nom in os.listdir(dossier):
+        os.remove(os.path.join(dossier, nom))
+    os.rmdir(dossier)
+
+if __name__ == '__main__':
+    main()
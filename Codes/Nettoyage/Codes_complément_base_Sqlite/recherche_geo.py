@@ -0,0 +1,156 @@
+import argparse
+import json
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+RAYON_TERRE_KM = 6371.0
+KM_PAR_DEGRE = math.pi * RAYON_TERRE_KM / 180
+
+# Taille des cellules de regroupement (en degrés) pour chaque niveau de zoom de la carte,
+# du plus large au plus serré ; 0 : dernier niveau, une entrée par espace
+TAILLES_CELLULES = [8, 4, 2, 1, 0.5, 0]
+CHEMIN_EXPORT = '../../Front-End React/public/data/spaces_grappes.json'
+
+
+def espaces_dans_rectangle(conn, lat_min, lat_max, lon_min, lon_max):
+    """
+    Espaces dont les coordonnées sont dans le rectangle, via l'index R*Tree 'espace_geo'.
+    Si lon_min > lon_max, le rectangle traverse l'antiméridien (ex. 170 -> -170).
+    Renvoie une liste (id_E, nom, latitude, longitude).
+    """
+    if lon_min > lon_max:
+        return (espaces_dans_rectangle(conn, lat_min, lat_max, lon_min, 180)
+                + espaces_dans_rectangle(conn, lat_min, lat_max, -180, lon_max))
+    # L'index stocke des flottants 32 bits arrondis vers l'extérieur : les bornes exactes
+    # sont vérifiées sur les colonnes REAL d'Espace
+    return conn.execute('''
+        SELECT e.id_E, e.nom, e.latitude, e.longitude
+        FROM espace_geo g JOIN Espace e ON e.id_E = g.id
+        WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lon >= ? AND g.min_lon <= ?
+          AND e.latitude BETWEEN ? AND ? AND e.longitude BETWEEN ? AND ?
+        ''', (lat_min, lat_max, lon_min, lon_max, lat_min, lat_max, lon_min, lon_max)).fetchall()
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Distance orthodromique (formule de haversine)"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def espaces_dans_rayon(conn, lat, lon, rayon_km):
+    """
+    Espaces à moins de rayon_km du point, triés par distance croissante.
+    Le rectangle englobant sert de pré-filtre sur l'index, la distance exacte est calculée ensuite.
+    Renvoie une liste (id_E, nom, latitude, longitude, distance_km).
+    """
+    delta_lat = rayon_km / KM_PAR_DEGRE
+    lat_min, lat_max = lat - delta_lat, lat + delta_lat
+    if lat_min <= -90 or lat_max >= 90:
+        # Le cercle contient un pôle : toutes les longitudes sont concernées
+        candidats = espaces_dans_rectangle(conn, max(lat_min, -90), min(lat_max, 90), -180, 180)
+    else:
+        delta_lon = delta_lat / math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+        if delta_lon >= 180:
+            candidats = espaces_dans_rectangle(conn, lat_min, lat_max, -180, 180)
+        else:
+            lon_min = (lon - delta_lon + 180) % 360 - 180
+            lon_max = (lon + delta_lon + 180) % 360 - 180
+            candidats = espaces_dans_rectangle(conn, lat_min, lat_max, lon_min, lon_max)
+    if not candidats:
+        return []
+
+    ids, noms, lats, lons = zip(*candidats)
+    distances = distance_km(lat, lon, np.array(lats), np.array(lons))
+    proches = [(id_, nom, la, lo, float(d))
+               for id_, nom, la, lo, d in zip(ids, noms, lats, lons, distances) if d <= rayon_km]
+    return sorted(proches, key=lambda ligne: ligne[4])
+
+def charger_points(source):
+    """Points à regrouper, depuis la base SQLite ou un fichier spaces.json du front-end"""
+    if source.endswith('.json'):
+        points = pd.read_json(source)
+    else:
+        with sqlite3.connect(source) as conn:
+            points = pd.read_sql('SELECT nom, ville, pays, website, latitude, longitude FROM Espace', conn)
+        conn.close()
+    return points.dropna(subset=['latitude', 'longitude'])
+
+def grappes_par_niveau(points, tailles=TAILLES_CELLULES):
+    """
+    Regroupe les points sur une grille régulière pour chaque niveau de zoom
+    (taille 0 : pas de regroupement, chaque espace est sa propre grappe).
+    Chaque grappe donne le barycentre et le nombre d'espaces ; une grappe d'un seul
+    espace garde ses informations (nom, ville, pays, website), les autres quelques exemples de noms.
+    """
+    points = points[['nom', 'ville', 'pays', 'website', 'latitude', 'longitude']]
+    points = points.astype(object).where(points.notna(), None)
+    points[['latitude', 'longitude']] = points[['latitude', 'longitude']].astype(float)
+    niveaux = []
+    for zoom, taille in enumerate(tailles):
+        if taille:
+            cles = [np.floor(points['latitude'] / taille), np.floor(points['longitude'] / taille)]
+        else:
+            cles = np.arange(len(points))
+        cellules = points.groupby(cles, sort=False)
+        resume = cellules.agg(latitude=('latitude', 'mean'), longitude=('longitude', 'mean'),
+                              nombre=('nom', 'size'), nom=('nom', 'first'), ville=('ville', 'first'),
+                              pays=('pays', 'first'), website=('website', 'first'),
+                              exemples=('nom', lambda noms: list(noms[:3])))
+        grappes = []
+        for grappe in resume.to_dict('records'):
+            grappe['latitude'] = round(grappe['latitude'], 5)
+            grappe['longitude'] = round(grappe['longitude'], 5)
+            for cle in (('nom', 'ville', 'pays', 'website') if grappe['nombre'] > 1 else ('exemples',)):
+                del grappe[cle]
+            grappes.append(grappe)
+        niveaux.append({'zoom': zoom, 'taille_cellule': taille, 'grappes': grappes})
+    return niveaux
+
+def exporter_grappes(source, chemin=CHEMIN_EXPORT, tailles=TAILLES_CELLULES):
+    """Écrit les grappes de tous les niveaux dans un JSON chargé par WorldMap.tsx"""
+    points = charger_points(source)
+    niveaux = grappes_par_niveau(points, tailles)
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump({'espaces': len(points), 'niveaux': niveaux}, f, ensure_ascii=False, separators=(',', ':'))
+    for niveau in niveaux:
+        taille = f"{niveau['taille_cellule']}°" if niveau['taille_cellule'] else "un point par espace"
+        print(f"zoom {niveau['zoom']} ({taille}) : {len(niveau['grappes'])} grappes")
+    print(f"{len(points)} espaces regroupés dans {chemin}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Requêtes spatiales et export de la carte des espaces.")
+    parser.add_argument('--base', default='spacestri.db')
+    commandes = parser.add_subparsers(dest='commande', required=True)
+
+    rectangle = commandes.add_parser('rectangle', help="Espaces dans un rectangle")
+    for nom in ('lat_min', 'lat_max', 'lon_min', 'lon_max'):
+        rectangle.add_argument(nom, type=float)
+
+    rayon = commandes.add_parser('rayon', help="Espaces autour d'un point")
+    rayon.add_argument('lat', type=float)
+    rayon.add_argument('lon', type=float)
+    rayon.add_argument('rayon_km', type=float)
+
+    export = commandes.add_parser('export', help="Grappes par niveau de zoom pour WorldMap.tsx")
+    export.add_argument('--source', help="Base SQLite ou spaces.json (par défaut --base)")
+    export.add_argument('--sortie', default=CHEMIN_EXPORT)
+    args = parser.parse_args()
+
+    if args.commande == 'export':
+        exporter_grappes(args.source or args.base, args.sortie)
+        return
+
+    with sqlite3.connect(args.base) as conn:
+        if args.commande == 'rectangle':
+            resultats = espaces_dans_rectangle(conn, args.lat_min, args.lat_max, args.lon_min, args.lon_max)
+        else:
+            resultats = espaces_dans_rayon(conn, args.lat, args.lon, args.rayon_km)
+    conn.close()
+    print(f"{len(resultats)} espaces")
+    for ligne in resultats:
+        print(*ligne, sep='\t')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import sqlite3
+
+
+def preparer_requete(texte):
+    """Mettre chaque mot entre guillemets : le texte saisi n'est pas interprété comme syntaxe FTS5"""
+    return ' '.join('"' + mot.replace('"', '""') + '"' for mot in texte.split())
+
+def rechercher(conn, texte, limite=20, brute=False, taille_extrait=12):
+    """
+    Rechercher les espaces dont les textes contiennent tous les mots de `texte`.
+    Renvoie une liste (id_E, nom, score, extrait) triée par pertinence bm25 décroissante ;
+    l'extrait provient de la colonne la plus pertinente, termes trouvés entre [ ].
+    Avec brute=True, `texte` est passé tel quel (syntaxe FTS5 : OR, NEAR, préfixe*, colonne:...).
+    """
+    requete = texte if brute else preparer_requete(texte)
+    return conn.execute('''
+        SELECT rowid, nom, -bm25(recherche_espace) AS score,
+               snippet(recherche_espace, -1, '[', ']', '…', ?)
+        FROM recherche_espace
+        WHERE recherche_espace MATCH ?
+        ORDER BY bm25(recherche_espace)
+        LIMIT ?
+        ''', (taille_extrait, requete, limite)).fetchall()
+
+def compter(conn, texte, brute=False):
+    """Nombre total d'espaces correspondant à la requête"""
+    requete = texte if brute else preparer_requete(texte)
+    return conn.execute('SELECT count(*) FROM recherche_espace WHERE recherche_espace MATCH ?',
+                        (requete,)).fetchone()[0]
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche plein texte dans les espaces de la base SQLite.")
+    parser.add_argument('requete')
+    parser.add_argument('--base', default='spacestri.db')
+    parser.add_argument('--limite', type=int, default=20)
+    parser.add_argument('--brute', action='store_true', help="Requête en syntaxe FTS5")
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.base) as conn:
+        resultats = rechercher(conn, args.requete, args.limite, args.brute)
+        print(f"{compter(conn, args.requete, args.brute)} espaces trouvés")
+        for id_espace, nom, score, extrait in resultats:
+            print(f"{score:6.2f}  [{id_espace}] {nom}\n        {extrait}")
+    conn.close()
+
+if __name__ == '__main__':
+    main()